@@ -22,6 +22,7 @@ from tron.api.adapter import ReprAdapter
 from tron.api.adapter import RunAdapter
 from tron.core import actionrun
 from tron.core import job
+from tron.core.admission import AdmissionController
 
 
 class MockAdapter(ReprAdapter):
@@ -128,6 +129,41 @@ class TestActionRunAdapter(TestCase):
         assert_equal(result['command'], self.action_run.rendered_command)
 
 
+class TestAdmissionQueueAdapter(TestCase):
+    @setup
+    def setup_adapter(self):
+        self.controller = mock.create_autospec(
+            AdmissionController,
+            instance=True,
+        )
+        self.controller.job_priorities = {'ns.job': 3}
+        ticket = mock.Mock(
+            job_name='ns.job',
+            namespace='ns',
+            node_name='node0',
+            created=0,
+        )
+        self.controller.get_ordered_tickets.return_value = [ticket]
+        self.controller.get_priority.return_value = 4
+        self.ticket = ticket
+        self.adapter = adapter.AdmissionQueueAdapter(self.controller)
+
+    @mock.patch('tron.api.adapter.timeutils', autospec=True)
+    def test_get_repr(self, mock_timeutils):
+        mock_timeutils.current_timestamp.return_value = 30
+        expected = [{
+            'position': 0,
+            'id': self.ticket.action_run.id,
+            'job_name': 'ns.job',
+            'namespace': 'ns',
+            'node': 'node0',
+            'priority': 3,
+            'effective_priority': 4,
+            'wait_time': 30,
+        }]
+        assert_equal(self.adapter.get_repr(), expected)
+
+
 class TestActionRunGraphAdapter(TestCase):
     @setup
     def setup_adapter(self):
@@ -178,6 +214,11 @@ class TestNodeAdapter(TestCase):
         result = self.adapter.get_repr()
         assert_equal(result['hostname'], self.node.hostname)
         assert_equal(result['username'], self.node.username)
+        assert_equal(
+            result['run_count'],
+            self.node.get_run_count.return_value,
+        )
+        assert_equal(result['health'], self.node.get_health.return_value)
 
 
 class TestNodePoolAdapter(TestCase):
@@ -1,7 +1,11 @@
+import datetime
+
 import mock
 
 from testifycompat import assert_equal
 from testifycompat import assert_in
+from testifycompat import assert_raises
+from testifycompat import assert_raises_and_contains
 from testifycompat import run
 from testifycompat import setup
 from testifycompat import TestCase
@@ -14,6 +18,7 @@ from tron.config import ConfigError
 from tron.config import manager
 from tron.core import actionrun
 from tron.core import jobrun
+from tron.core.backfill import Backfill
 from tron.core.job_collection import JobCollection
 from tron.core.job_scheduler import JobScheduler
 
@@ -133,6 +138,79 @@ class TestJobController(TestCase):
         self.controller.handle_command('start', run_time)
         self.job_scheduler.manual_start.assert_called_with(run_time=run_time)
 
+    def test_handle_command_backfill(self):
+        start_date = datetime.datetime(2018, 3, 1)
+        end_date = datetime.datetime(2018, 3, 5)
+        self.job_scheduler.backfill.return_value.run_times = [start_date] * 5
+        result = self.controller.handle_command(
+            'backfill',
+            start_date=start_date,
+            end_date=end_date,
+            max_in_flight=2,
+        )
+        self.job_scheduler.backfill.assert_called_with(
+            start_date,
+            end_date,
+            max_in_flight=2,
+        )
+        assert result.endswith("for 5 dates")
+
+    def test_handle_command_backfill_invalid_dates(self):
+        end_date = datetime.datetime(2018, 3, 1)
+        assert_raises_and_contains(
+            controller.InvalidCommandError,
+            "A backfill can not end before its start_date",
+            self.controller.handle_command,
+            'backfill',
+            start_date=end_date + datetime.timedelta(days=1),
+            end_date=end_date,
+        )
+        assert_raises_and_contains(
+            controller.InvalidCommandError,
+            "A backfill requires a start_date",
+            self.controller.handle_command,
+            'backfill',
+        )
+        assert not self.job_scheduler.backfill.mock_calls
+
+    def test_handle_command_cancel_backfill(self):
+        self.job_scheduler.cancel_backfills.return_value = ['Backfill:a.1']
+        result = self.controller.handle_command('cancel_backfill')
+        assert_equal(result, "Cancelled Backfill:a.1")
+
+    def test_handle_command_not_restored(self):
+        self.job_scheduler.get_job.return_value.restored = False
+        assert_raises(
+            controller.JobNotRestoredError,
+            self.controller.handle_command,
+            'start',
+        )
+        assert not self.job_scheduler.manual_start.mock_calls
+
+
+class TestBackfillController(TestCase):
+    @setup
+    def setup_controller(self):
+        self.backfill = mock.create_autospec(Backfill)
+        self.controller = controller.BackfillController(self.backfill)
+
+    def test_handle_command_cancel(self):
+        result = self.controller.handle_command('cancel')
+        self.backfill.cancel.assert_called_with()
+        assert result.startswith("Cancelled")
+
+    def test_handle_command_cancel_done(self):
+        self.backfill.cancel.return_value = False
+        result = self.controller.handle_command('cancel')
+        assert result.startswith("Failed to cancel")
+
+    def test_handle_command_unknown(self):
+        assert_raises(
+            controller.UnknownCommandError,
+            self.controller.handle_command,
+            'start',
+        )
+
 
 class TestConfigController(TestCase):
     @setup
@@ -172,6 +250,27 @@ class TestConfigController(TestCase):
         self.manager.write_config.assert_called_with(name, content)
         self.mcp.reconfigure.assert_called_with()
 
+    def test_validate_config(self):
+        name, content, config_hash = 'name', mock.Mock(), mock.Mock()
+        self.manager.get_hash.return_value = config_hash
+        assert not self.controller.validate_config(name, content, config_hash)
+        self.manager.validate_config.assert_called_with(name, content)
+        assert not self.manager.write_config.call_count
+        assert not self.mcp.reconfigure.call_count
+
+    def test_validate_config_failure(self):
+        name, content, config_hash = 'name', mock.Mock(), mock.Mock()
+        self.manager.get_hash.return_value = config_hash
+        self.manager.validate_config.side_effect = ConfigError("It broke")
+        error = self.controller.validate_config(name, content, config_hash)
+        assert_equal(error, "It broke")
+
+    def test_validate_config_hash_mismatch(self):
+        name, content, config_hash = 'name', mock.Mock(), mock.Mock()
+        error = self.controller.validate_config(name, content, config_hash)
+        assert_equal(error, "Configuration has changed. Please try again.")
+        assert not self.manager.validate_config.call_count
+
     def test_update_config_failure(self):
         name, content, config_hash = None, mock.Mock(), mock.Mock()
         self.manager.get_hash.return_value = config_hash
@@ -217,6 +316,60 @@ class TestConfigController(TestCase):
         error = self.controller.delete_config(name, content, config_hash)
         assert error
 
+    def test_validate_configs_hash_mismatch(self):
+        self.manager.get_hash.side_effect = lambda name: name + '_hash'
+        configs = {
+            'a': {'config': 'content', 'hash': 'a_hash'},
+            'b': {'config': 'content', 'hash': 'old_hash'},
+        }
+        result = self.controller.validate_configs(configs)
+        assert_equal(
+            result['hash_mismatches'],
+            {'b': {'expected': 'old_hash', 'current': 'b_hash'}},
+        )
+        assert not self.manager.validate_configs.call_count
+
+    def test_validate_configs(self):
+        unchanged = 'jobs: []'
+        self.manager.get_hash.side_effect = lambda name: {
+            'a': 'a_hash',
+            'b': manager.hash_digest(unchanged),
+        }[name]
+        configs = {
+            'a': {'config': 'content', 'hash': 'a_hash'},
+            'b': {'config': unchanged, 'hash': manager.hash_digest(unchanged)},
+        }
+        assert_equal(self.controller.validate_configs(configs), {})
+        self.manager.validate_configs.assert_called_with({'a': 'content'})
+
+    def test_validate_configs_failure(self):
+        self.manager.get_hash.return_value = 'hash'
+        self.manager.validate_configs.side_effect = ConfigError("It broke")
+        configs = {'a': {'config': 'content', 'hash': 'hash'}}
+        result = self.controller.validate_configs(configs)
+        assert_equal(result, {'error': "It broke"})
+
+    def test_update_configs(self):
+        self.manager.get_hash.return_value = 'hash'
+        configs = {
+            'a': {'config': 'content', 'hash': 'hash'},
+            'b': {'config': 'other', 'hash': 'hash'},
+        }
+        result = self.controller.update_configs(configs)
+        assert_equal(result, {'updated': ['a', 'b']})
+        self.manager.write_configs.assert_called_once_with(
+            {'a': 'content', 'b': 'other'},
+        )
+        self.mcp.reconfigure.assert_called_once_with()
+
+    def test_update_configs_failure(self):
+        self.manager.get_hash.return_value = 'hash'
+        self.manager.write_configs.side_effect = ConfigError("It broke")
+        configs = {'a': {'config': 'content', 'hash': 'hash'}}
+        result = self.controller.update_configs(configs)
+        assert_equal(result, {'error': "It broke"})
+        assert not self.mcp.reconfigure.call_count
+
     def test_get_namespaces(self):
         result = self.controller.get_namespaces()
         self.manager.get_namespaces.assert_called_with()
@@ -1,6 +1,8 @@
 """
 Test cases for the web services interface to tron
 """
+import datetime
+import json
 from unittest.mock import MagicMock
 
 import mock
@@ -9,6 +11,7 @@ import six
 import twisted.web.http
 import twisted.web.resource
 import twisted.web.server
+from twisted.internet import defer
 from twisted.web import http
 
 from testifycompat import assert_equal
@@ -25,6 +28,7 @@ from tron.core import job
 from tron.core import jobrun
 from tron.core.job_collection import JobCollection
 from tron.core.job_scheduler import JobScheduler
+from tron.core.schedule_planner import SchedulePlanner
 
 with mock.patch(
     'tron.api.async_resource.AsyncResource.bounded',
@@ -115,6 +119,30 @@ class TestHandleCommand(TestCase):
             code=http.INTERNAL_SERVER_ERROR,
         )
 
+    def test_handle_command_not_restored(self):
+        request = build_request(command='start')
+        mock_controller, obj = mock.Mock(), mock.Mock()
+        error = controller.JobNotRestoredError("restoring")
+        mock_controller.handle_command.side_effect = error
+        www.handle_command(request, mock_controller, obj)
+        self.respond.assert_called_with(
+            request,
+            {'error': str(error)},
+            code=http.SERVICE_UNAVAILABLE,
+        )
+
+    def test_handle_command_invalid(self):
+        request = build_request(command='backfill')
+        mock_controller, obj = mock.Mock(), mock.Mock()
+        error = controller.InvalidCommandError("requires a start_date")
+        mock_controller.handle_command.side_effect = error
+        www.handle_command(request, mock_controller, obj)
+        self.respond.assert_called_with(
+            request,
+            {'error': str(error)},
+            code=http.BAD_REQUEST,
+        )
+
 
 class TestActionRunResource(WWWTestCase):
     @setup
@@ -151,7 +179,14 @@ class TestApiRootResource(WWWTestCase):
         expected_children = [
             b'jobs',
             b'config',
+            b'config_bulk',
             b'status',
+            b'metrics',
+            b'queue',
+            b'nodes',
+            b'schedule_spread',
+            b'schedule',
+            b'concurrency_forecast',
             b'',
         ]
         assert_equal(set(expected_children), set(self.resource.children))
@@ -237,6 +272,7 @@ class TestJobResource(WWWTestCase):
             node_pool=mock.create_autospec(node.NodePool, ),
             max_runtime=mock.Mock(),
             expected_runtime=mock.MagicMock(),
+            restored=True,
         )
         self.job.get_name.return_value = 'foo'
         self.job_scheduler.get_job.return_value = self.job
@@ -285,6 +321,219 @@ class TestJobResource(WWWTestCase):
         assert_equal(resource.__class__, www.ActionRunHistoryResource)
         assert_equal(resource.action_runs, action_runs)
 
+    def test_getChild_backfills(self):
+        autospec_method(
+            self.resource.get_run_from_identifier,
+            return_value=None,
+        )
+        self.job.action_graph.names = []
+        resource = self.resource.getChild(b'backfills', None)
+        assert_equal(resource.__class__, www.BackfillCollectionResource)
+
+        job_backfill = self.job_scheduler.get_backfill.return_value
+        child = resource.getChild(b'2', None)
+        self.job_scheduler.get_backfill.assert_called_with(2)
+        assert_equal(child.job_backfill, job_backfill)
+
+        self.job_scheduler.backfills = [job_backfill]
+        response = resource.render_GET(self.request)
+        assert_equal(
+            response,
+            {'backfills': [job_backfill.get_progress.return_value]},
+        )
+
+    @mock.patch(
+        'tron.api.async_resource.threads.deferToThread',
+        autospec=True,
+    )
+    def test_render_POST_backfill(self, mock_defer):
+        mock_defer.side_effect = defer.maybeDeferred
+        request = build_request(
+            command='backfill',
+            start_date='2018-03-01 00:00:00',
+            max_in_flight='3',
+        )
+        with mock.patch.object(
+            self.resource.controller,
+            'handle_command',
+            autospec=True,
+        ) as handle_command:
+            handle_command.return_value = 'started'
+            self.resource.render_POST(request)
+        self.respond.assert_called_with(request, {'result': 'started'})
+        handle_command.assert_called_with(
+            'backfill',
+            run_time=None,
+            start_date=datetime.datetime(2018, 3, 1),
+            end_date=None,
+            max_in_flight=3,
+        )
+
+
+class TestNodesResource(WWWTestCase):
+    @setup_teardown
+    def setup_resource(self):
+        node.NodePoolRepository.get_instance().clear()
+        self.nodes = [
+            node.Node(
+                mock.Mock(name='node%d' % i),
+                mock.Mock(),
+                None,
+                mock.Mock(),
+            ) for i in range(2)
+        ]
+        for i, pool_node in enumerate(self.nodes):
+            pool_node.config.name = 'node%d' % i
+            pool_node.run_states = {j: mock.Mock() for j in range(i + 1)}
+            node.NodePoolRepository.get_instance().add_node(pool_node)
+        node.NodePoolRepository.get_instance().pools.replace(
+            node.NodePool(self.nodes, 'pool', 'least_outstanding'),
+        )
+        self.resource = www.NodesResource()
+        yield
+        node.NodePoolRepository.get_instance().clear()
+
+    def test_render_GET(self):
+        response = self.resource.render_GET(self.request)
+        run_counts = {
+            item['name']: item['run_count']
+            for item in response['nodes']
+        }
+        assert_equal(run_counts, {'node0': 1, 'node1': 2})
+        assert_equal(
+            response['node_pools'],
+            [
+                {
+                    'name': 'pool',
+                    'selection': 'least_outstanding',
+                    'run_counts': {'node0': 1, 'node1': 2},
+                },
+            ],
+        )
+
+
+class TestScheduleSpreadResource(WWWTestCase):
+    @setup
+    def setup_resource(self):
+        self.mcp = mock.create_autospec(mcp.MasterControlProgram)
+        self.mcp.schedule_planner = mock.create_autospec(SchedulePlanner)
+        self.resource = www.ScheduleSpreadResource(self.mcp)
+
+    def test_render_GET(self):
+        request = build_request(horizon='60', bucket='5')
+        response = self.resource.render_GET(request)
+        report = self.mcp.schedule_planner.report
+        _, horizon, bucket_size = report.call_args[0]
+        assert not self.mcp.get_job_collection.called
+        assert_equal(horizon, datetime.timedelta(seconds=60))
+        assert_equal(bucket_size, 5)
+        assert_equal(response, report.return_value)
+
+
+class TestConcurrencyForecastResource(WWWTestCase):
+    @setup
+    def setup_resource(self):
+        self.mcp = mock.create_autospec(mcp.MasterControlProgram)
+        self.mcp.concurrency_forecast = mock.Mock()
+        self.resource = www.ConcurrencyForecastResource(self.mcp)
+
+    @mock.patch('tron.api.resource.timeutils.current_time', autospec=True)
+    def test_render_GET(self, mock_now):
+        request = build_request(horizon='3600', bucket='60')
+        response = self.resource.render_GET(request)
+        get_forecast = self.mcp.concurrency_forecast.get_forecast
+        get_forecast.assert_called_with(
+            self.mcp.get_job_collection.return_value.get_jobs.return_value,
+            mock_now.return_value,
+            datetime.timedelta(seconds=3600),
+            60,
+            mock.ANY,
+        )
+        assert_equal(response, get_forecast.return_value)
+
+
+class TestScheduleResource(WWWTestCase):
+    @setup
+    def setup_resource(self):
+        self.mcp = mock.create_autospec(mcp.MasterControlProgram)
+        self.jobs = [mock.Mock(), mock.Mock()]
+        self.jobs[0].get_name.return_value = 'MASTER.one'
+        self.jobs[1].get_name.return_value = 'other.two'
+        self.mcp.get_job_collection.return_value.get_jobs.return_value = (
+            self.jobs
+        )
+        self.resource = www.ScheduleResource(self.mcp)
+
+    @mock.patch('tron.api.resource.schedule_preview', autospec=True)
+    def test_render_GET(self, mock_preview):
+        mock_preview.MAX_PREVIEW_RUNS = 1000
+        request = build_request(
+            **{
+                'from': '2018-03-04 00:00:00',
+                'to': '2018-03-11 00:00:00',
+                'namespace': 'other',
+                'limit': '20',
+            }
+        )
+        response = self.resource.render_GET(request)
+        start_time = datetime.datetime(2018, 3, 4)
+        end_time = datetime.datetime(2018, 3, 11)
+        mock_preview.preview_jobs.assert_called_with(
+            [self.jobs[1]],
+            start_time,
+            end_time,
+            20,
+        )
+        assert_equal(
+            response, {
+                'from': start_time,
+                'to': end_time,
+                'jobs': mock_preview.preview_jobs.return_value,
+            }
+        )
+
+    @mock.patch('tron.api.resource.schedule_preview', autospec=True)
+    @mock.patch('tron.api.resource.timeutils.current_time', autospec=True)
+    def test_render_GET_defaults(self, mock_now, mock_preview):
+        mock_preview.MAX_PREVIEW_RUNS = 1000
+        mock_now.return_value = datetime.datetime(2018, 3, 4, 12)
+        self.resource.render_GET(build_request(limit='5000'))
+        mock_preview.preview_jobs.assert_called_with(
+            self.jobs,
+            datetime.datetime(2018, 3, 4, 12),
+            datetime.datetime(2018, 3, 5, 12),
+            1000,
+        )
+
+    def test_render_GET_bad_range(self):
+        request = build_request(
+            **{
+                'from': '2018-03-04 00:00:00',
+                'to': '2018-03-03 00:00:00',
+            }
+        )
+        response = self.resource.render_GET(request)
+        assert 'error' in response
+
+
+class TestStatusResource(WWWTestCase):
+    @setup
+    def setup_resource(self):
+        self.mcp = mock.create_autospec(mcp.MasterControlProgram)
+        self.resource = www.StatusResource(self.mcp)
+
+    def test_render_GET_restoring(self):
+        progress = {'restoring': True, 'total': 10, 'restored': 4}
+        self.mcp.get_restore_progress.return_value = progress
+        response = self.resource.render_GET(self.request)
+        assert_equal(response, {'status': 'restoring', 'restore': progress})
+
+    def test_render_GET(self):
+        progress = {'restoring': False, 'total': 10, 'restored': 10}
+        self.mcp.get_restore_progress.return_value = progress
+        response = self.resource.render_GET(self.request)
+        assert_equal(response['status'], "I'm alive.")
+
 
 class TestConfigResource(TestCase):
     @setup_teardown
@@ -310,16 +559,46 @@ class TestConfigResource(TestCase):
             self.resource.controller.read_config.return_value,
         )
 
-    def test_render_POST_update(self):
+    @mock.patch(
+        'tron.api.async_resource.threads.deferToThread',
+        autospec=True,
+    )
+    def test_render_POST_update(self, mock_defer):
+        mock_defer.side_effect = defer.maybeDeferred
+        self.controller.validate_config.return_value = None
         name, config, hash = 'the_name', 'config', 'hash'
         request = build_request(name=name, config=config, hash=hash)
-        self.resource.render_POST(request)
+        result = self.resource.render_POST(request)
+        assert_equal(result, twisted.web.server.NOT_DONE_YET)
+        self.controller.validate_config.assert_called_with(name, config, hash)
         self.controller.update_config.assert_called_with(name, config, hash)
         response_content = {
             'status': 'Active',
             'error': self.controller.update_config.return_value,
         }
         self.respond.assert_called_with(request, response_content)
+        request.write.assert_called_with(self.respond.return_value)
+        request.finish.assert_called_with()
+
+    @mock.patch(
+        'tron.api.async_resource.threads.deferToThread',
+        autospec=True,
+    )
+    def test_render_POST_update_invalid(self, mock_defer):
+        mock_defer.side_effect = defer.maybeDeferred
+        self.controller.validate_config.return_value = "Bad config"
+        request = build_request(name='the_name', config='config', hash='hash')
+        self.resource.render_POST(request)
+        assert not self.controller.update_config.called
+        response_content = {'status': 'Active', 'error': "Bad config"}
+        self.respond.assert_called_with(request, response_content)
+
+    def test_render_POST_check(self):
+        name, config, hash = 'the_name', 'config', 'hash'
+        request = build_request(name=name, config=config, hash=hash, check='1')
+        self.resource.render_POST(request)
+        self.controller.check_config.assert_called_with(name, config, hash)
+        assert not self.controller.update_config.called
 
     def test_render_POST_delete(self):
         name, config, hash = 'the_name', '', ''
@@ -333,5 +612,72 @@ class TestConfigResource(TestCase):
         self.respond.assert_called_with(request, response_content)
 
 
+class TestConfigBulkResource(TestCase):
+    @setup_teardown
+    def setup_resource(self):
+        self.mcp = mock.create_autospec(mcp.MasterControlProgram)
+        self.resource = www.ConfigBulkResource(self.mcp)
+        self.controller = self.resource.controller = mock.create_autospec(
+            controller.ConfigController,
+        )
+        with mock.patch(
+            'tron.api.resource.respond',
+            autospec=True,
+        ) as self.respond, mock.patch(
+            'tron.api.async_resource.threads.deferToThread',
+            autospec=True,
+            side_effect=defer.maybeDeferred,
+        ):
+            yield
+
+    def test_render_GET(self):
+        request = build_request()
+        self.resource.render_GET(request)
+        self.respond.assert_called_with(
+            request,
+            {'hashes': self.controller.get_hashes.return_value},
+        )
+
+    def test_render_POST(self):
+        configs = {'ns': {'config': 'jobs:', 'hash': 'hash'}}
+        self.controller.validate_configs.return_value = {}
+        self.controller.update_configs.return_value = {'updated': ['ns']}
+        request = build_request(configs=json.dumps(configs))
+        self.resource.render_POST(request)
+        self.controller.validate_configs.assert_called_with(configs)
+        self.controller.update_configs.assert_called_with(configs)
+        self.respond.assert_called_with(
+            request,
+            {'status': 'Active', 'updated': ['ns']},
+        )
+
+    def test_render_POST_invalid(self):
+        configs = {'ns': {'config': 'jobs:', 'hash': 'hash'}}
+        result = {'error': 'Bad', 'hash_mismatches': {}}
+        self.controller.validate_configs.return_value = result
+        request = build_request(configs=json.dumps(configs))
+        self.resource.render_POST(request)
+        assert not self.controller.update_configs.called
+        self.respond.assert_called_with(
+            request,
+            {'status': 'Active', 'error': 'Bad', 'hash_mismatches': {}},
+        )
+
+    def test_render_POST_check(self):
+        configs = {'ns': {'config': 'jobs:', 'hash': 'hash'}}
+        self.controller.validate_configs.return_value = {}
+        request = build_request(configs=json.dumps(configs), check='1')
+        self.resource.render_POST(request)
+        self.controller.validate_configs.assert_called_with(configs)
+        assert not self.controller.update_configs.called
+
+    def test_render_POST_bad_configs(self):
+        for configs in ['not json', '[]', '{"ns": "jobs:"}']:
+            request = build_request(configs=configs)
+            self.resource.render_POST(request)
+            _, kwargs = self.respond.call_args
+            assert_equal(kwargs['code'], http.BAD_REQUEST)
+
+
 if __name__ == '__main__':
     run()
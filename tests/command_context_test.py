@@ -131,6 +131,18 @@ class ChainedObjectOverrideContextTestCase(SimpleContextTestCaseBase):
         assert_equal(self.context['next_foo'], 'next_bar')
 
 
+class DeepChainContextTestCase(SimpleContextTestCaseBase):
+    @setup
+    def build_context(self):
+        context = command_context.CommandContext(dict(foo='bar'))
+        for i in range(3):
+            context = command_context.CommandContext(dict(other=i), context)
+        self.context = context
+
+    def test_override(self):
+        assert_equal(self.context['other'], 2)
+
+
 class TestJobContext(TestCase):
     @setup
     def setup_job(self):
@@ -199,6 +211,22 @@ class TestJobRunContext(TestCase):
         mock_date_math.parse.assert_called_with(name, self.jobrun.run_time)
         assert_equal(time_value, mock_date_math.parse.return_value)
 
+    @mock.patch('tron.command_context.timeutils.DateArithmetic', autospec=True)
+    def test__getitem__memoized(self, mock_date_math):
+        assert_equal(self.context['shortdate'], self.context['shortdate'])
+        assert_equal(mock_date_math.parse.call_count, 1)
+        self.jobrun.run_time = 'later'
+        self.context['shortdate']
+        mock_date_math.parse.assert_called_with('shortdate', 'later')
+        assert_equal(mock_date_math.parse.call_count, 2)
+
+    @mock.patch('tron.command_context.timeutils.DateArithmetic', autospec=True)
+    def test__getitem__miss_memoized(self, mock_date_math):
+        mock_date_math.parse.return_value = None
+        for _ in range(2):
+            assert_raises(KeyError, lambda: self.context['name'])
+        assert_equal(mock_date_math.parse.call_count, 1)
+
 
 class TestActionRunContext(TestCase):
     @setup
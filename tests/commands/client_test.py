@@ -135,12 +135,26 @@ class TestClient(TestCase):
         }
         self.client.request.assert_called_with('/api/config', expected_data)
 
+    def test_config_bulk(self):
+        configs = {'ns': {'config': 'stuff', 'hash': 'hash'}}
+        self.client.config_bulk(configs, check=True)
+        self.client.request.assert_called_with(
+            '/api/config_bulk',
+            {'configs': client.simplejson.dumps(configs), 'check': 1},
+        )
+
     def test_config_get_default(self):
         self.client.config('config_name')
         self.client.request.assert_called_with(
             '/api/config?name=config_name',
         )
 
+    def test_schedule(self):
+        self.client.schedule(start_time='2018-03-04 00:00:00', namespace='ns')
+        self.client.request.assert_called_with(
+            '/api/schedule?from=2018-03-04+00%3A00%3A00&namespace=ns',
+        )
+
     def test_http_get(self):
         self.client.http_get('/api/jobs', {'include': 1})
         self.client.request.assert_called_with('/api/jobs?include=1')
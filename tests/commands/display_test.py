@@ -202,5 +202,55 @@ class TestDisplayScheduler(TestCase):
         assert_equal(result, 'interval 5 minutes%s' % (source['jitter']))
 
 
+class TestFormatScheduleSpread(TestCase):
+    def test_format_schedule_spread(self):
+        histogram = {
+            'starts': 2,
+            'peak': 2,
+            'busiest': [{'time': '2012-03-15 00:00:00', 'starts': 2}],
+            'distribution': {'2': 1},
+        }
+        report = {
+            'enabled': True,
+            'window': 300,
+            'horizon': 3600,
+            'bucket_size': 1,
+            'offsets': {},
+            'before': histogram,
+            'after': dict(histogram, peak=1, distribution={'1': 2}),
+        }
+        lines = display.format_schedule_spread(report).split('\n')
+        assert_equal(lines[0], 'Schedule spreading is enabled, window 300s')
+        assert_equal(lines[3], 'Before: 2 starts, peak 2')
+        assert_equal(lines[5], '              2  1       #')
+        assert_equal(lines[9], 'After: 2 starts, peak 1')
+
+
+class TestFormatSchedule(TestCase):
+    def test_format_schedule(self):
+        schedule = {
+            'from': '2018-03-04 00:00:00',
+            'to': '2018-03-05 00:00:00',
+            'jobs': {
+                'MASTER.b': ['2018-03-04 12:00:00'],
+                'MASTER.a': ['2018-03-04 01:00:00', '2018-03-04 13:00:00'],
+            },
+        }
+        lines = display.format_schedule(schedule).split('\n')
+        assert_equal(
+            lines, [
+                'Run times from 2018-03-04 00:00:00 to 2018-03-05 00:00:00',
+                '3 runs of 2 jobs',
+                '',
+                'MASTER.a: 2 runs',
+                '    2018-03-04 01:00:00',
+                '    2018-03-04 13:00:00',
+                '',
+                'MASTER.b: 1 runs',
+                '    2018-03-04 12:00:00',
+            ]
+        )
+
+
 if __name__ == "__main__":
     run()
@@ -55,9 +55,19 @@ def make_ssh_options():
         known_hosts_file=None,
         connect_timeout=30,
         idle_connection_timeout=3600,
+        max_channels_per_connection=10,
+        prewarm_seconds=0,
+        keepalive_interval=15,
+        keepalive_count_max=3,
+        circuit_breaker_threshold=3,
+        circuit_breaker_timeout=30,
         jitter_min_load=4,
         jitter_max_delay=20,
         jitter_load_factor=1,
+        start_rate_per_node=None,
+        start_burst_per_node=1,
+        start_rate_global=None,
+        start_burst_global=1,
     )
 
 
@@ -93,6 +103,8 @@ def make_node_pools():
             schema.ConfigNodePool(
                 nodes=('node0', 'node1'),
                 name='NodePool',
+                selection='random',
+                weights=FrozenDict(),
             ),
     })
 
@@ -111,6 +123,16 @@ def make_mesos_options():
     )
 
 
+def make_admission_control(**kwargs):
+    kwargs.setdefault('max_concurrent', None)
+    kwargs.setdefault('max_concurrent_per_node', None)
+    kwargs.setdefault('node_limits', FrozenDict())
+    kwargs.setdefault('node_pool_limits', FrozenDict())
+    kwargs.setdefault('namespace_limits', FrozenDict())
+    kwargs.setdefault('priority_aging_interval', 60)
+    return schema.ConfigAdmissionControl(**kwargs)
+
+
 def make_action(**kwargs):
     kwargs.setdefault('name', 'action'),
     kwargs.setdefault('command', 'command')
@@ -154,6 +176,8 @@ def make_job(**kwargs):
     kwargs.setdefault('allow_overlap', False)
     kwargs.setdefault('time_zone', None)
     kwargs.setdefault('expected_runtime', datetime.timedelta(0, 3600))
+    kwargs.setdefault('priority', 0)
+    kwargs.setdefault('skip_if_older_than', None)
     return schema.ConfigJob(**kwargs)
 
 
@@ -288,6 +312,9 @@ def make_tron_config(
     node_pools=None,
     jobs=None,
     mesos_options=None,
+    admission_control=None,
+    schedule_spreading=None,
+    catch_up=None,
 ):
     return schema.TronConfig(
         action_runner=action_runner or FrozenDict(),
@@ -301,6 +328,16 @@ def make_tron_config(
         node_pools=node_pools or make_node_pools(),
         jobs=jobs or make_master_jobs(),
         mesos_options=mesos_options or make_mesos_options(),
+        admission_control=admission_control or make_admission_control(),
+        schedule_spreading=schedule_spreading or
+        schema.ConfigScheduleSpreading(
+            enabled=False,
+            window=datetime.timedelta(minutes=5),
+        ),
+        catch_up=catch_up or schema.ConfigCatchUp(
+            max_starts_per_second=None,
+            collapse_missed_runs=False,
+        ),
     )
 
 
@@ -790,6 +827,33 @@ class TestNodeConfig(TestCase):
         )
         assert_equal(config_node_pool.name, "theName")
         assert_equal(len(config_node_pool.nodes), 2)
+        assert_equal(config_node_pool.selection, "random")
+
+    def test_validate_node_pool_selection(self):
+        config_node_pool = valid_node_pool(
+            dict(
+                nodes=["node1", "node2"],
+                selection="weighted_round_robin",
+                weights={"node1": 3},
+            ),
+        )
+        assert_equal(config_node_pool.selection, "weighted_round_robin")
+        assert_equal(config_node_pool.weights, {"node1": 3})
+
+    def test_validate_node_pool_invalid_selection(self):
+        assert_raises(
+            ConfigError,
+            valid_node_pool,
+            dict(nodes=["node1", "node2"], selection="fastest"),
+        )
+
+    def test_validate_node_pool_invalid_weights(self):
+        for weights in ({"node3": 2}, {"node1": 0}):
+            assert_raises(
+                ConfigError,
+                valid_node_pool,
+                dict(nodes=["node1", "node2"], weights=weights),
+            )
 
     def test_overlap_node_and_node_pools(self):
         tron_config = dict(
@@ -1163,6 +1227,52 @@ class TestValidateConfigMapping(TestCase):
         assert_equal(result[1][0], 'other')
 
 
+class TestValidateNamespaces(TestCase):
+    @setup
+    def setup_master(self):
+        self.master = valid_config(BASE_CONFIG)
+        self.contents = {
+            'ns%d' % i: dict(TestNamedConfig.config)
+            for i in range(config_parse.PARALLEL_VALIDATION_MIN)
+        }
+
+    def test_validate_namespaces(self):
+        result = config_parse.validate_namespaces(
+            self.contents,
+            self.master,
+            processes=1,
+        )
+        assert_equal(set(result), set(self.contents))
+
+    def test_validate_namespaces_in_pool(self):
+        expected = config_parse.validate_namespaces(
+            self.contents,
+            self.master,
+            processes=1,
+        )
+        result = config_parse.validate_namespaces(
+            self.contents,
+            self.master,
+            processes=2,
+        )
+        assert_equal(result, expected)
+
+    def test_validate_namespaces_errors(self):
+        self.contents['ns1'] = dict(bozray=None)
+        self.contents['ns0'] = dict(bozray=None)
+        for processes in 1, 2:
+            exception = assert_raises(
+                ConfigError,
+                config_parse.validate_namespaces,
+                self.contents,
+                self.master,
+                processes,
+            )
+            lines = str(exception).split('\n')
+            assert lines[0].startswith('ns0: Unknown keys')
+            assert lines[1].startswith('ns1: Unknown keys')
+
+
 class TestConfigContainer(TestCase):
     config = BASE_CONFIG
 
@@ -1247,6 +1357,36 @@ class TestValidateSSHOptions(TestCase):
         )
         assert_equal(config.agent, True)
 
+    def test_start_rate(self):
+        self.config.update(start_rate_per_node='2.5', start_burst_global=5)
+        self.config['agent'] = False
+        config = config_parse.valid_ssh_options.validate(
+            self.config,
+            self.context,
+        )
+        assert_equal(config.start_rate_per_node, 2.5)
+        assert_equal(config.start_burst_per_node, 1)
+        assert_equal(config.start_rate_global, None)
+        assert_equal(config.start_burst_global, 5)
+
+    def test_start_burst_too_small(self):
+        self.config = {'start_rate_global': 1, 'start_burst_global': 0}
+        assert_raises(
+            ConfigError,
+            config_parse.valid_ssh_options.validate,
+            self.config,
+            self.context,
+        )
+
+    def test_max_channels_per_connection_negative(self):
+        self.config = {'max_channels_per_connection': -1}
+        assert_raises(
+            ConfigError,
+            config_parse.valid_ssh_options.validate,
+            self.config,
+            self.context,
+        )
+
 
 class TestValidateIdentityFile(TestCase):
     @setup
@@ -181,6 +181,37 @@ class TestConfigContext(TestCase):
         assert not child.partial
 
 
+class TestStringFormatter(TestCase):
+    @setup
+    def setup_formatter(self):
+        self.context = {'one': 1, 'name': 'two', 'shortdate-1': '2018-01-01'}
+        self.formatter = config_utils.StringFormatter(self.context)
+
+    def test_compile_template(self):
+        assert_equal(
+            config_utils.compile_template("a {one} {name!r:>6}"),
+            (('a ', 'one', None, ''), (' ', 'name', 'r', '>6')),
+        )
+
+    def test_compile_template_unsupported(self):
+        for template in ["{}", "{0}", "{one.real}", "{one:{name}}", "{"]:
+            assert config_utils.compile_template(template) is None
+
+    def test_format(self):
+        template = "{one} {name!r:>6} {shortdate-1} {{literal}}"
+        expected = "1  'two' 2018-01-01 {literal}"
+        assert_equal(self.formatter.format(template), expected)
+
+    def test_format_fallback(self):
+        assert_equal(self.formatter.format("{one.real}"), "1")
+
+    def test_format_missing_key(self):
+        assert_raises(KeyError, self.formatter.format, "{missing}")
+
+    def test_format_invalid(self):
+        assert_raises(ValueError, self.formatter.format, "{one")
+
+
 StubConfigObject = schema.config_object_factory(
     'StubConfigObject',
     ['req1', 'req2'],
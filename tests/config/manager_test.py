@@ -4,12 +4,14 @@ from __future__ import unicode_literals
 import os
 import shutil
 import tempfile
+import threading
 
 import mock
 
 from testifycompat import assert_equal
 from testifycompat import run
 from testifycompat import setup
+from testifycompat import setup_teardown
 from testifycompat import teardown
 from testifycompat import TestCase
 from tests.assertions import assert_raises
@@ -147,7 +149,7 @@ class TestConfigManager(TestCase):
         self.manager.write_config(name, self.raw_content)
         assert_equal(manager.read(path), self.content)
         self.manifest.get_file_name.assert_called_with(name)
-        assert not self.manifest.add.call_count
+        assert not self.manifest.update.call_count
         self.manager.validate_with_fragment.assert_called_with(
             name,
             self.content,
@@ -161,7 +163,7 @@ class TestConfigManager(TestCase):
         self.manager.write_config(name, self.raw_content)
         assert_equal(manager.read(path), self.content)
         self.manifest.get_file_name.assert_called_with(name)
-        self.manifest.add.assert_called_with(name, path)
+        self.manifest.update.assert_called_with({name: path})
 
     @mock.patch('os.remove', autospec=True)
     def test_delete_config(self, mock_remove):
@@ -183,33 +185,42 @@ class TestConfigManager(TestCase):
         'tron.config.manager.config_parse.ConfigContainer',
         autospec=True,
     )
-    def test_validate_with_fragment(self, mock_config_container):
-        name = 'the_name'
+    def test_validate_with_fragment_master(self, mock_config_container):
+        name = schema.MASTER_NAMESPACE
         name_mapping = {'something': 'content', name: 'old_content'}
         autospec_method(self.manager.get_config_name_mapping)
         self.manager.get_config_name_mapping.return_value = name_mapping
         self.manager.validate_with_fragment(name, self.content)
         expected_mapping = dict(name_mapping)
         expected_mapping[name] = self.content
-        mock_config_container.create.assert_called_with(expected_mapping)
+        mock_config_container.create.assert_called_with(
+            expected_mapping,
+            self.manager.validation_processes,
+        )
 
-    @mock.patch('tron.config.manager.read', autospec=True)
     @mock.patch(
-        'tron.config.manager.config_parse.ConfigContainer',
+        'tron.config.manager.config_parse.validate_namespace',
         autospec=True,
     )
-    def test_load(self, mock_config_container, mock_read):
-        content_items = self.content.items()
-        self.manifest.get_file_mapping().return_value = content_items
-        container = self.manager.load()
-        self.manifest.get_file_mapping.assert_called_with()
-        assert_equal(container, mock_config_container.create.return_value)
+    def test_validate_with_fragment(self, mock_validate_namespace):
+        master = mock.Mock()
+        autospec_method(
+            self.manager.load_namespace,
+            return_value=(master, 'hash'),
+        )
+        self.manager.validate_with_fragment('the_name', self.content)
+        self.manager.load_namespace.assert_called_with(
+            schema.MASTER_NAMESPACE,
+        )
+        mock_validate_namespace.assert_called_with(
+            'the_name',
+            self.content,
+            master,
+        )
 
-        expected = {
-            name: call.return_value
-            for ((name, _), call) in zip(content_items, mock_read.mock_calls)
-        }
-        mock_config_container.create.assert_called_with(expected)
+    def test_load_missing_master(self):
+        self.manifest.get_file_mapping.return_value = {'one': 'one.yaml'}
+        assert_raises(ConfigError, self.manager.load)
 
     def test_get_hash_default(self):
         self.manifest.__contains__.return_value = False
@@ -218,12 +229,272 @@ class TestConfigManager(TestCase):
 
     def test_get_hash(self):
         content = "OkOkOk"
-        autospec_method(self.manager.read_raw_config, return_value=content)
+        path = os.path.join(self.temp_dir, 'name.yaml')
+        manager.write_raw(path, content)
+        self.manifest.get_file_name.return_value = path
         self.manifest.__contains__.return_value = True
         hash_digest = self.manager.get_hash('name')
         assert_equal(hash_digest, manager.hash_digest(content))
 
 
+class TestConfigManagerCache(TestCase):
+
+    master_content = (
+        "ssh_options: {agent: false, identities: [tests/test_id_rsa]}\n"
+        "nodes:\n"
+        "- {name: node0, hostname: box0}\n"
+    )
+    namespace_content = (
+        "jobs:\n"
+        "- name: job0\n"
+        "  node: node0\n"
+        "  schedule: daily\n"
+        "  actions:\n"
+        "  - {name: first, command: echo}\n"
+    )
+
+    @setup_teardown
+    def setup_config_manager(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(self.temp_dir, 'config')
+        manager.create_new_config(config_path, self.master_content)
+        self.manager = manager.ConfigManager(config_path)
+        self.manager.write_config('ns', self.namespace_content)
+        with mock.patch(
+            'tron.config.manager.from_string',
+            autospec=True,
+            side_effect=manager.from_string,
+        ) as self.mock_from_string:
+            yield
+        shutil.rmtree(self.temp_dir)
+
+    def rewrite(self, name, content):
+        """Write a config file without using the manager, and make sure its
+        modification time changes.
+        """
+        filename = self.manager.manifest.get_file_name(name)
+        mtime = os.path.getmtime(filename)
+        manager.write_raw(filename, content)
+        os.utime(filename, (mtime + 1, mtime + 1))
+
+    def test_load_cached(self):
+        container = self.manager.load()
+        assert_equal(set(container.configs), {schema.MASTER_NAMESPACE, 'ns'})
+
+        second = self.manager.load()
+        assert_equal(self.mock_from_string.call_count, 0)
+        assert second['ns'] is container['ns']
+        assert second.get_master() is container.get_master()
+
+    def test_load_namespace_changed(self):
+        container = self.manager.load()
+        self.rewrite('ns', self.namespace_content.replace('echo', 'ls'))
+        second = self.manager.load()
+        assert_equal(self.mock_from_string.call_count, 1)
+        assert second.get_master() is container.get_master()
+        action = second['ns'].jobs['ns.job0'].actions['first']
+        assert_equal(action.command, 'ls')
+
+    def test_load_master_changed(self):
+        container = self.manager.load()
+        self.rewrite(
+            schema.MASTER_NAMESPACE,
+            self.master_content + "time_zone: US/Pacific\n",
+        )
+        second = self.manager.load()
+        assert second.get_master() is not container.get_master()
+        assert second['ns'] is not container['ns']
+        assert_equal(second['ns'], container['ns'])
+
+    def test_get_hash(self):
+        self.rewrite('ns', "jobs: []\n")
+        assert_equal(
+            self.manager.get_hash('ns'),
+            manager.hash_digest("jobs: []\n"),
+        )
+
+    def test_write_config_cached(self):
+        self.manager.write_config('other', "jobs: []\n")
+        assert_equal(self.mock_from_string.call_count, 1)
+        self.manager.load()
+        assert_equal(self.mock_from_string.call_count, 1)
+
+    def test_write_config_validated(self):
+        content = self.namespace_content.replace('echo', 'ls')
+        upload = self.manager.validate_config('ns', content)
+        assert_equal(self.manager.get_hash('ns'), manager.hash_digest(
+            self.namespace_content,
+        ))
+        with mock.patch(
+            'tron.config.manager.config_parse.validate_namespace',
+            autospec=True,
+        ) as mock_validate_namespace:
+            self.manager.write_config('ns', content)
+            container = self.manager.load()
+        assert_equal(mock_validate_namespace.call_count, 0)
+        assert_equal(self.mock_from_string.call_count, 1)
+        assert container['ns'] is upload.config
+
+    def test_write_config_master_changed(self):
+        self.manager.write_config(
+            schema.MASTER_NAMESPACE,
+            self.master_content + "- {name: node1, hostname: box1}\n",
+        )
+        content = self.namespace_content.replace('node0', 'node1')
+        self.manager.validate_config('ns', content)
+        self.manager.write_config(
+            schema.MASTER_NAMESPACE,
+            self.master_content,
+        )
+        assert_raises(
+            ConfigError,
+            self.manager.write_config,
+            'ns',
+            content,
+        )
+        assert_equal(
+            self.manager.get_hash('ns'),
+            manager.hash_digest(self.namespace_content),
+        )
+
+    def test_delete_config(self):
+        self.manager.load()
+        self.manager.delete_config('ns')
+        container = self.manager.load()
+        assert_equal(set(container.configs), {schema.MASTER_NAMESPACE})
+        assert_equal(set(self.manager.validated_cache), {'MASTER'})
+
+    def test_validate_config_while_loading(self):
+        contents = [
+            self.namespace_content.replace('echo', 'ls %d' % i)
+            for i in range(20)
+        ]
+        errors = []
+
+        def validate():
+            try:
+                for content in contents:
+                    self.manager.validate_config('ns', content)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=validate)
+        thread.start()
+        for content in contents:
+            self.manager.write_config('other', "jobs: []\n")
+            self.manager.load()
+            self.manager.delete_config('other')
+            self.manager.load()
+        thread.join()
+        assert_equal(errors, [])
+        assert_equal(
+            self.manager.validated_uploads['ns'].content_hash,
+            manager.hash_digest(contents[-1]),
+        )
+
+    def test_validate_configs_errors(self):
+        contents = {
+            'ns': self.namespace_content.replace('node0', 'node1'),
+            'other': self.namespace_content.replace('node0', 'node2'),
+        }
+        error = assert_raises(
+            ConfigError,
+            self.manager.validate_configs,
+            contents,
+        )
+        message = str(error)
+        assert 'ns: ' in message
+        assert 'other: ' in message
+
+    def test_load_errors(self):
+        self.manager.write_config('other', "jobs: []\n")
+        self.rewrite('ns', self.namespace_content.replace('node0', 'node1'))
+        self.rewrite('other', self.namespace_content.replace('node0', 'node2'))
+        error = assert_raises(ConfigError, self.manager.load)
+        lines = str(error).split('\n')
+        assert lines[0].startswith('ns: ')
+        assert lines[1].startswith('other: ')
+
+    @mock.patch(
+        'tron.config.manager.config_parse.validate_namespaces',
+        autospec=True,
+    )
+    def test_load_validation_processes(self, mock_validate_namespaces):
+        content = self.namespace_content.replace('echo', 'ls')
+        self.rewrite('ns', content)
+        mock_validate_namespaces.return_value = {'ns': mock.Mock()}
+        self.manager.validation_processes = 4
+        container = self.manager.load()
+        mock_validate_namespaces.assert_called_with(
+            {'ns': manager.from_string(content)},
+            container.get_master(),
+            4,
+        )
+        assert container['ns'] is mock_validate_namespaces.return_value['ns']
+
+    @mock.patch(
+        'tron.config.manager.config_parse.validate_namespaces',
+        autospec=True,
+    )
+    def test_load_single_process_by_default(self, mock_validate_namespaces):
+        self.rewrite('ns', self.namespace_content.replace('echo', 'ls'))
+        mock_validate_namespaces.return_value = {'ns': mock.Mock()}
+        self.manager.load()
+        assert_equal(mock_validate_namespaces.call_args[0][2], 1)
+
+    def test_validate_configs_with_master(self):
+        master = self.master_content.replace('node0', 'node1')
+        contents = {
+            schema.MASTER_NAMESPACE: master,
+            'ns': self.namespace_content.replace('node0', 'node1'),
+        }
+        uploads = self.manager.validate_configs(contents)
+        assert_equal(set(uploads), {schema.MASTER_NAMESPACE, 'ns'})
+        assert_equal(
+            uploads['ns'].cache_key,
+            (manager.hash_digest(contents['ns']), manager.hash_digest(master)),
+        )
+
+    def test_write_configs(self):
+        contents = {
+            'ns': self.namespace_content.replace('echo', 'ls'),
+            'new': self.namespace_content,
+        }
+        self.manager.write_configs(contents)
+        for name, content in contents.items():
+            assert_equal(self.manager.read_raw_config(name), content)
+        assert_equal(
+            set(self.manager.get_namespaces()),
+            {schema.MASTER_NAMESPACE, 'ns', 'new'},
+        )
+        assert not os.path.exists(
+            self.manager.manifest.get_file_name('new') + '.tmp',
+        )
+        container = self.manager.load()
+        assert_equal(self.mock_from_string.call_count, 2)
+        assert_equal(set(container.configs), {'MASTER', 'ns', 'new'})
+
+    def test_write_configs_invalid(self):
+        contents = {
+            'ns': self.namespace_content.replace('echo', 'ls'),
+            'new': self.namespace_content.replace('node0', 'node2'),
+        }
+        assert_raises(ConfigError, self.manager.write_configs, contents)
+        assert_equal(
+            self.manager.read_raw_config('ns'),
+            self.namespace_content,
+        )
+        assert 'new' not in self.manager
+
+    @mock.patch('tron.config.manager.read', autospec=True)
+    def test_manifest_cached(self, mock_read):
+        mock_read.side_effect = manager.read
+        assert 'ns' in self.manager
+        assert_equal(list(self.manager.get_namespaces()), ['MASTER', 'ns'])
+        self.manager.get_hash('ns')
+        assert_equal(mock_read.call_count, 0)
+
+
 class TestCreateNewConfig(TestCase):
     @mock.patch('tron.config.manager.os.makedirs', autospec=True)
     @mock.patch('tron.config.manager.ManifestFile', autospec=True)
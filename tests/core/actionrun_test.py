@@ -444,6 +444,17 @@ class TestSSHActionRun(TestCase):
         assert_equal(self.action_run.exit_status, -2)
         assert self.action_run.is_failed
 
+    @mock.patch('tron.core.actionrun.AdmissionController', autospec=True)
+    def test_stop_waiting_for_admission(self, mock_admission):
+        controller = mock_admission.get_instance.return_value
+        controller.is_waiting.return_value = True
+        self.action_run.machine.transition('start')
+        self.action_run.stop()
+        assert self.action_run.is_failed
+        assert_equal(self.action_run.exit_status, -3)
+        assert_equal(self.action_run.node.submit_command.call_count, 0)
+        controller.release.assert_called_with(self.action_run)
+
     @mock.patch('tron.core.actionrun.filehandler', autospec=True)
     def test_build_action_command(self, mock_filehandler):
         autospec_method(self.action_run.watch)
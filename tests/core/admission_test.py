@@ -0,0 +1,343 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+from unittest import mock
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup_teardown
+from testifycompat import TestCase
+from tron import metrics
+from tron.config import schema
+from tron.core import admission
+from tron.utils.dicts import FrozenDict
+
+
+def make_admission_config(**kwargs):
+    kwargs.setdefault('max_concurrent', None)
+    kwargs.setdefault('max_concurrent_per_node', None)
+    kwargs.setdefault('node_limits', FrozenDict())
+    kwargs.setdefault('node_pool_limits', FrozenDict())
+    kwargs.setdefault('namespace_limits', FrozenDict())
+    kwargs.setdefault('priority_aging_interval', 60)
+    return schema.ConfigAdmissionControl(**kwargs)
+
+
+def make_action_run(job_run_id='ns.job.1', node_name='node0', executor=None):
+    action_run = mock.Mock(job_run_id=job_run_id, executor=executor)
+    action_run.node.get_name.return_value = node_name
+    action_run.submit = mock.Mock(return_value=True)
+    return action_run
+
+
+class TestAdmissionController(TestCase):
+    @setup_teardown
+    def setup_controller(self):
+        admission.AdmissionController.reset()
+        metrics.clear()
+        self.controller = admission.AdmissionController.get_instance()
+        yield
+        admission.AdmissionController.reset()
+        metrics.clear()
+
+    def configure(self, node_pools=None, **kwargs):
+        self.controller.configure(
+            make_admission_config(**kwargs),
+            node_pools or {},
+        )
+
+    def request(self, action_run):
+        return self.controller.request(action_run, action_run.submit)
+
+    def test_request_no_limits(self):
+        self.configure()
+        runs = [make_action_run() for _ in range(5)]
+        for action_run in runs:
+            assert self.request(action_run)
+            assert_equal(action_run.submit.call_count, 1)
+        assert_equal(self.controller.queue_length, 0)
+
+    def test_request_returns_submit_result(self):
+        action_run = make_action_run()
+        action_run.submit.return_value = None
+        assert_equal(self.request(action_run), None)
+
+    def test_global_limit(self):
+        self.configure(max_concurrent=2)
+        runs = [make_action_run() for _ in range(3)]
+        for action_run in runs:
+            self.request(action_run)
+
+        assert_equal(runs[2].submit.call_count, 0)
+        assert self.controller.is_waiting(runs[2])
+
+        self.controller.release(runs[0])
+        assert_equal(runs[2].submit.call_count, 1)
+        assert not self.controller.is_waiting(runs[2])
+        assert self.controller.is_active(runs[2])
+
+    def test_per_node_limit(self):
+        self.configure(
+            max_concurrent_per_node=1,
+            node_limits=FrozenDict(node1=2),
+        )
+        runs = [
+            make_action_run(node_name='node0'),
+            make_action_run(node_name='node0'),
+            make_action_run(node_name='node1'),
+            make_action_run(node_name='node1'),
+        ]
+        for action_run in runs:
+            self.request(action_run)
+
+        assert_equal([r.submit.call_count for r in runs], [1, 0, 1, 1])
+
+    def test_node_pool_limit(self):
+        node_pools = {'pool': schema.ConfigNodePool(['node0', 'node1'], 'pool')}
+        self.configure(node_pools, node_pool_limits=FrozenDict(pool=1))
+        runs = [
+            make_action_run(node_name='node0'),
+            make_action_run(node_name='node1'),
+            make_action_run(node_name='node2'),
+        ]
+        for action_run in runs:
+            self.request(action_run)
+
+        assert_equal([r.submit.call_count for r in runs], [1, 0, 1])
+        self.controller.release(runs[0])
+        assert_equal(runs[1].submit.call_count, 1)
+
+    def test_node_limits_ignore_mesos(self):
+        self.configure(max_concurrent_per_node=1)
+        runs = [
+            make_action_run(executor=schema.ExecutorTypes.mesos)
+            for _ in range(2)
+        ]
+        for action_run in runs:
+            self.request(action_run)
+        assert_equal([r.submit.call_count for r in runs], [1, 1])
+
+    def test_namespace_limit(self):
+        self.configure(namespace_limits=FrozenDict(ns=1))
+        runs = [
+            make_action_run('ns.job.1'),
+            make_action_run('ns.job.2'),
+            make_action_run('other.job.1'),
+        ]
+        for action_run in runs:
+            self.request(action_run)
+        assert_equal([r.submit.call_count for r in runs], [1, 0, 1])
+
+    def test_fair_queue_round_robin(self):
+        self.configure(max_concurrent=1)
+        blocker = make_action_run('blocker.job.1')
+        self.request(blocker)
+        busy = [make_action_run('busy.job.%d' % i) for i in range(3)]
+        quiet = make_action_run('quiet.job.1')
+        for action_run in busy + [quiet]:
+            self.request(action_run)
+
+        self.controller.release(blocker)
+        assert_equal(busy[0].submit.call_count, 1)
+        self.controller.release(busy[0])
+        assert_equal(quiet.submit.call_count, 1)
+        assert_equal(busy[1].submit.call_count, 0)
+        self.controller.release(quiet)
+        assert_equal(busy[1].submit.call_count, 1)
+
+    def test_queue_skips_blocked_namespace(self):
+        self.configure(max_concurrent=2, namespace_limits=FrozenDict(a=1))
+        first = make_action_run('a.job.1')
+        self.request(first)
+        blocked = make_action_run('a.job.2')
+        self.request(blocked)
+        other = make_action_run('b.job.1')
+        self.request(other)
+
+        assert_equal(blocked.submit.call_count, 0)
+        assert_equal(other.submit.call_count, 1)
+
+    def test_release_waiting_run(self):
+        self.configure(max_concurrent=1)
+        first, second = make_action_run(), make_action_run()
+        self.request(first)
+        self.request(second)
+        self.controller.release(second)
+        assert not self.controller.is_waiting(second)
+        self.controller.release(first)
+        assert_equal(second.submit.call_count, 0)
+
+    def test_release_unknown_run(self):
+        self.controller.release(make_action_run())
+        assert_equal(self.controller.queue_length, 0)
+
+    def test_reconfigure_raises_limit(self):
+        self.configure(max_concurrent=1)
+        first, second = make_action_run(), make_action_run()
+        self.request(first)
+        self.request(second)
+        self.configure(max_concurrent=2)
+        assert_equal(second.submit.call_count, 1)
+
+    def test_release_during_submit(self):
+        self.configure(max_concurrent=1)
+        first, second, third = [make_action_run() for _ in range(3)]
+        self.request(first)
+        self.request(second)
+        self.request(third)
+
+        def fail_submit():
+            self.controller.release(second)
+
+        second.submit.side_effect = fail_submit
+        self.controller.release(first)
+        assert_equal(third.submit.call_count, 1)
+        assert self.controller.is_active(third)
+
+    @mock.patch('tron.core.admission.timeutils', autospec=True)
+    def test_queue_wait_metrics(self, mock_timeutils):
+        mock_timeutils.current_timestamp.return_value = 10
+        self.configure(max_concurrent=1)
+        first, second = make_action_run(), make_action_run()
+        self.request(first)
+        self.request(second)
+        mock_timeutils.current_timestamp.return_value = 15
+        self.controller.release(first)
+
+        queue_wait = metrics.get_metric('timer', 'admission.queue_wait')
+        assert_equal(queue_wait.count, 1)
+        assert_equal(queue_wait.max, 5)
+        assert_equal(metrics.get_metric('counter', 'admission.queued').value, 1)
+
+
+class TestAdmissionControllerPriority(TestCase):
+    @setup_teardown
+    def setup_controller(self):
+        admission.AdmissionController.reset()
+        self.controller = admission.AdmissionController.get_instance()
+        self.controller.configure(
+            make_admission_config(max_concurrent=1, priority_aging_interval=10),
+        )
+        self.controller.update_job_priorities({
+            'ns.low': mock.Mock(priority=0),
+            'ns.high': mock.Mock(priority=5),
+        })
+        with mock.patch(
+            'tron.core.admission.timeutils',
+            autospec=True,
+        ) as self.mock_timeutils:
+            self.mock_timeutils.current_timestamp.return_value = 0
+            self.blocker = make_action_run('other.job.1')
+            self.request(self.blocker)
+            yield
+        admission.AdmissionController.reset()
+
+    def request(self, action_run):
+        return self.controller.request(action_run, action_run.submit)
+
+    def test_higher_priority_admitted_first(self):
+        low = make_action_run('ns.low.1')
+        high = make_action_run('ns.high.1')
+        self.request(low)
+        self.request(high)
+        assert_equal(self.controller.get_queue_position(high), 0)
+        assert_equal(self.controller.get_queue_position(low), 1)
+
+        self.controller.release(self.blocker)
+        assert_equal(high.submit.call_count, 1)
+        assert_equal(low.submit.call_count, 0)
+
+    def test_priority_aging(self):
+        low = make_action_run('ns.low.1')
+        self.request(low)
+        self.mock_timeutils.current_timestamp.return_value = 60
+        high = make_action_run('ns.high.1')
+        self.request(high)
+        assert_equal(self.controller.get_priority(self.controller.waiting[low], 60), 6)
+
+        self.controller.release(self.blocker)
+        assert_equal(low.submit.call_count, 1)
+        assert_equal(high.submit.call_count, 0)
+
+    def test_priority_without_aging(self):
+        self.controller.aging_interval = 0
+        low = make_action_run('ns.low.1')
+        self.request(low)
+        self.mock_timeutils.current_timestamp.return_value = 6000
+        high = make_action_run('ns.high.1')
+        self.request(high)
+        self.controller.release(self.blocker)
+        assert_equal(high.submit.call_count, 1)
+
+    def test_get_queue_position_not_waiting(self):
+        assert_equal(self.controller.get_queue_position(self.blocker), None)
+
+    def test_reconfigure_priorities(self):
+        first = make_action_run('ns.other.1')
+        second = make_action_run('ns.low.1')
+        self.request(first)
+        self.request(second)
+        self.controller.update_job_priorities({'ns.low': mock.Mock(priority=1)})
+        assert_equal(self.controller.get_queue_position(second), 0)
+
+    def test_dispatch_orders_once(self):
+        self.controller.configure(
+            make_admission_config(max_concurrent=3, priority_aging_interval=10),
+        )
+        runs = [make_action_run('ns.low.%d' % i) for i in range(5)]
+        for action_run in runs:
+            self.request(action_run)
+        get_ordered_tickets = self.controller.get_ordered_tickets
+        with mock.patch.object(
+            self.controller,
+            'get_ordered_tickets',
+            autospec=True,
+            side_effect=get_ordered_tickets,
+        ) as mock_ordered:
+            self.controller.release(self.blocker)
+        assert_equal(mock_ordered.call_count, 1)
+        assert_equal([r.submit.call_count for r in runs], [1, 1, 1, 0, 0])
+
+    def test_get_queue_position_cached(self):
+        runs = [make_action_run('ns.low.%d' % i) for i in range(3)]
+        for action_run in runs:
+            self.request(action_run)
+        get_ordered_tickets = self.controller.get_ordered_tickets
+        with mock.patch.object(
+            self.controller,
+            'get_ordered_tickets',
+            autospec=True,
+            side_effect=get_ordered_tickets,
+        ) as mock_ordered:
+            positions = [
+                self.controller.get_queue_position(action_run)
+                for action_run in runs
+            ]
+            assert_equal(mock_ordered.call_count, 1)
+
+            self.mock_timeutils.current_timestamp.return_value = 1
+            self.controller.get_queue_position(runs[0])
+            assert_equal(mock_ordered.call_count, 2)
+        assert_equal(positions, [0, 1, 2])
+
+    def test_list_queue_waits_for_lock(self):
+        action_run = make_action_run('ns.low.1')
+        self.request(action_run)
+        positions = []
+
+        def list_queue():
+            positions.append(self.controller.get_queue_position(action_run))
+
+        # The reactor is changing the queue
+        with self.controller.lock:
+            thread = threading.Thread(target=list_queue)
+            thread.start()
+            thread.join(0.05)
+            assert thread.is_alive()
+        thread.join()
+        assert_equal(positions, [0])
+
+
+if __name__ == "__main__":
+    run()
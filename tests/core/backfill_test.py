@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+
+import mock
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup_teardown
+from testifycompat import TestCase
+from tron.core import backfill
+from tron.core.actionrun import ActionRun
+from tron.core.backfill import Backfill
+from tron.core.job import Job
+from tron.core.jobrun import JobRun
+
+
+class TestGetDates(TestCase):
+    def test_get_dates(self):
+        dates = backfill.get_dates(
+            datetime.datetime(2018, 2, 27, 5, 0),
+            datetime.datetime(2018, 3, 2, 1, 0),
+        )
+        assert_equal(
+            dates, [
+                datetime.datetime(2018, 2, 27),
+                datetime.datetime(2018, 2, 28),
+                datetime.datetime(2018, 3, 1),
+                datetime.datetime(2018, 3, 2),
+            ]
+        )
+
+
+class TestBackfill(TestCase):
+    @setup_teardown
+    def setup_backfill(self):
+        self.job = mock.Mock(allow_overlap=True)
+        self.job.get_name.return_value = 'MASTER.job'
+        self.job.runs.get_active.return_value = []
+        self.job.runs.runs = []
+        self.job_scheduler = mock.Mock()
+        self.job_scheduler.get_job.return_value = self.job
+        self.job_scheduler.manual_start.side_effect = self.manual_start
+        self.run_times = backfill.get_dates(
+            datetime.datetime(2018, 3, 1),
+            datetime.datetime(2018, 3, 4),
+        )
+        self.backfill = Backfill(1, self.job_scheduler, self.run_times, 2)
+        with mock.patch(
+            'tron.core.backfill.reactor',
+            autospec=True,
+        ) as self.reactor:
+            yield
+
+    def manual_start(self, run_time):
+        job_run = mock.Mock(
+            id='MASTER.job.%d' % len(self.job.runs.runs),
+            run_time=run_time,
+            state=ActionRun.RUNNING,
+        )
+        self.job.runs.runs.append(job_run)
+        return [job_run]
+
+    def finish(self, index, state=ActionRun.SUCCEEDED):
+        job_run = self.job.runs.runs[index]
+        job_run.state = state
+        self.backfill.handler(job_run, JobRun.NOTIFY_DONE)
+        self.backfill.handler(self.job, Job.NOTIFY_RUN_DONE)
+        self.backfill.fill()
+
+    def get_started(self):
+        return [
+            call[1]['run_time']
+            for call in self.job_scheduler.manual_start.call_args_list
+        ]
+
+    def test_start(self):
+        self.backfill.start()
+        self.job.attach.assert_called_with(Job.NOTIFY_RUN_DONE, self.backfill)
+        assert_equal(self.get_started(), self.run_times[:2])
+        assert_equal(self.backfill.state, Backfill.RUNNING)
+
+    def test_fill_as_runs_finish(self):
+        self.backfill.start()
+        self.finish(1)
+        assert_equal(self.get_started(), self.run_times[:3])
+        self.reactor.callLater.assert_called_with(0, self.backfill.fill)
+
+        self.finish(0, ActionRun.FAILED)
+        self.finish(2)
+        self.finish(3)
+        assert_equal(self.get_started(), self.run_times)
+        progress = self.backfill.get_progress()
+        assert_equal(progress['state'], Backfill.FAILED)
+        assert_equal(progress['succeeded'], 3)
+        assert_equal(progress['failed'], 1)
+        assert_equal(progress['runs'], ['MASTER.job.%d' % i for i in range(4)])
+        self.job.remove_observer.assert_called_with(self.backfill)
+
+    def test_fill_without_overlap(self):
+        self.job.allow_overlap = False
+        self.job.runs.get_active.return_value = [mock.Mock()]
+        self.backfill.start()
+        assert_equal(self.get_started(), [])
+
+        self.job.runs.get_active.return_value = []
+        self.backfill.fill()
+        assert_equal(self.get_started(), self.run_times[:1])
+        self.finish(0)
+        assert_equal(self.get_started(), self.run_times[:2])
+
+    def test_fill_no_runs(self):
+        self.job_scheduler.manual_start.side_effect = None
+        self.job_scheduler.manual_start.return_value = []
+        self.backfill.start()
+        assert_equal(self.get_started(), self.run_times)
+        assert_equal(self.backfill.state, Backfill.FAILED)
+
+    def test_cancel(self):
+        self.backfill.start()
+        assert self.backfill.cancel()
+        for job_run in self.job.runs.runs:
+            job_run.cancel.assert_called_with()
+        assert_equal(self.backfill.state, Backfill.RUNNING)
+
+        self.finish(0)
+        self.finish(1, ActionRun.CANCELLED)
+        assert_equal(self.get_started(), self.run_times[:2])
+        progress = self.backfill.get_progress()
+        assert_equal(progress['state'], Backfill.CANCELLED)
+        assert_equal(progress['cancelled'], 2)
+        assert not self.backfill.cancel()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+
+import mock
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup_teardown
+from testifycompat import TestCase
+from tron import scheduler
+from tron.config import schema
+from tron.core import catch_up
+from tron.core.catch_up import CatchUpPolicy
+
+NOW = datetime.datetime(2018, 1, 1, 12)
+
+
+def build_interval(minutes):
+    return scheduler.IntervalScheduler(
+        datetime.timedelta(minutes=minutes),
+        None,
+        None,
+    )
+
+
+class TestCatchUpPolicy(TestCase):
+    @setup_teardown
+    def setup_policy(self):
+        CatchUpPolicy.reset()
+        self.policy = CatchUpPolicy.get_instance()
+        with mock.patch(
+            'tron.utils.timeutils.current_time',
+            autospec=True,
+            return_value=NOW,
+        ):
+            yield
+        CatchUpPolicy.reset()
+
+    def configure(self, max_starts_per_second=None, collapse=False):
+        CatchUpPolicy.configure(
+            schema.ConfigCatchUp(
+                max_starts_per_second=max_starts_per_second,
+                collapse_missed_runs=collapse,
+            ),
+        )
+
+    def test_should_skip_default(self):
+        run_time = NOW - datetime.timedelta(days=3)
+        assert not self.policy.should_skip(build_interval(5), run_time)
+
+    def test_should_skip_older_than(self):
+        limit = datetime.timedelta(minutes=30)
+        interval = build_interval(5)
+        old = NOW - datetime.timedelta(minutes=31)
+        recent = NOW - datetime.timedelta(minutes=29)
+        assert self.policy.should_skip(interval, old, limit)
+        assert not self.policy.should_skip(interval, recent, limit)
+
+    def test_should_skip_collapse(self):
+        self.configure(collapse=True)
+        interval = build_interval(5)
+        assert self.policy.should_skip(
+            interval,
+            NOW - datetime.timedelta(minutes=6),
+        )
+        assert not self.policy.should_skip(
+            interval,
+            NOW - datetime.timedelta(minutes=4),
+        )
+
+    def test_should_skip_future_run(self):
+        self.configure(collapse=True)
+        run_time = NOW + datetime.timedelta(minutes=1)
+        assert not self.policy.should_skip(build_interval(5), run_time, 0)
+
+    def test_get_next_run_time_collapse(self):
+        self.configure(collapse=True)
+        last_run_time = NOW - datetime.timedelta(hours=3)
+        next_run_time = self.policy.get_next_run_time(
+            build_interval(7),
+            last_run_time,
+            None,
+        )
+        assert_equal(next_run_time, datetime.datetime(2018, 1, 1, 11, 55))
+
+    def test_get_next_run_time_skip_older_than(self):
+        last_run_time = NOW - datetime.timedelta(hours=3)
+        next_run_time = self.policy.get_next_run_time(
+            build_interval(7),
+            last_run_time,
+            datetime.timedelta(minutes=30),
+        )
+        assert_equal(next_run_time, datetime.datetime(2018, 1, 1, 11, 34))
+
+    def test_get_next_run_time_no_policy(self):
+        last_run_time = NOW - datetime.timedelta(hours=3)
+        next_run_time = self.policy.get_next_run_time(
+            build_interval(7),
+            last_run_time,
+            None,
+        )
+        assert_equal(next_run_time, datetime.datetime(2018, 1, 1, 9, 7))
+
+    def test_get_next_run_time_constant(self):
+        self.configure(collapse=True)
+        next_run_time = self.policy.get_next_run_time(
+            scheduler.ConstantScheduler(),
+            NOW - datetime.timedelta(hours=3),
+            None,
+        )
+        assert_equal(next_run_time, NOW)
+
+    def test_should_delay(self):
+        missed = NOW - datetime.timedelta(seconds=catch_up.MISSED_RUN_THRESHOLD + 1)
+        assert not self.policy.should_delay(missed)
+        self.configure(max_starts_per_second=2)
+        assert self.policy.should_delay(missed)
+        assert not self.policy.should_delay(NOW)
+
+    def test_get_start_delay(self):
+        self.configure(max_starts_per_second=4)
+        delays = [self.policy.get_start_delay() for _ in range(4)]
+        assert_equal(delays, [0, 0.25, 0.5, 0.75])
+
+
+if __name__ == "__main__":
+    run()
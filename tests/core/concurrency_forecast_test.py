@@ -0,0 +1,238 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+
+import mock
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup
+from testifycompat import TestCase
+from tron import scheduler
+from tron.config.schema import CLEANUP_ACTION_NAME
+from tron.config.schema import ExecutorTypes
+from tron.core import concurrency_forecast
+from tron.core.action import Action
+from tron.core.concurrency_forecast import ConcurrencyForecast
+from tron.core.job import Job
+
+
+def build_pool(name):
+    node_pool = mock.Mock()
+    node_pool.get_name.return_value = name
+    return node_pool
+
+
+def build_action(name, minutes, required=(), node_pool=None, **kwargs):
+    action = Action(
+        name,
+        'command',
+        node_pool,
+        expected_runtime=datetime.timedelta(minutes=minutes),
+        **kwargs
+    )
+    action.required_actions = list(required)
+    return action
+
+
+def build_action_run(name, minutes, succeeded=True):
+    start_time = datetime.datetime(2018, 3, 1, 0, 0)
+    return mock.Mock(
+        action_name=name,
+        is_succeeded=succeeded,
+        start_time=start_time,
+        end_time=start_time + datetime.timedelta(minutes=minutes),
+    )
+
+
+def build_job(name, actions, hour=0, history=(), node_pool='pool'):
+    job_scheduler = scheduler.GeneralScheduler(
+        hours=[hour],
+        minutes=[0],
+        seconds=[0],
+    )
+    job = mock.Mock(
+        scheduler=job_scheduler,
+        enabled=True,
+        node_pool=build_pool(node_pool),
+    )
+    job.get_name.return_value = name
+    job.action_graph.get_action_map.return_value = {
+        action.name: action
+        for action in actions
+    }
+    job.runs.runs = [mock.Mock(action_runs=runs) for runs in history]
+    job.runs.get_scheduled.return_value = []
+    return job
+
+
+class TestGetActionDurations(TestCase):
+    def test_get_action_durations(self):
+        history = [
+            [build_action_run('a', 10), build_action_run('b', 5)],
+            [build_action_run('a', 20), build_action_run('b', 50, False)],
+            [build_action_run('a', 40)],
+            None,
+        ]
+        job = build_job('MASTER.job', [], history=history)
+        assert_equal(
+            concurrency_forecast.get_action_durations(job),
+            {'a': 1200, 'b': 300},
+        )
+
+
+class TestGetActionWindows(TestCase):
+    def test_get_action_windows(self):
+        first = build_action('first', 10)
+        other_pool = build_pool('other')
+        second = build_action('second', 20, [first], other_pool)
+        third = build_action(
+            'third',
+            5,
+            [first],
+            executor=ExecutorTypes.mesos,
+        )
+        cleanup = build_action(CLEANUP_ACTION_NAME, 1)
+        job = build_job('MASTER.job', [cleanup, third, second, first])
+        windows = concurrency_forecast.get_action_windows(job, {'first': 30})
+        assert_equal(
+            sorted(windows), [
+                ('mesos', 30, 330),
+                ('other', 30, 1230),
+                ('pool', 0, 30),
+                ('pool', 1230, 1290),
+            ]
+        )
+
+
+class TestConcurrencyForecast(TestCase):
+    @setup
+    def setup_forecast(self):
+        self.forecast = ConcurrencyForecast()
+        self.start_time = datetime.datetime(2018, 3, 4, 0, 30)
+        self.horizon = datetime.timedelta(hours=6)
+        self.bucket_size = 3600
+        first = build_action('first', 90)
+        self.jobs = [
+            build_job('MASTER.one', [first], hour=2),
+            build_job(
+                'MASTER.two',
+                [first, build_action('second', 60, [first])],
+                hour=1,
+            ),
+            # Started before the forecast, and still running
+            build_job('MASTER.three', [build_action('long', 180)], hour=23),
+        ]
+
+    def test_build(self):
+        result = self.forecast.build(
+            self.jobs,
+            self.start_time,
+            self.horizon,
+            self.bucket_size,
+            {'pool': 2},
+        )
+        assert_equal(result['start'], datetime.datetime(2018, 3, 4, 0, 0))
+        assert_equal(result['horizon'], 6 * 3600)
+        pool = result['pools']['pool']
+        assert_equal(pool['running'], [1, 2, 3, 2, 0, 0, 0])
+        assert_equal(pool['peak'], 3)
+        assert_equal(pool['limit'], 2)
+        assert_equal(
+            pool['overloaded'],
+            [datetime.datetime(2018, 3, 4, 2, 0)],
+        )
+        assert_equal(
+            pool['busiest'][0],
+            {'time': datetime.datetime(2018, 3, 4, 2, 0), 'running': 3},
+        )
+
+    def test_build_disabled_job(self):
+        self.jobs[0].enabled = False
+        result = self.forecast.build(
+            self.jobs,
+            self.start_time,
+            self.horizon,
+            self.bucket_size,
+        )
+        pool = result['pools']['pool']
+        assert_equal(pool['running'], [1, 2, 2, 1, 0, 0, 0])
+        assert 'overloaded' not in pool
+
+    def test_get_forecast_cached(self):
+        with mock.patch.object(
+            self.forecast,
+            'build',
+            autospec=True,
+        ) as mock_build:
+            first = self.forecast.get_forecast(self.jobs, self.start_time)
+            later = self.start_time + datetime.timedelta(seconds=10)
+            assert_equal(self.forecast.get_forecast(self.jobs, later), first)
+            assert_equal(mock_build.call_count, 1)
+
+            self.forecast.configure([], [])
+            self.forecast.get_forecast(self.jobs, later)
+            later += datetime.timedelta(hours=1)
+            self.forecast.get_forecast(self.jobs, later)
+            assert_equal(mock_build.call_count, 3)
+
+    def test_get_forecast_uses_durations(self):
+        self.forecast.configure(self.jobs, [job.get_name() for job in self.jobs])
+        self.jobs[2].runs.runs = None
+        result = self.forecast.get_forecast(
+            self.jobs,
+            self.start_time,
+            self.horizon,
+            self.bucket_size,
+        )
+        assert_equal(result['pools']['pool']['running'], [1, 2, 3, 2, 0, 0, 0])
+
+    def test_handler_updates_durations(self):
+        self.forecast.configure(self.jobs, [job.get_name() for job in self.jobs])
+        job = self.jobs[0]
+        job.runs.runs = [mock.Mock(action_runs=[build_action_run('first', 30)])]
+        self.forecast.handler(job, Job.NOTIFY_RUN_DONE)
+        assert_equal(self.forecast.durations['MASTER.one'], {'first': 1800})
+
+        self.forecast.configure([], ['MASTER.two'])
+        assert_equal(set(self.forecast.durations), {'MASTER.two'})
+
+    def test_get_forecast_not_cached_after_configure(self):
+        def build(*args):
+            self.forecast.configure([], [])
+            return {}
+
+        with mock.patch.object(
+            self.forecast,
+            'build',
+            autospec=True,
+            side_effect=build,
+        ):
+            self.forecast.get_forecast(self.jobs, self.start_time)
+        assert_equal(self.forecast.cached, None)
+
+    def test_get_forecast_max_horizon(self):
+        result = self.forecast.get_forecast(
+            self.jobs,
+            self.start_time,
+            datetime.timedelta(days=365),
+            self.bucket_size,
+        )
+        assert_equal(
+            result['horizon'],
+            concurrency_forecast.MAX_HORIZON.total_seconds(),
+        )
+
+    def test_get_forecast_max_buckets(self):
+        result = self.forecast.get_forecast(
+            self.jobs,
+            self.start_time,
+            concurrency_forecast.MAX_HORIZON,
+            bucket_size=1,
+        )
+        assert_equal(result['bucket_size'], 61)
+
+
+if __name__ == "__main__":
+    run()
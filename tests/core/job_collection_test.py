@@ -1,6 +1,7 @@
 import mock
 import six
 
+from testifycompat import assert_equal
 from testifycompat import setup
 from testifycompat import TestCase
 from tests.assertions import assert_length
@@ -35,6 +36,56 @@ class TestJobCollection(TestCase):
             job_scheduler.schedule.assert_called_with()
             job_scheduler.get_job.assert_called_with()
 
+    def build_factory(self):
+        def build(config):
+            job_scheduler = mock.create_autospec(JobScheduler)
+            job_scheduler.get_name.return_value = config.job_name
+            return job_scheduler
+
+        factory = mock.create_autospec(JobSchedulerFactory)
+        factory.build.side_effect = build
+        factory.get_fingerprint.side_effect = lambda config: config.value
+        return factory
+
+    def test_load_from_config_skips_unchanged(self):
+        factory = self.build_factory()
+        job_configs = {
+            name: mock.Mock(job_name=name, value=value)
+            for name, value in [('a', 1), ('b', 2), ('c', 3)]
+        }
+        list(self.collection.load_from_config(job_configs, factory, False))
+        assert_equal(factory.build.call_count, 3)
+        assert_equal(self.collection.fingerprints, {'a': 1, 'b': 2, 'c': 3})
+
+        factory.build.reset_mock()
+        changed_configs = {
+            'a': mock.Mock(job_name='a', value=1),
+            'b': mock.Mock(job_name='b', value=4),
+        }
+        list(self.collection.load_from_config(changed_configs, factory, False))
+        factory.build.assert_called_once_with(changed_configs['b'])
+        assert_equal(self.collection.fingerprints, {'a': 1, 'b': 4})
+
+    def test_load_from_config_known_unchanged(self):
+        factory = self.build_factory()
+        job_configs = {
+            name: mock.Mock(job_name=name, value=name)
+            for name in ['a', 'b']
+        }
+        list(self.collection.load_from_config(job_configs, factory, False))
+        factory.build.reset_mock()
+        factory.get_fingerprint.reset_mock()
+
+        result = self.collection.load_from_config(
+            job_configs,
+            factory,
+            False,
+            unchanged={'a', 'b', 'c'},
+        )
+        assert_equal(list(result), [])
+        assert_equal(factory.get_fingerprint.call_count, 0)
+        assert_equal(factory.build.call_count, 0)
+
     def test_update(self):
         mock_scheduler = mock.create_autospec(JobScheduler)
         existing_scheduler = mock.create_autospec(JobScheduler)
@@ -50,3 +101,18 @@ class TestJobCollection(TestCase):
             mock_scheduler.get_job.return_value,
         )
         existing_scheduler.schedule_reconfigured.assert_called_with()
+
+    def test_get_restore_order(self):
+        restore_times = {'a': 30, 'b': 10, 'c': 20, 'd': 10}
+        for name, restore_time in restore_times.items():
+            job_scheduler = mock.create_autospec(JobScheduler)
+            job_scheduler.get_restore_time.return_value = restore_time
+            self.collection.jobs[name] = job_scheduler
+
+        job_state_data = {'a': mock.Mock()}
+        order = self.collection.get_restore_order(job_state_data)
+        assert_equal(order, ['b', 'd', 'c', 'a'])
+        self.collection.jobs['a'].get_restore_time.assert_called_with(
+            job_state_data['a'],
+        )
+        self.collection.jobs['b'].get_restore_time.assert_called_with(None)
@@ -3,13 +3,19 @@ import datetime
 import mock
 
 from testifycompat import assert_equal
+from testifycompat import assert_not_equal
 from testifycompat import setup
+from testifycompat import setup_teardown
 from testifycompat import TestCase
 from tests import testingutils
 from tests.assertions import assert_length
 from tron import actioncommand
+from tron import scheduler
+from tron.config import schema
 from tron.core import job
+from tron.core import jobrun
 from tron.core.actionrun import ActionRun
+from tron.core.catch_up import CatchUpPolicy
 from tron.core.job_scheduler import JobScheduler
 from tron.core.job_scheduler import JobSchedulerFactory
 
@@ -124,6 +130,223 @@ class JobSchedulerManualStartTestCase(testingutils.MockTimeTestCase):
         self.manual_run.start.assert_called_once_with()
 
 
+class TestJobSchedulerBackfill(TestCase):
+    @setup
+    def setup_job(self):
+        self.job = mock.Mock()
+        self.job_scheduler = JobScheduler(self.job)
+        self.start_date = datetime.datetime(2018, 3, 1)
+        self.end_date = datetime.datetime(2018, 3, 3)
+
+    def test_backfill(self):
+        with mock.patch(
+            'tron.core.job_scheduler.backfill.Backfill',
+            autospec=True,
+        ) as mock_backfill:
+            job_backfill = self.job_scheduler.backfill(
+                self.start_date,
+                self.end_date,
+                max_in_flight=2,
+            )
+        assert_equal(job_backfill, mock_backfill.return_value)
+        run_times = mock_backfill.call_args[0][2]
+        assert_equal(run_times[0], self.start_date)
+        assert_length(run_times, 3)
+        mock_backfill.assert_called_with(1, self.job_scheduler, run_times, 2)
+        job_backfill.start.assert_called_with()
+        assert_equal(self.job_scheduler.backfills, [job_backfill])
+
+    def test_backfill_history(self):
+        with mock.patch(
+            'tron.core.job_scheduler.backfill.MAX_BACKFILL_HISTORY',
+            2,
+            autospec=None,
+        ), mock.patch(
+            'tron.core.job_scheduler.backfill.Backfill.start',
+            autospec=True,
+        ):
+            backfills = [
+                self.job_scheduler.backfill(self.start_date, self.end_date)
+                for _ in range(4)
+            ]
+            for job_backfill in backfills:
+                job_backfill.pending.clear()
+            self.job_scheduler.backfill(self.start_date, self.end_date)
+        assert_equal(
+            [item.num for item in self.job_scheduler.backfills],
+            [3, 4, 5],
+        )
+        assert_equal(self.job_scheduler.get_backfill(4), backfills[3])
+        assert_equal(self.job_scheduler.get_backfill(1), None)
+
+    def test_cancel_backfills(self):
+        backfills = [mock.Mock(), mock.Mock()]
+        backfills[0].cancel.return_value = False
+        self.job_scheduler.backfills = backfills
+        assert_equal(self.job_scheduler.cancel_backfills(), backfills[1:])
+
+
+class TestJobSchedulerGetRestoreTime(TestCase):
+    @setup
+    def setup_job(self):
+        self.scheduler = mock.Mock()
+        self.scheduler.next_run_time.return_value = datetime.datetime(
+            2018, 1, 1, 12,
+        )
+        self.job = job.Job("jobname", self.scheduler)
+        self.job_scheduler = JobScheduler(self.job)
+
+    def build_run(self, hour, *states):
+        return {
+            'run_time': datetime.datetime(2018, 1, 1, hour),
+            'runs': [{'state': state} for state in states],
+        }
+
+    def test_no_state(self):
+        expected = datetime.datetime(2018, 1, 1, 12).timestamp()
+        assert_equal(self.job_scheduler.get_restore_time(None), expected)
+        self.scheduler.next_run_time.assert_called_once_with(None)
+
+    def test_earliest_unfinished_run(self):
+        state_data = {
+            'enabled': True,
+            'runs': [
+                self.build_run(5, ActionRun.SUCCEEDED),
+                self.build_run(7, ActionRun.SUCCEEDED, ActionRun.RUNNING),
+                self.build_run(9, ActionRun.SCHEDULED),
+            ],
+        }
+        expected = datetime.datetime(2018, 1, 1, 7).timestamp()
+        assert_equal(self.job_scheduler.get_restore_time(state_data), expected)
+
+    def test_all_runs_finished(self):
+        state_data = {
+            'enabled': True,
+            'runs': [self.build_run(5, ActionRun.FAILED)],
+        }
+        expected = datetime.datetime(2018, 1, 1, 12).timestamp()
+        assert_equal(self.job_scheduler.get_restore_time(state_data), expected)
+
+    def test_disabled(self):
+        state_data = {'enabled': False, 'runs': []}
+        assert_equal(
+            self.job_scheduler.get_restore_time(state_data),
+            float('inf'),
+        )
+
+
+class TestJobSchedulerCatchUp(TestCase):
+    """Restore jobs after trond was down for three hours."""
+
+    now = datetime.datetime(2018, 1, 1, 12)
+
+    @setup_teardown
+    def setup_jobs(self):
+        CatchUpPolicy.reset()
+        with mock.patch(
+            'tron.utils.timeutils.current_time',
+            autospec=True,
+            return_value=self.now,
+        ), mock.patch(
+            'tron.core.job_scheduler.reactor',
+            autospec=True,
+        ) as self.reactor, mock.patch(
+            'tron.core.job_scheduler.recovery',
+            autospec=True,
+        ):
+            yield
+        CatchUpPolicy.reset()
+
+    def configure(self, max_starts_per_second=None, collapse=False):
+        CatchUpPolicy.configure(
+            schema.ConfigCatchUp(
+                max_starts_per_second=max_starts_per_second,
+                collapse_missed_runs=collapse,
+            ),
+        )
+
+    def build_job_scheduler(self, skip_if_older_than=None):
+        """Build a job with a scheduled run which was missed."""
+        # JobRun proxies cancel() to its action runs, so it can't be autospec
+        missed_run = mock.Mock(run_time=self.now - datetime.timedelta(hours=3))
+        missed_run.seconds_until_run_time.return_value = 0
+        run_collection = mock.create_autospec(
+            jobrun.JobRunCollection,
+            runs=[],
+            has_pending=False,
+        )
+        run_collection.get_scheduled.return_value = [missed_run]
+        run_collection.get_newest.return_value = missed_run
+        interval = scheduler.IntervalScheduler(
+            datetime.timedelta(minutes=7),
+            None,
+            None,
+        )
+        job_scheduler = JobScheduler(
+            job.Job(
+                "jobname",
+                interval,
+                run_collection=run_collection,
+                skip_if_older_than=skip_if_older_than,
+            ),
+        )
+        testingutils.autospec_method(
+            job_scheduler.job.get_job_runs_from_state,
+            return_value=[],
+        )
+        testingutils.autospec_method(
+            job_scheduler.job.build_new_runs,
+            return_value=[],
+        )
+        return job_scheduler, missed_run
+
+    def restore(self, job_scheduler):
+        job_scheduler.restore_state({'runs': [], 'enabled': True}, None)
+
+    def get_scheduled_run_time(self, job_scheduler):
+        return job_scheduler.job.build_new_runs.call_args[0][0]
+
+    def test_default_runs_every_missed_interval(self):
+        job_scheduler, missed_run = self.build_job_scheduler()
+        self.restore(job_scheduler)
+        assert not missed_run.cancel.mock_calls
+        self.reactor.callLater.assert_called_once_with(
+            0,
+            job_scheduler.run_job,
+            missed_run,
+        )
+
+    def test_collapse_missed_runs(self):
+        self.configure(collapse=True)
+        job_scheduler, missed_run = self.build_job_scheduler()
+        self.restore(job_scheduler)
+        missed_run.cancel.assert_called_once_with()
+        assert_equal(
+            self.get_scheduled_run_time(job_scheduler),
+            datetime.datetime(2018, 1, 1, 11, 55),
+        )
+
+    def test_skip_if_older_than(self):
+        job_scheduler, missed_run = self.build_job_scheduler(
+            skip_if_older_than=datetime.timedelta(minutes=30),
+        )
+        self.restore(job_scheduler)
+        missed_run.cancel.assert_called_once_with()
+        assert_equal(
+            self.get_scheduled_run_time(job_scheduler),
+            datetime.datetime(2018, 1, 1, 11, 34),
+        )
+
+    def test_max_starts_per_second(self):
+        self.configure(max_starts_per_second=2)
+        job_schedulers = [self.build_job_scheduler()[0] for _ in range(4)]
+        for job_scheduler in job_schedulers:
+            self.restore(job_scheduler)
+
+        delays = [c[0][0] for c in self.reactor.callLater.call_args_list]
+        assert_equal(delays, [0, 0.5, 1.0, 1.5])
+
+
 class TestJobSchedulerSchedule(TestCase):
     @setup
     def setup_job(self):
@@ -271,3 +494,42 @@ class TestJobSchedulerFactory(TestCase):
             assert_equal(kwargs['parent_context'], self.context)
             assert_equal(kwargs['output_path'].base, self.output_stream_dir)
             assert_equal(kwargs['action_runner'], self.action_runner)
+
+    def test_build_with_schedule_offset(self):
+        config = mock.Mock()
+        config.name = 'MASTER.job'
+        offset = datetime.timedelta(seconds=30)
+        self.factory.schedule_offsets = {'MASTER.job': offset}
+        with mock.patch(
+            'tron.core.job_scheduler.scheduler_from_config',
+            autospec=True,
+        ) as mock_scheduler_from_config, mock.patch(
+            'tron.core.job_scheduler.Job',
+            autospec=True,
+        ) as mock_job:
+            self.factory.build(config)
+            _, kwargs = mock_job.from_config.call_args
+            scheduler = mock_scheduler_from_config.return_value
+            assert_equal(kwargs['scheduler'], scheduler)
+            assert_equal(scheduler.offset, offset)
+
+    def test_get_fingerprint(self):
+        config = schema.ConfigJob(
+            name='MASTER.job',
+            node='node',
+            schedule=None,
+            actions={},
+            namespace='MASTER',
+        )
+        fingerprint = self.factory.get_fingerprint(config)
+        assert_equal(self.factory.get_fingerprint(config), fingerprint)
+
+        self.factory.schedule_offsets = {
+            'MASTER.job': datetime.timedelta(seconds=30),
+        }
+        offset_fingerprint = self.factory.get_fingerprint(config)
+        assert_not_equal(offset_fingerprint, fingerprint)
+
+        self.factory.environment = 'changed'
+        changed = self.factory.get_fingerprint(config)
+        assert_not_equal(changed, offset_fingerprint)
@@ -123,6 +123,10 @@ class TestJob(TestCase):
         self.job.runs.get_run_by_state = lambda s: None
         assert_equal(self.job.status, self.job.STATUS_UNKNOWN)
 
+    def test_status_restoring(self):
+        self.job.restored = False
+        assert_equal(self.job.status, self.job.STATUS_RESTORING)
+
     def test_state_data(self):
         state_data = self.job.state_data
         assert_equal(state_data['runs'], self.job.runs.state_data)
@@ -243,6 +247,7 @@ class TestJobScheduler(TestCase):
         self.job = mock.Mock(autospec=True)
         self.job.allow_overlap = False
         self.job.max_runtime = datetime.timedelta(days=1)
+        self.job.skip_if_older_than = None
         self.job_scheduler = JobScheduler(job=self.job)
 
     def test_restore_state_sets_job_runs(self):
@@ -13,7 +13,10 @@ from tests.assertions import assert_length
 from tests.assertions import assert_raises
 from tests.testingutils import autospec_method
 from tron import actioncommand
+from tron import metrics
 from tron import node
+from tron import ssh
+from tron.config import schema
 from tron.core import actiongraph
 from tron.core import actionrun
 from tron.core import job
@@ -149,6 +152,72 @@ class TestJobRun(TestCase):
         seconds = self.job_run.seconds_until_run_time()
         assert_equal(seconds, 6)
 
+    def build_node(self, name, prewarm_seconds=10):
+        return node.Node(
+            schema.ConfigNode(hostname=name, name=name, port=22),
+            mock.create_autospec(ssh.SSHAuthOptions),
+            None,
+            mock.Mock(prewarm_seconds=prewarm_seconds),
+        )
+
+    @mock.patch.object(node.Node, 'prewarm', autospec=True)
+    def test_prewarm_nodes(self, mock_prewarm):
+        first_node = self.build_node('first')
+        second_node = self.build_node('second')
+        action_runs = [
+            mock.create_autospec(actionrun.SSHActionRun, node=first_node),
+            mock.create_autospec(
+                actionrun.SSHActionRun,
+                node=self.build_node('first'),
+            ),
+            mock.create_autospec(actionrun.SSHActionRun, node=second_node),
+            mock.create_autospec(actionrun.MesosActionRun, node=None),
+        ]
+        self.job_run.node = first_node
+        self.job_run.action_runs.get_startable_action_runs = lambda: action_runs
+        self.job_run.prewarm_nodes(30)
+        assert_equal(mock_prewarm.call_count, 2)
+        prewarmed = {call[0][0].get_name() for call in mock_prewarm.call_args_list}
+        assert_equal(prewarmed, {'first', 'second'})
+
+    @mock.patch.object(node.Node, 'prewarm', autospec=True)
+    def test_prewarm_nodes_disabled(self, mock_prewarm):
+        run_node = self.build_node('first', prewarm_seconds=0)
+        self.job_run.node = run_node
+        self.job_run.action_runs.get_startable_action_runs = lambda: [
+            mock.create_autospec(actionrun.SSHActionRun, node=run_node),
+        ]
+        self.job_run.prewarm_nodes(30)
+        assert not mock_prewarm.called
+
+    @mock.patch('tron.core.jobrun.timeutils.current_time', autospec=True)
+    def test_record_start_latency(self, mock_current_time):
+        metrics.clear()
+        mock_current_time.return_value = self.run_time + datetime.timedelta(
+            seconds=4,
+        )
+        self.action_run.is_done = False
+        for _ in range(2):
+            self.job_run.handle_action_run_state_change(
+                self.action_run,
+                actionrun.ActionRun.RUNNING,
+            )
+        latency = metrics.get_metric('timer', 'jobrun.start_latency')
+        assert_equal(latency.count, 1)
+        assert_equal(latency.max, 4)
+        metrics.clear()
+
+    def test_record_start_latency_manual(self):
+        metrics.clear()
+        self.job_run.manual = True
+        self.action_run.is_done = False
+        self.job_run.handle_action_run_state_change(
+            self.action_run,
+            actionrun.ActionRun.RUNNING,
+        )
+        latency = metrics.get_metric('timer', 'jobrun.start_latency')
+        assert_equal(latency.count, 0)
+
     def test_start(self):
         autospec_method(self.job_run._do_start)
         assert self.job_run.start()
@@ -0,0 +1,179 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup
+from testifycompat import TestCase
+from tron import scheduler
+from tron.config import config_utils
+from tron.config import schedule_parse
+from tron.config import schema
+from tron.core import schedule_planner
+from tron.core.schedule_planner import SchedulePlanner
+
+
+def build_daily(hour=0, minute=0, jitter=None):
+    return scheduler.GeneralScheduler(
+        hours=[hour],
+        minutes=[minute],
+        seconds=[0],
+        jitter=jitter,
+    )
+
+
+class TestSchedulePlanner(TestCase):
+    @setup
+    def setup_planner(self):
+        self.window = datetime.timedelta(seconds=10)
+        self.planner = SchedulePlanner(True, self.window)
+        self.schedulers = {
+            'MASTER.job%d' % i: build_daily()
+            for i in range(5)
+        }
+
+    def test_plan_spreads_collisions(self):
+        # MASTER.job4 and MASTER.job5 hash to the same offset
+        self.schedulers['MASTER.job5'] = build_daily()
+        offsets = self.planner.plan(self.schedulers)
+        assert_equal(set(offsets), set(self.schedulers))
+        assert_equal(len(set(offsets.values())), 6)
+        for offset in offsets.values():
+            assert offset < self.window
+        assert_equal(
+            offsets['MASTER.job4'].seconds,
+            schedule_planner.stable_hash('MASTER.job4') % 10,
+        )
+
+    def test_plan_collision_without_overlap(self):
+        schedulers = {
+            'MASTER.job4': build_daily(),
+            'MASTER.job5': build_daily(hour=12),
+        }
+        offsets = self.planner.plan(schedulers)
+        assert_equal(offsets['MASTER.job4'], offsets['MASTER.job5'])
+
+    def test_plan_is_stable(self):
+        offsets = self.planner.plan(self.schedulers)
+        self.schedulers['MASTER.job6'] = build_daily()
+        del self.schedulers['MASTER.job0']
+        new_offsets = self.planner.plan(self.schedulers)
+        for name in ['MASTER.job%d' % i for i in range(1, 5)]:
+            assert_equal(new_offsets[name], offsets[name])
+
+    def test_plan_is_deterministic(self):
+        offsets = self.planner.plan(self.schedulers)
+        reversed_schedulers = dict(reversed(list(self.schedulers.items())))
+        assert_equal(self.planner.plan(reversed_schedulers), offsets)
+
+    def test_plan_no_collision_uses_hash(self):
+        offsets = self.planner.plan({'MASTER.job0': build_daily()})
+        expected = schedule_planner.stable_hash('MASTER.job0') % 10
+        assert_equal(offsets['MASTER.job0'].seconds, expected)
+
+    def test_plan_skips_jitter_and_constant(self):
+        schedulers = {
+            'MASTER.jitter': build_daily(jitter=datetime.timedelta(seconds=5)),
+            'MASTER.constant': scheduler.ConstantScheduler(),
+        }
+        assert_equal(self.planner.plan(schedulers), {})
+
+    def test_plan_interval(self):
+        interval = scheduler.IntervalScheduler(
+            datetime.timedelta(minutes=5),
+            None,
+            None,
+        )
+        offsets = self.planner.plan({'MASTER.interval': interval})
+        expected = schedule_planner.stable_hash('MASTER.interval') % 10
+        assert_equal(offsets['MASTER.interval'].seconds, expected)
+
+    def test_plan_no_window(self):
+        planner = SchedulePlanner(True, datetime.timedelta())
+        assert_equal(planner.plan(self.schedulers), {})
+
+    def test_plan_from_config_disabled(self):
+        planner = SchedulePlanner(False, self.window)
+        assert_equal(planner.plan_from_config({'a': None}, None), {})
+
+    def test_plan_from_config(self):
+        config_context = config_utils.NullConfigContext
+        schedule = schedule_parse.valid_schedule('daily', config_context)
+        job_configs = {
+            name: schema.ConfigJob(
+                name=name,
+                node='node',
+                schedule=schedule,
+                actions={},
+                namespace='MASTER',
+                time_zone=None,
+            )
+            for name in self.schedulers
+        }
+        assert_equal(
+            self.planner.plan_from_config(job_configs, None),
+            self.planner.plan(self.schedulers),
+        )
+        planned = dict(self.planner.planned)
+
+        # Unchanged schedules are not planned again
+        job_configs['MASTER.job0'] = job_configs['MASTER.job0']._replace(
+            schedule=schedule_parse.valid_schedule(
+                'daily 12:00:00',
+                config_context,
+            ),
+        )
+        self.planner.plan_from_config(job_configs, None)
+        for name in self.schedulers:
+            assert_equal(
+                self.planner.planned[name][1] is planned[name][1],
+                name != 'MASTER.job0',
+            )
+
+    def test_report(self):
+        start_time = datetime.datetime(2012, 3, 14, 23, 59)
+        report = self.planner.report(
+            start_time,
+            datetime.timedelta(hours=1),
+            1,
+            self.schedulers,
+        )
+        assert_equal(report['before']['starts'], 5)
+        assert_equal(report['before']['peak'], 5)
+        assert_equal(report['before']['distribution'], {5: 1})
+        assert_equal(report['after']['starts'], 5)
+        assert_equal(report['after']['peak'], 1)
+        assert_equal(
+            report['before']['busiest'],
+            [{'time': datetime.datetime(2012, 3, 15), 'starts': 5}],
+        )
+        assert_equal(len(report['offsets']), 5)
+
+    def test_report_from_last_config(self):
+        planner = SchedulePlanner(False, self.window)
+        schedule = schedule_parse.valid_schedule(
+            'daily',
+            config_utils.NullConfigContext,
+        )
+        job_config = schema.ConfigJob(
+            name='MASTER.job0',
+            node='node',
+            schedule=schedule,
+            actions={},
+            namespace='MASTER',
+            time_zone=None,
+        )
+        planner.plan_from_config({'MASTER.job0': job_config}, None)
+        report = planner.report(
+            datetime.datetime(2012, 3, 14, 23, 59),
+            datetime.timedelta(hours=1),
+            1,
+        )
+        assert_equal(report['before']['starts'], 1)
+        assert_equal(list(report['offsets']), ['MASTER.job0'])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,189 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+
+import mock
+import pytz
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup
+from testifycompat import TestCase
+from tron import scheduler
+from tron.core import schedule_preview
+
+
+def build_daily(hours=(0, ), minutes=(0, ), offset=0, time_zone=None):
+    job_scheduler = scheduler.GeneralScheduler(
+        hours=list(hours),
+        minutes=list(minutes),
+        seconds=[0],
+        time_zone=time_zone,
+    )
+    job_scheduler.offset = datetime.timedelta(seconds=offset)
+    return job_scheduler
+
+
+def build_job(name, job_scheduler, enabled=True, scheduled=(), newest=None):
+    job = mock.Mock(scheduler=job_scheduler, enabled=enabled)
+    job.get_name.return_value = name
+    job.runs.get_scheduled.return_value = [
+        mock.Mock(run_time=run_time) for run_time in scheduled
+    ]
+    job.runs.get_newest.return_value = newest
+    return job
+
+
+def get_reference_run_times(job_scheduler, start_time, end_time):
+    """Find run times one at a time, the way a job schedules its runs."""
+    start_time = schedule_preview.from_timestamp(
+        start_time.timestamp(),
+        job_scheduler.time_zone,
+    )
+    run_times = []
+    run_time = job_scheduler.next_run_time(start_time)
+    while run_time.timestamp() < end_time.timestamp():
+        run_times.append(run_time)
+        run_time = job_scheduler.next_run_time(run_time)
+    return run_times
+
+
+class TestSchedulePreview(TestCase):
+    @setup
+    def setup_preview(self):
+        self.start_time = datetime.datetime(2018, 3, 4, 12, 0, 0)
+        self.end_time = datetime.datetime(2018, 3, 11, 12, 0, 0)
+
+    def test_shared_schedule_with_offsets(self):
+        jobs = [
+            build_job(
+                'MASTER.job%d' % i,
+                build_daily(hours=(0, 12), minutes=(0, 30), offset=i * 7),
+            ) for i in range(5)
+        ]
+        run_times = schedule_preview.preview_jobs(
+            jobs,
+            self.start_time,
+            self.end_time,
+        )
+        for job in jobs:
+            expected = get_reference_run_times(
+                job.scheduler,
+                self.start_time,
+                self.end_time,
+            )
+            assert_equal(run_times[job.get_name()], expected)
+        assert_equal(len(run_times['MASTER.job1']), 28)
+
+    def test_time_zones(self):
+        time_zone = pytz.timezone('US/Pacific')
+        jobs = [
+            build_job('MASTER.local', build_daily(hours=(2, ))),
+            build_job(
+                'MASTER.pacific',
+                build_daily(hours=(2, ), time_zone=time_zone),
+            ),
+        ]
+        run_times = schedule_preview.preview_jobs(
+            jobs,
+            self.start_time,
+            self.end_time,
+        )
+        for job in jobs:
+            expected = get_reference_run_times(
+                job.scheduler,
+                self.start_time,
+                self.end_time,
+            )
+            assert_equal(run_times[job.get_name()], expected)
+
+    def test_start_time_excluded(self):
+        job = build_job('MASTER.noon', build_daily(hours=(12, )))
+        run_times = schedule_preview.preview_jobs(
+            [job],
+            self.start_time,
+            self.end_time,
+        )
+        assert_equal(run_times['MASTER.noon'][0], self.start_time.replace(
+            day=5,
+        ))
+        assert_equal(len(run_times['MASTER.noon']), 6)
+
+    def test_limit(self):
+        jobs = [
+            build_job(
+                'MASTER.job%d' % i,
+                build_daily(minutes=range(60), hours=range(24), offset=i * 120),
+            ) for i in range(3)
+        ]
+        run_times = schedule_preview.preview_jobs(
+            jobs,
+            self.start_time,
+            self.end_time,
+            limit=10,
+        )
+        for job in jobs:
+            expected = get_reference_run_times(
+                job.scheduler,
+                self.start_time,
+                self.end_time,
+            )[:10]
+            assert_equal(run_times[job.get_name()], expected)
+
+    def test_disabled_and_constant_jobs(self):
+        jobs = [
+            build_job('MASTER.disabled', build_daily(), enabled=False),
+            build_job('MASTER.constant', scheduler.ConstantScheduler()),
+        ]
+        run_times = schedule_preview.preview_jobs(
+            jobs,
+            self.start_time,
+            self.end_time,
+        )
+        assert_equal(run_times, {'MASTER.constant': []})
+
+    def test_interval_from_scheduled_run(self):
+        interval_scheduler = scheduler.IntervalScheduler(
+            datetime.timedelta(hours=30),
+            None,
+            None,
+        )
+        scheduled = datetime.datetime(2018, 3, 3, 0, 0, 0)
+        job = build_job(
+            'MASTER.interval',
+            interval_scheduler,
+            scheduled=[scheduled],
+        )
+        run_times = schedule_preview.preview_jobs(
+            [job],
+            self.start_time,
+            self.end_time,
+        )
+        expected = [
+            scheduled + datetime.timedelta(hours=30) * i for i in range(2, 7)
+        ]
+        assert_equal(run_times['MASTER.interval'], expected)
+
+    def test_interval_from_newest_run(self):
+        interval_scheduler = scheduler.IntervalScheduler(
+            datetime.timedelta(days=2),
+            None,
+            None,
+        )
+        newest = mock.Mock(run_time=datetime.datetime(2018, 3, 6, 0, 0, 0))
+        job = build_job('MASTER.interval', interval_scheduler, newest=newest)
+        run_times = schedule_preview.preview_jobs(
+            [job],
+            self.start_time,
+            self.end_time,
+        )
+        expected = [
+            datetime.datetime(2018, 3, 8, 0, 0, 0),
+            datetime.datetime(2018, 3, 10, 0, 0, 0),
+        ]
+        assert_equal(run_times['MASTER.interval'], expected)
+
+
+if __name__ == "__main__":
+    run()
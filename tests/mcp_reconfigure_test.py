@@ -5,6 +5,7 @@ from __future__ import unicode_literals
 import os
 import tempfile
 
+import mock
 import pytest
 
 from testifycompat import assert_equal
@@ -17,6 +18,7 @@ from tests.assertions import assert_length
 from tron import mcp
 from tron.config import config_parse
 from tron.config import schema
+from tron.core.job_scheduler import JobSchedulerFactory
 from tron.serialize import filehandler
 
 
@@ -329,6 +331,57 @@ class TestMCPReconfigure(TestCase):
         assert new_run.is_scheduled
         assert_equal(run.run_time, new_run.run_time)
 
+    @suite('integration')
+    def test_reconfigure_builds_changed_jobs(self):
+        with mock.patch(
+            'tron.core.job_scheduler.JobSchedulerFactory.build',
+            autospec=True,
+            side_effect=JobSchedulerFactory.build,
+        ) as mock_build:
+            self.reconfigure()
+        built = {call[0][1].name for call in mock_build.call_args_list}
+        expected = {
+            'MASTER.test_change',
+            'MASTER.test_daily_change',
+            'MASTER.test_new',
+            'MASTER.test_action_added',
+        }
+        assert_equal(built, expected)
+
+    @suite('integration')
+    def test_reconfigure_same_config(self):
+        config = {schema.MASTER_NAMESPACE: self._get_config(0, self.test_dir)}
+        container = config_parse.ConfigContainer.create(config)
+        job_sched = self.mcp.jobs.get_by_name('MASTER.test_unchanged')
+        with mock.patch(
+            'tron.core.job_scheduler.JobSchedulerFactory.build',
+            autospec=True,
+        ) as mock_build:
+            self.mcp.apply_config(container, reconfigure=True)
+        assert_equal(mock_build.call_count, 0)
+        assert job_sched is self.mcp.jobs.get_by_name('MASTER.test_unchanged')
+
+    @suite('integration')
+    def test_reconfigure_node_changed(self):
+        config = self._get_config(0, self.test_dir)
+        config['nodes'] = [
+            dict(name='node0', hostname='batch0-replacement'),
+            dict(name='node1', hostname='batch1'),
+        ]
+        container = config_parse.ConfigContainer.create(
+            {schema.MASTER_NAMESPACE: config},
+        )
+        job_sched = self.mcp.jobs.get_by_name('MASTER.test_unchanged')
+        with mock.patch(
+            'tron.core.job_scheduler.JobSchedulerFactory.build',
+            autospec=True,
+        ) as mock_build:
+            self.mcp.apply_config(container, reconfigure=True)
+        assert_equal(mock_build.call_count, 0)
+        assert job_sched is self.mcp.jobs.get_by_name('MASTER.test_unchanged')
+        node_pool = job_sched.get_job().node_pool
+        assert_equal(node_pool.get_nodes()[0].hostname, 'batch0-replacement')
+
     @suite('integration')
     def test_action_added(self):
         self.reconfigure()
@@ -9,6 +9,7 @@ import mock
 from testifycompat import assert_equal
 from testifycompat import run
 from testifycompat import setup
+from testifycompat import setup_teardown
 from testifycompat import teardown
 from testifycompat import TestCase
 from tests.testingutils import autospec_method
@@ -16,6 +17,7 @@ from tron import mcp
 from tron.config import config_parse
 from tron.config import manager
 from tron.core.job_collection import JobCollection
+from tron.core.job_scheduler import JobScheduler
 from tron.serialize.runstate import statemanager
 
 
@@ -40,6 +42,17 @@ class TestMasterControlProgram(TestCase):
         shutil.rmtree(self.config_path)
         shutil.rmtree(self.working_dir)
 
+    @mock.patch('tron.mcp.EventBus', autospec=True)
+    @mock.patch('tron.mcp.filehandler.FileHandleManager', autospec=True)
+    def test_shutdown(self, mock_manager, mock_event_bus):
+        file_handle_manager = mock_manager.get_instance.return_value
+        self.mcp.shutdown()
+        assert_equal(
+            file_handle_manager.method_calls,
+            [mock.call.flush(), mock.call.stop()],
+        )
+        self.mcp.state_watcher.shutdown.assert_called_with()
+
     def test_reconfigure(self):
         autospec_method(self.mcp._load_config)
         self.mcp.state_watcher = mock.MagicMock()
@@ -56,19 +69,41 @@ class TestMasterControlProgram(TestCase):
             reconfigure=False,
         )
 
+    @mock.patch(
+        'tron.mcp.actioncommand.create_action_runner_factory_from_config',
+        autospec=True,
+    )
+    def test_initial_setup_validation_processes(self, _):
+        processes = []
+        autospec_method(
+            self.mcp._load_config,
+            side_effect=lambda: processes.append(
+                self.mcp.config.validation_processes,
+            ),
+        )
+        autospec_method(self.mcp.config.load)
+        autospec_method(self.mcp.start_progressive_restore)
+        self.mcp.initial_setup(progressive=True)
+        assert_equal(processes, [None])
+        assert_equal(self.mcp.config.validation_processes, 1)
+
+    @mock.patch('tron.mcp.AdmissionController', autospec=True)
     @mock.patch('tron.mcp.MesosClusterRepository', autospec=True)
     @mock.patch('tron.mcp.node.NodePoolRepository', autospec=True)
-    def test_apply_config(self, mock_repo, mock_cluster_repo):
+    def test_apply_config(self, mock_repo, mock_cluster_repo, mock_admission):
         config_container = mock.create_autospec(config_parse.ConfigContainer)
         master_config = config_container.get_master.return_value
         autospec_method(self.mcp.apply_collection_config)
         autospec_method(self.mcp.build_job_scheduler_factory)
+        self.mcp.concurrency_forecast.cached = {}
         self.mcp.apply_config(config_container)
+        assert_equal(self.mcp.concurrency_forecast.cached, None)
+        assert_equal(self.mcp.concurrency_forecast.generation, 1)
         self.mcp.state_watcher.update_from_config.assert_called_with(
             master_config.state_persistence,
         )
         assert_equal(self.mcp.context.base, master_config.command_context)
-        assert_equal(len(self.mcp.apply_collection_config.mock_calls), 1)
+        assert_equal(self.mcp.apply_collection_config.call_count, 1)
         mock_repo.update_from_config.assert_called_with(
             master_config.nodes,
             master_config.node_pools,
@@ -77,7 +112,18 @@ class TestMasterControlProgram(TestCase):
         mock_cluster_repo.configure.assert_called_with(
             master_config.mesos_options,
         )
-        self.mcp.build_job_scheduler_factory(master_config)
+        mock_admission.configure.assert_called_with(
+            master_config.admission_control,
+            master_config.node_pools,
+        )
+        controller = mock_admission.get_instance.return_value
+        controller.update_job_priorities.assert_called_with(
+            config_container.get_jobs.return_value,
+        )
+        self.mcp.build_job_scheduler_factory.assert_called_with(
+            master_config,
+            config_container.get_jobs.return_value,
+        )
 
     def test_update_state_watcher_config_changed(self):
         self.mcp.state_watcher.update_from_config.return_value = True
@@ -140,5 +186,96 @@ class TestMasterControlProgramRestoreState(TestCase):
         )
 
 
+class TestMasterControlProgramProgressiveRestore(TestCase):
+    @setup_teardown
+    def setup_mcp(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.config_path = tempfile.mkdtemp()
+        self.mcp = mcp.MasterControlProgram(
+            self.working_dir,
+            self.config_path,
+        )
+        self.mcp.jobs = mock.create_autospec(JobCollection)
+        self.mcp.state_watcher = mock.create_autospec(
+            statemanager.StateChangeWatcher,
+        )
+        self.job_schedulers = {
+            name: mock.create_autospec(JobScheduler)
+            for name in ('a', 'b', 'c')
+        }
+        self.mcp.jobs.get_by_name.side_effect = self.job_schedulers.get
+        self.mcp.jobs.get_restore_order.return_value = ['b', 'c', 'a']
+        self.mcp.state_watcher.restore.return_value = {
+            'job_state': {'b': 'b state'},
+        }
+        self.action_runner = mock.Mock()
+        with mock.patch(
+            'tron.mcp.MesosClusterRepository',
+            autospec=True,
+        ), mock.patch(
+            'tron.mcp.reactor',
+            autospec=True,
+        ) as self.reactor, mock.patch.object(
+            mcp,
+            'RESTORE_BATCH_SIZE',
+            2,
+        ):
+            yield
+        shutil.rmtree(self.working_dir)
+        shutil.rmtree(self.config_path)
+
+    def get_job(self, name):
+        return self.job_schedulers[name].get_job.return_value
+
+    def test_start_progressive_restore(self):
+        self.mcp.start_progressive_restore(self.action_runner)
+        assert self.mcp.is_restoring
+        self.reactor.callLater.assert_called_once_with(
+            0,
+            self.mcp._restore_next_batch,
+        )
+        for name in self.job_schedulers:
+            assert_equal(self.get_job(name).restored, False)
+        assert_equal(
+            self.mcp.get_restore_progress(),
+            {'restoring': True, 'total': 3, 'restored': 0},
+        )
+
+    def test_restore_next_batch(self):
+        self.mcp.start_progressive_restore(self.action_runner)
+        self.mcp._restore_next_batch()
+
+        self.job_schedulers['b'].restore_state.assert_called_once_with(
+            'b state',
+            self.action_runner,
+        )
+        assert not self.job_schedulers['c'].restore_state.mock_calls
+        self.job_schedulers['c'].run_queue_schedule.assert_called_once_with()
+        assert_equal(self.get_job('b').restored, True)
+        assert_equal(self.get_job('c').restored, True)
+        assert_equal(self.get_job('a').restored, False)
+        assert_equal(self.reactor.callLater.call_count, 2)
+
+        self.mcp._restore_next_batch()
+        assert_equal(self.get_job('a').restored, True)
+        assert not self.mcp.is_restoring
+        self.mcp.state_watcher.save_metadata.assert_called_once_with()
+
+    def test_restore_next_batch_continues_after_error(self):
+        self.job_schedulers['b'].restore_state.side_effect = ValueError
+        self.mcp.start_progressive_restore(self.action_runner)
+        self.mcp._restore_next_batch()
+        assert_equal(self.get_job('b').restored, True)
+        assert_equal(self.get_job('c').restored, True)
+
+    def test_reconfigure_finishes_restore(self):
+        autospec_method(self.mcp._load_config)
+        self.mcp.start_progressive_restore(self.action_runner)
+        self.mcp.reconfigure()
+        assert not self.mcp.is_restoring
+        for name in self.job_schedulers:
+            assert_equal(self.get_job(name).restored, True)
+
+
 if __name__ == '__main__':
     run()
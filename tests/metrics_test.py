@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from testifycompat import assert_equal
+from testifycompat import run
+from testifycompat import setup_teardown
+from testifycompat import TestCase
+from tron import metrics
+
+
+class TestMetrics(TestCase):
+    @setup_teardown
+    def clear_metrics(self):
+        metrics.clear()
+        yield
+        metrics.clear()
+
+    def test_count(self):
+        metrics.count('a')
+        metrics.count('a', 2)
+        assert_equal(metrics.get_metric('counter', 'a').value, 3)
+
+    def test_gauge(self):
+        metrics.gauge('a', 4)
+        metrics.gauge('a', 2)
+        assert_equal(metrics.get_metric('gauge', 'a').value, 2)
+
+    def test_timer(self):
+        for value in range(1, 101):
+            metrics.timer('a', value)
+        data = metrics.get_metric('timer', 'a').get_repr()
+        assert_equal(data['count'], 100)
+        assert_equal(data['min'], 1)
+        assert_equal(data['max'], 100)
+        assert_equal(data['mean'], 50.5)
+        assert_equal(data['p50'], 51)
+        assert_equal(data['p99'], 99)
+
+    def test_empty_histogram(self):
+        data = metrics.get_metric('histogram', 'a').get_repr()
+        assert_equal(data['count'], 0)
+        assert_equal(data['p50'], None)
+
+    def test_view_all_metrics(self):
+        metrics.count('b')
+        metrics.count('a')
+        metrics.gauge('c', 1)
+        expected = {
+            'counter': [{'name': 'a', 'count': 1}, {'name': 'b', 'count': 1}],
+            'gauge': [{'name': 'c', 'value': 1}],
+        }
+        assert_equal(metrics.view_all_metrics(), expected)
+
+
+if __name__ == "__main__":
+    run()
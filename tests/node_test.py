@@ -1,7 +1,22 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+
 import mock
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from twisted.conch.client import knownhosts
+from twisted.conch.ssh import keys
+from twisted.internet import defer
+from twisted.internet import reactor
+from twisted.python import failure
 
 from testifycompat import assert_equal
 from testifycompat import assert_in
@@ -13,10 +28,14 @@ from testifycompat import setup
 from testifycompat import setup_teardown
 from testifycompat import teardown
 from testifycompat import TestCase
+from tests import sshserver
 from tests.testingutils import autospec_method
 from tron import actioncommand
+from tron import metrics
 from tron import node
 from tron import ssh
+from tron.config import config_parse
+from tron.config import config_utils
 from tron.config import schema
 from tron.core import actionrun
 from tron.serialize import filehandler
@@ -65,7 +84,11 @@ class TestNodePoolRepository(TestCase):
         self.repo.nodes.update(mock_nodes)
         node_config = {'a': mock.Mock(), 'b': mock.Mock()}
         node_pool_config = {'c': mock.Mock(nodes=['a', 'b'])}
-        ssh_options = mock.Mock(identities=[], known_hosts_file=None)
+        ssh_options = mock.Mock(
+            identities=[],
+            known_hosts_file=None,
+            start_rate_global=None,
+        )
         node.NodePoolRepository.update_from_config(
             node_config,
             node_pool_config,
@@ -81,6 +104,94 @@ class TestNodePoolRepository(TestCase):
             set(list(node_names) + list(mock_nodes.keys())),
         )
 
+    def test_update_node_pools_in_place(self):
+        self.repo.nodes.update({
+            'a': create_mock_node('a'),
+            'b': create_mock_node('b'),
+        })
+        config = schema.ConfigNodePool(
+            nodes=['a', 'b'],
+            name='c',
+            selection='round_robin',
+            weights={},
+        )
+        self.repo._update_node_pools({'c': config})
+        pool = self.repo.get_by_name('c')
+        self.repo._update_node_pools({
+            'c': config._replace(nodes=['a'], selection='least_outstanding'),
+        })
+        assert self.repo.get_by_name('c') is pool
+        assert_equal(pool.nodes, [self.repo.nodes['a']])
+        assert_equal(pool.selection, 'least_outstanding')
+
+    @mock.patch('tron.node.KnownHosts', autospec=True)
+    def test_update_from_config_unchanged(self, mock_known_hosts):
+        node_config = {
+            'a': schema.ConfigNode(hostname='host', name='a', port=22),
+        }
+        ssh_options = schema.ConfigSSHOptions(
+            agent=False,
+            identities=('tests/test_id_rsa', ),
+            known_hosts_file=None,
+            connect_timeout=30,
+            idle_connection_timeout=3600,
+            max_channels_per_connection=10,
+            prewarm_seconds=0,
+            keepalive_interval=15,
+            keepalive_count_max=3,
+            circuit_breaker_threshold=3,
+            circuit_breaker_timeout=30,
+            jitter_min_load=4,
+            jitter_max_delay=20,
+            jitter_load_factor=1,
+            start_rate_per_node=None,
+            start_burst_per_node=1,
+            start_rate_global=None,
+            start_burst_global=1,
+        )
+        for _ in range(2):
+            node.NodePoolRepository.update_from_config(
+                node_config,
+                {},
+                ssh_options,
+            )
+        assert_equal(mock_known_hosts.from_path.call_count, 1)
+        original = self.repo.get_node('a')
+
+        changed_config = {
+            'a': schema.ConfigNode(hostname='host2', name='a', port=22),
+        }
+        node.NodePoolRepository.update_from_config(
+            changed_config,
+            {},
+            ssh_options,
+        )
+        assert_equal(mock_known_hosts.from_path.call_count, 2)
+        assert self.repo.get_node('a') is original
+        assert_equal(original.hostname, 'host2')
+
+        changed_options = ssh_options._replace(jitter_max_delay=10)
+        node.NodePoolRepository.update_from_config(
+            changed_config,
+            {},
+            changed_options,
+        )
+        assert self.repo.get_node('a') is original
+        assert_equal(original.node_settings, changed_options)
+
+    def test_update_start_bucket(self):
+        ssh_options = mock.Mock(start_rate_global=2, start_burst_global=3)
+        self.repo._update_start_bucket(ssh_options)
+        bucket = self.repo.start_bucket
+        assert_equal((bucket.rate, bucket.burst), (2, 3))
+
+        self.repo._update_start_bucket(ssh_options)
+        assert self.repo.start_bucket is bucket
+
+        ssh_options.start_rate_global = None
+        self.repo._update_start_bucket(ssh_options)
+        assert_equal(self.repo.start_bucket, None)
+
     def test_nodes_by_name(self):
         mock_nodes = {'a': mock.Mock(), 'b': mock.Mock()}
         self.repo.nodes.update(mock_nodes)
@@ -110,6 +221,78 @@ class TestKnownHost(TestCase):
         assert not self.known_hosts.get_public_key('hostname')
 
 
+class TestKnownHostsIndex(TestCase):
+    @setup_teardown
+    def setup_known_hosts(self):
+        self.keys = [
+            keys.Key(rsa.generate_private_key(65537, 1024, default_backend()))
+            .public() for _ in range(3)
+        ]
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'known_hosts')
+        self.write([
+            self.plain_line('plain,other', self.keys[0]),
+            self.hashed_line('hashed', b'salt', self.keys[1]),
+            b'not an entry',
+            self.hashed_line('other', b'pepper', self.keys[2]),
+            self.plain_line('hashed', self.keys[2]),
+        ])
+        yield
+        shutil.rmtree(self.tmpdir)
+        node.KnownHosts._cache.clear()
+
+    def plain_line(self, hostnames, key):
+        return b' '.join([
+            hostnames.encode(),
+            key.sshType(),
+            base64.b64encode(key.blob()),
+        ])
+
+    def hashed_line(self, hostname, salt, key):
+        host_hash = hmac.new(salt, hostname.encode(), hashlib.sha1).digest()
+        return knownhosts.HashedEntry(
+            salt,
+            host_hash,
+            key.sshType(),
+            key,
+            None,
+        ).toString()
+
+    def write(self, lines):
+        with open(self.path, 'wb') as fh:
+            fh.write(b'\n'.join(lines) + b'\n')
+
+    def test_get_public_key(self):
+        known_hosts = node.KnownHosts.from_path(self.path)
+        assert_equal(known_hosts.get_public_key('plain'), self.keys[0])
+        # The first matching entry wins
+        assert_equal(known_hosts.get_public_key('other'), self.keys[0])
+        assert_equal(known_hosts.get_public_key('hashed'), self.keys[1])
+        assert_equal(known_hosts.get_public_key('missing'), None)
+
+    def test_get_public_key_parses_once(self):
+        known_hosts = node.KnownHosts.from_path(self.path)
+        with mock.patch.object(
+            known_hosts,
+            'iterentries',
+            wraps=known_hosts.iterentries,
+        ) as mock_iterentries:
+            for hostname in ['plain', 'hashed', 'missing', 'plain']:
+                known_hosts.get_public_key(hostname)
+            assert_equal(mock_iterentries.call_count, 1)
+
+    def test_from_path_cached(self):
+        known_hosts = node.KnownHosts.from_path(self.path)
+        assert node.KnownHosts.from_path(self.path) is known_hosts
+
+        self.write([self.plain_line('plain', self.keys[2])])
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        changed = node.KnownHosts.from_path(self.path)
+        assert changed is not known_hosts
+        assert_equal(changed.get_public_key('plain'), self.keys[2])
+
+
 class TestDetermineJitter(TestCase):
     @setup
     def setup_node_settings(self):
@@ -140,6 +323,34 @@ class TestDetermineJitter(TestCase):
         assert_equal(node.determine_jitter(100, self.settings), 15.0)
 
 
+class TestTokenBucket(TestCase):
+    @setup
+    def setup_bucket(self):
+        self.bucket = node.TokenBucket(2, 2)
+
+    def test_from_rate_disabled(self):
+        assert_equal(node.TokenBucket.from_rate(None, 1), None)
+        assert_equal(node.TokenBucket.from_rate(0, 1), None)
+
+    def test_consume_burst(self):
+        assert self.bucket.consume(10)
+        assert self.bucket.consume(10)
+        assert not self.bucket.consume(10)
+        assert_equal(self.bucket.get_delay(10), 0.5)
+
+    def test_refill(self):
+        for _ in range(2):
+            self.bucket.consume(10)
+        assert_equal(self.bucket.get_delay(10.25), 0.25)
+        assert self.bucket.consume(10.5)
+        assert not self.bucket.consume(10.5)
+
+    def test_refill_capped_at_burst(self):
+        self.bucket.consume(10)
+        self.bucket.get_delay(100)
+        assert_equal(self.bucket.tokens, 2)
+
+
 def build_node(
     hostname='localhost',
     username='theuser',
@@ -166,14 +377,15 @@ class TestNode(TestCase):
         serializer = mock.create_autospec(filehandler.FileHandleManager)
         action_cmd = actionrun.ActionCommand("test", "false", serializer)
 
-        test_node.connection = self.TestConnection()
+        connection = self.TestConnection()
         test_node.run_states = {action_cmd.id: mock.Mock(state=0)}
         test_node.run_states[action_cmd.id].state = node.RUN_STATE_CONNECTING
         test_node.run_states[action_cmd.id].run = action_cmd
+        test_node.run_states[action_cmd.id].connection.connection = connection
 
         test_node._open_channel(action_cmd)
-        assert test_node.connection.chan is not None
-        test_node.connection.chan.dataReceived("test")
+        assert connection.chan is not None
+        connection.chan.dataReceived("test")
         serializer.open.return_value.write.assert_called_with('test')
 
     def test_from_config(self):
@@ -218,6 +430,39 @@ class TestNode(TestCase):
         other_node.conch_options = mock.create_autospec(ssh.SSHAuthOptions)
         assert_not_equal(other_node, self.node)
 
+    def test_update_settings(self):
+        self.node.pool.connections.append(node.PooledConnection())
+        self.node.run_states['a'] = mock.Mock()
+        start_bucket = self.node._start_bucket = mock.Mock()
+        node_settings = mock.create_autospec(schema.ConfigSSHOptions)
+        node_settings.start_rate_per_node = (
+            self.node.node_settings.start_rate_per_node
+        )
+        node_settings.start_burst_per_node = (
+            self.node.node_settings.start_burst_per_node
+        )
+        self.node.update(
+            self.node.config,
+            self.node.conch_options,
+            self.node.pub_key,
+            node_settings,
+        )
+        assert_equal(self.node.node_settings, node_settings)
+        assert_equal(self.node._start_bucket, start_bucket)
+        assert_equal(list(self.node.run_states), ['a'])
+        assert not self.node.pool.connections[0].retired
+
+    def test_update_start_rate(self):
+        self.node._start_bucket = mock.Mock()
+        node_settings = mock.create_autospec(schema.ConfigSSHOptions)
+        self.node.update(
+            self.node.config,
+            self.node.conch_options,
+            self.node.pub_key,
+            node_settings,
+        )
+        assert_equal(self.node._start_bucket, None)
+
     def test_stop_not_tracked(self):
         action_command = mock.create_autospec(
             actioncommand.ActionCommand,
@@ -236,19 +481,636 @@ class TestNode(TestCase):
         assert_equal(self.node._fail_run.call_count, 1)
 
 
+class TestNodeStartRate(TestCase):
+    @setup_teardown
+    def setup_node(self):
+        self.node = build_node()
+        self.node.node_settings.start_rate_per_node = 1
+        self.node.node_settings.start_burst_per_node = 1
+        autospec_method(self.node._do_run)
+        metrics.clear()
+        with mock.patch(
+            'tron.node.reactor',
+            autospec=True,
+        ) as self.reactor:
+            self.reactor.seconds.return_value = 100
+            yield
+        node.NodePoolRepository.get_instance().start_bucket = None
+        metrics.clear()
+
+    def build_run(self, run_id):
+        return mock.Mock(id=run_id)
+
+    def test_run_within_rate(self):
+        action_run = self.build_run('a')
+        self.node.run(action_run)
+        self.node._do_run.assert_called_once_with(action_run)
+        assert_equal(self.reactor.callLater.call_count, 0)
+
+    def test_run_queued(self):
+        runs = [self.build_run(run_id) for run_id in 'abc']
+        for action_run in runs:
+            self.node.run(action_run)
+
+        self.node._do_run.assert_called_once_with(runs[0])
+        self.reactor.callLater.assert_called_once_with(
+            1.0,
+            self.node._drain_start_queue,
+        )
+        assert_equal(len(self.node.start_queue), 2)
+        delayed = metrics.get_metric('counter', 'node.start_rate.delayed')
+        assert_equal(delayed.value, 2)
+
+        self.reactor.seconds.return_value = 101
+        self.node._drain_start_queue()
+        assert_equal(self.node._do_run.call_args_list[-1], mock.call(runs[1]))
+        assert_equal(len(self.node.start_queue), 1)
+        gauge_name = f'node.start_rate.queued.{self.node.get_name()}'
+        queued = metrics.get_metric('gauge', gauge_name)
+        assert_equal(queued.value, 1)
+        wait = metrics.get_metric('timer', 'node.start_rate.wait')
+        assert_equal(wait.max, 1)
+
+    def test_run_queued_skips_stopped_runs(self):
+        runs = [self.build_run(run_id) for run_id in 'abc']
+        for action_run in runs:
+            self.node.run(action_run)
+        del self.node.run_states['b']
+
+        self.reactor.seconds.return_value = 101
+        self.node._drain_start_queue()
+        assert_equal(self.node._do_run.call_args_list[-1], mock.call(runs[2]))
+        assert_equal(len(self.node.start_queue), 0)
+
+    def test_run_global_rate(self):
+        self.node.node_settings.start_rate_per_node = None
+        repo = node.NodePoolRepository.get_instance()
+        repo.start_bucket = node.TokenBucket(0.5, 1)
+        for run_id in 'ab':
+            self.node.run(self.build_run(run_id))
+
+        assert_equal(self.node._do_run.call_count, 1)
+        self.reactor.callLater.assert_called_once_with(
+            2.0,
+            self.node._drain_start_queue,
+        )
+
+
+class TestConnectionPool(TestCase):
+    @setup_teardown
+    def setup_pool(self):
+        self.node = build_node()
+        self.node.node_settings.max_channels_per_connection = 2
+        self.node.node_settings.idle_connection_timeout = 60
+        self.pool = self.node.pool
+        with mock.patch(
+            'tron.node.reactor',
+            autospec=True,
+        ) as self.reactor:
+            self.reactor.seconds.return_value = 100
+            yield
+
+    def add_connection(self, run_ids, connected=True):
+        pooled = node.PooledConnection()
+        if connected:
+            pooled.connection = mock.Mock()
+        else:
+            pooled.connect_defer = mock.Mock()
+        pooled.run_ids.update(run_ids)
+        self.pool.connections.append(pooled)
+        return pooled
+
+    def test_get_connection_new(self):
+        pooled = self.pool.get_connection()
+        assert_equal(self.pool.connections, [pooled])
+        assert not pooled.is_connected
+
+    def test_get_connection_busiest_connected(self):
+        self.node.node_settings.max_channels_per_connection = 3
+        self.add_connection('a')
+        busiest = self.add_connection('bc')
+        self.add_connection('def')
+        self.add_connection('', connected=False)
+        assert_equal(self.pool.get_connection(), busiest)
+
+    def test_get_connection_connecting(self):
+        self.add_connection('ab')
+        connecting = self.add_connection('c', connected=False)
+        assert_equal(self.pool.get_connection(), connecting)
+
+    def test_get_connection_all_full(self):
+        self.add_connection('ab')
+        self.add_connection('cd', connected=False)
+        pooled = self.pool.get_connection()
+        assert_equal(len(self.pool.connections), 3)
+        assert_equal(pooled.run_ids, set())
+
+    def test_get_connection_unlimited(self):
+        self.node.node_settings.max_channels_per_connection = 0
+        pooled = self.add_connection('abcdefghijk')
+        assert_equal(self.pool.get_connection(), pooled)
+
+    def test_add_run_cancels_idle_timer(self):
+        pooled = self.add_connection('')
+        idle_timer = pooled.idle_timer = mock.Mock()
+        self.pool.add_run(pooled, 'a')
+        idle_timer.cancel.assert_called_with()
+        assert_equal(pooled.run_ids, {'a'})
+
+    def test_remove_run_schedules_close(self):
+        pooled = self.add_connection('ab')
+        self.pool.remove_run(pooled, 'a')
+        assert not self.reactor.callLater.called
+        self.pool.remove_run(pooled, 'b')
+        self.reactor.callLater.assert_called_once_with(
+            60,
+            self.pool.close_idle,
+            pooled,
+        )
+
+    def test_keep_open(self):
+        pooled = self.add_connection('a')
+        self.pool.keep_open(pooled, 90)
+        assert_equal(pooled.keep_until, 190)
+        self.pool.remove_run(pooled, 'a')
+        self.reactor.callLater.assert_called_once_with(
+            90,
+            self.pool.close_idle,
+            pooled,
+        )
+
+    def test_keep_open_idle(self):
+        pooled = self.add_connection('')
+        idle_timer = pooled.idle_timer = mock.Mock()
+        self.pool.keep_open(pooled, 30)
+        idle_timer.cancel.assert_called_with()
+        self.reactor.callLater.assert_called_once_with(
+            60,
+            self.pool.close_idle,
+            pooled,
+        )
+
+    def test_retire(self):
+        idle = self.add_connection('')
+        busy = self.add_connection('a')
+        connecting = self.add_connection('', connected=False)
+        self.pool.retire()
+        assert all(
+            pooled.retired for pooled in (idle, busy, connecting)
+        )
+        self.reactor.callLater.assert_called_once_with(
+            0,
+            self.pool.close_idle,
+            idle,
+        )
+        assert_equal(self.pool.get_connected(), None)
+        assert self.pool.get_connection() not in (idle, busy, connecting)
+
+        self.pool.remove_run(busy, 'a')
+        self.reactor.callLater.assert_called_with(
+            0,
+            self.pool.close_idle,
+            busy,
+        )
+
+    def test_close_idle(self):
+        pooled = self.add_connection('')
+        self.pool.close_idle(pooled)
+        pooled.connection.transport.loseConnection.assert_called_with()
+
+    def test_close_idle_not_idle(self):
+        pooled = self.add_connection('a')
+        self.pool.close_idle(pooled)
+        assert not pooled.connection.transport.loseConnection.called
+
+    def test_remove(self):
+        pooled = self.add_connection('a')
+        self.pool.remove(pooled)
+        assert_equal(self.pool.connections, [])
+
+
+class TestNodeConnectionPool(TestCase):
+    @setup_teardown
+    def setup_node(self):
+        self.node = build_node()
+        self.node.config.port = 22
+        self.node.node_settings.max_channels_per_connection = 2
+        self.node.node_settings.idle_connection_timeout = 60
+        self.node.node_settings.keepalive_interval = 0
+        self.node.node_settings.keepalive_count_max = 3
+        self.node.node_settings.circuit_breaker_threshold = 3
+        self.node.node_settings.circuit_breaker_timeout = 30
+        self.connect_defers = []
+        autospec_method(self.node._connect, side_effect=self.connect)
+        autospec_method(self.node._open_channel, side_effect=self.open_channel)
+        autospec_method(self.node._fail_run)
+        self.runs = {}
+        with mock.patch(
+            'tron.node.reactor',
+            autospec=True,
+        ) as self.reactor:
+            self.reactor.seconds.return_value = 100
+            yield
+
+    def connect(self, pooled):
+        self.connect_defers.append((pooled, defer.Deferred()))
+        return self.connect_defers[-1][1]
+
+    def open_channel(self, run):
+        self.node.run_states[run.id].state = node.RUN_STATE_STARTING
+
+    def connected(self, index):
+        pooled, connect_defer = self.connect_defers[index]
+        pooled.connection = mock.Mock()
+        connect_defer.callback(pooled)
+        return pooled
+
+    def start(self, run_ids):
+        for run_id in run_ids:
+            self.runs[run_id] = mock.Mock(id=run_id)
+            self.node.run_states[run_id] = node.RunState(self.runs[run_id])
+            self.node._do_run(self.runs[run_id])
+
+    def get_opened(self):
+        return [call[0][0].id for call in self.node._open_channel.call_args_list]
+
+    def test_runs_share_connections(self):
+        self.start('abc')
+        assert_equal(len(self.connect_defers), 2)
+        first, second = [pooled for pooled, _ in self.connect_defers]
+        assert_equal(first.run_ids, {'a', 'b'})
+        assert_equal(second.run_ids, {'c'})
+
+        self.connected(0)
+        assert_equal(self.get_opened(), ['a', 'b'])
+        self.start('d')
+        assert_equal(second.run_ids, {'c', 'd'})
+
+    def test_run_on_connected(self):
+        self.start('a')
+        self.connected(0)
+        self.start('b')
+        assert_equal(len(self.connect_defers), 1)
+        assert_equal(self.get_opened(), ['a', 'b'])
+
+    def test_fail_over_when_channel_free(self):
+        self.start('abc')
+        first = self.connected(0)
+        self.node._cleanup(self.runs['a'])
+        assert_equal(self.get_opened(), ['a', 'b', 'c'])
+        assert_equal(first.run_ids, {'b', 'c'})
+        assert_equal(self.node.run_states['c'].connection, first)
+        assert_equal(self.connect_defers[1][0].run_ids, set())
+
+    def test_connection_failed_moves_runs(self):
+        self.start('abc')
+        first = self.connected(0)
+        first.run_ids.discard('a')
+        self.connect_defers[1][1].errback(failure.Failure(ValueError()))
+        assert_equal(self.get_opened(), ['a', 'b', 'c'])
+        assert_equal(first.run_ids, {'b', 'c'})
+        assert not self.node._fail_run.called
+        assert_equal(self.node.pool.connections, [first])
+
+    def test_connection_failed_fails_runs(self):
+        self.start('a')
+        self.connect_defers[0][1].errback(failure.Failure(ValueError()))
+        run, result = self.node._fail_run.call_args[0]
+        assert_equal(run, self.runs['a'])
+        assert isinstance(result.value, node.ConnectError)
+        assert_equal(self.node.pool.connections, [])
+
+    def test_prewarm(self):
+        self.node.node_settings.prewarm_seconds = 30
+        self.node.prewarm(100)
+        self.reactor.callLater.assert_called_once_with(
+            70,
+            self.node._prewarm,
+            30,
+        )
+
+    def test_prewarm_disabled(self):
+        self.node.node_settings.prewarm_seconds = 0
+        self.node.prewarm(100)
+        assert not self.reactor.callLater.called
+
+    def test__prewarm(self):
+        self.node._prewarm(30)
+        assert_equal(len(self.connect_defers), 1)
+        pooled = self.connected(0)
+        assert_equal(pooled.keep_until, 130)
+
+        self.node._prewarm(30)
+        self.start('a')
+        assert_equal(len(self.connect_defers), 1)
+        assert_equal(self.get_opened(), ['a'])
+
+    def test__prewarm_connecting(self):
+        self.start('a')
+        self.node._prewarm(30)
+        assert_equal(len(self.connect_defers), 1)
+
+    def test_update_reconnect(self):
+        self.start('abc')
+        first = self.connected(0)
+        connecting = self.connect_defers[1][0]
+        config = mock.Mock(hostname='otherhost', port=22)
+        self.node.update(
+            config,
+            self.node.conch_options,
+            self.node.pub_key,
+            self.node.node_settings,
+        )
+        assert first.retired
+        assert connecting.retired
+        assert_equal(first.run_ids, {'a', 'b'})
+        assert_equal(connecting.run_ids, set())
+        assert_equal(len(self.connect_defers), 3)
+        assert_equal(self.connect_defers[2][0].run_ids, {'c'})
+        assert_equal(self.node.hostname, 'otherhost')
+
+    def test_keepalive_scheduled(self):
+        self.node.node_settings.keepalive_interval = 10
+        self.start('a')
+        pooled = self.connected(0)
+        self.reactor.callLater.assert_called_once_with(
+            10,
+            self.node._send_keepalive,
+            pooled,
+        )
+
+    def test_send_keepalive(self):
+        self.node.node_settings.keepalive_interval = 10
+        self.start('a')
+        pooled = self.connected(0)
+        reply = pooled.connection.send_keepalive.return_value = defer.Deferred()
+        self.node._send_keepalive(pooled)
+        assert_equal(pooled.missed_keepalives, 1)
+        assert_equal(self.reactor.callLater.call_count, 2)
+
+        reply.errback(failure.Failure(ValueError()))
+        assert_equal(pooled.missed_keepalives, 0)
+
+    def test_send_keepalive_unhealthy(self):
+        metrics.clear()
+        self.start('a')
+        pooled = self.connected(0)
+        pooled.missed_keepalives = 3
+        self.node._send_keepalive(pooled)
+        pooled.connection.abort.assert_called_with()
+        assert not pooled.connection.send_keepalive.called
+        assert not pooled.is_healthy
+        assert_equal(self.node.pool.get_connected(), None)
+        unhealthy = metrics.get_metric('counter', 'node.connection.unhealthy')
+        assert_equal(unhealthy.value, 1)
+        metrics.clear()
+
+    def fail_connect(self, index):
+        self.connect_defers[index][1].errback(
+            failure.Failure(ValueError('refused')),
+        )
+
+    def test_circuit_breaker_opens(self):
+        metrics.clear()
+        self.node.node_settings.circuit_breaker_threshold = 2
+        self.node.node_settings.circuit_breaker_timeout = 30
+        self.start('a')
+        self.fail_connect(0)
+        assert self.node.is_available()
+        self.start('b')
+        self.fail_connect(1)
+        assert not self.node.is_available()
+        health = self.node.get_health()
+        assert_equal(health['state'], node.NodeHealth.DOWN)
+        assert_equal(health['consecutive_failures'], 2)
+        assert_equal(health['last_error'], 'refused')
+        self.reactor.callLater.assert_called_once_with(30, self.node._probe)
+        down = metrics.get_metric('counter', 'node.health.down')
+        assert_equal(down.value, 1)
+        metrics.clear()
+
+    def test_circuit_breaker_disabled(self):
+        self.node.node_settings.circuit_breaker_threshold = 0
+        for index, run_id in enumerate('abcd'):
+            self.start(run_id)
+            self.fail_connect(index)
+        assert self.node.is_available()
+        assert_equal(self.node.health.consecutive_failures, 4)
+
+    def test_do_run_node_down(self):
+        self.node.health.state = node.NodeHealth.DOWN
+        self.start('a')
+        assert_equal(self.connect_defers, [])
+        run, result = self.node._fail_run.call_args[0]
+        assert_equal(run, self.runs['a'])
+        assert isinstance(result.value, node.ConnectError)
+
+    def test_probe_restores_node(self):
+        self.node.health.state = node.NodeHealth.DOWN
+        self.node.health.consecutive_failures = 3
+        self.node._probe()
+        assert_equal(self.node.health.state, node.NodeHealth.PROBING)
+        assert_equal(len(self.connect_defers), 1)
+
+        # Runs started while probing wait for the probe connection
+        self.start('a')
+        assert_equal(len(self.connect_defers), 1)
+        self.connected(0)
+        assert self.node.is_available()
+        assert_equal(self.node.health.consecutive_failures, 0)
+        assert_equal(self.get_opened(), ['a'])
+
+    def test_probe_failed(self):
+        self.node.node_settings.circuit_breaker_timeout = 30
+        self.node.health.state = node.NodeHealth.DOWN
+        self.node._probe()
+        self.fail_connect(0)
+        assert not self.node.is_available()
+        self.reactor.callLater.assert_called_once_with(30, self.node._probe)
+
+    def test_update_resets_health(self):
+        self.node.health.state = node.NodeHealth.DOWN
+        config = mock.Mock(hostname='otherhost', port=22)
+        self.node.update(
+            config,
+            self.node.conch_options,
+            self.node.pub_key,
+            self.node.node_settings,
+        )
+        assert self.node.is_available()
+
+    def test_service_stopped(self):
+        self.start('abc')
+        first = self.connected(0)
+        self.node.run_states['a'].state = node.RUN_STATE_RUNNING
+        self.node.run_states['b'].state = node.RUN_STATE_CONNECTING
+        self.node._service_stopped(first.connection, first)
+        self.node._fail_run.assert_called_once_with(self.runs['a'], None)
+        assert first not in self.node.pool.connections
+        assert_equal(self.connect_defers[1][0].run_ids, {'b', 'c'})
+        assert_equal(
+            self.node.run_states['b'].connection,
+            self.connect_defers[1][0],
+        )
+
+
+class TestNodeSSHServer(TestCase):
+    """Run commands on a Node connected to an in-process SSH server."""
+
+    @setup_teardown
+    def setup_server(self):
+        metrics.clear()
+        self.server = sshserver.SSHServer('batch', 'tests/test_id_rsa.pub')
+        config = mock.Mock(
+            hostname='127.0.0.1',
+            username='batch',
+            port=self.server.port_number,
+        )
+        config.name = 'local'
+        ssh_options = ssh.SSHAuthOptions(['tests/test_id_rsa'], False)
+        self.node_settings = config_parse.valid_ssh_options.validate(
+            {
+                'agent': False,
+                'max_channels_per_connection': 2,
+                'idle_connection_timeout': 0,
+                'jitter_min_load': 100,
+            },
+            config_utils.NullConfigContext,
+        )
+        self.node = node.Node(
+            config,
+            ssh_options,
+            self.server.host_key,
+            self.node_settings,
+        )
+        yield
+        for pooled in list(self.node.pool.connections):
+            if pooled.is_connected:
+                pooled.connection.transport.loseConnection()
+        self.server.stop()
+        self.iterate_until(lambda: not self.node.pool.connections)
+        metrics.clear()
+
+    def iterate_until(self, condition, timeout=10):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            reactor.iterate(0.01)
+        return condition()
+
+    def test_run_commands(self):
+        commands = [
+            actioncommand.ActionCommand('run.%d' % i, 'cmd%d' % i)
+            for i in range(5)
+        ]
+        deferreds = [self.node.run(command) for command in commands]
+        assert_equal(len(self.node.pool.connections), 3)
+
+        assert self.iterate_until(lambda: all(d.called for d in deferreds))
+        for command in commands:
+            assert_equal(command.exit_status, 0)
+        assert_equal(
+            sorted(self.server.commands),
+            [command.command.encode() for command in commands],
+        )
+        assert_equal(self.server.connections, 3)
+        latency = metrics.get_metric('timer', 'node.start_latency')
+        assert_equal(latency.count, 5)
+
+        # Idle connections are closed
+        assert self.iterate_until(lambda: not self.node.pool.connections)
+        assert_equal(self.node.run_states, {})
+
+    def test_keepalive_reconnect(self):
+        self.node.node_settings = self.node_settings._replace(
+            keepalive_interval=0.05,
+            keepalive_count_max=2,
+            prewarm_seconds=30,
+        )
+        self.node.prewarm(0)
+        assert self.iterate_until(
+            lambda: any(p.is_connected for p in self.node.pool.connections),
+        )
+        # Keepalives are answered
+        self.iterate_until(lambda: False, timeout=0.3)
+        assert_equal(len(self.node.pool.connections), 1)
+
+        self.server.stop_responding()
+        assert self.iterate_until(lambda: not self.node.pool.connections)
+        unhealthy = metrics.get_metric('counter', 'node.connection.unhealthy')
+        assert_equal(unhealthy.value, 1)
+
+        command = actioncommand.ActionCommand('run.0', 'cmd0')
+        deferred = self.node.run(command)
+        assert self.iterate_until(lambda: deferred.called)
+        assert_equal(command.exit_status, 0)
+        assert_equal(self.server.connections, 2)
+
+    def test_update_keeps_connection(self):
+        self.node.node_settings = self.node_settings._replace(
+            idle_connection_timeout=60,
+        )
+        first = actioncommand.ActionCommand('run.0', 'cmd0')
+        first_deferred = self.node.run(first)
+        assert self.iterate_until(
+            lambda: any(p.is_connected for p in self.node.pool.connections),
+        )
+
+        self.node.update(
+            self.node.config,
+            self.node.conch_options,
+            self.node.pub_key,
+            self.node.node_settings._replace(jitter_max_delay=10),
+        )
+        second = actioncommand.ActionCommand('run.1', 'cmd1')
+        second_deferred = self.node.run(second)
+        assert self.iterate_until(
+            lambda: first_deferred.called and second_deferred.called,
+        )
+        assert_equal([first.exit_status, second.exit_status], [0, 0])
+        assert_equal(self.server.connections, 1)
+
+    def test_prewarm(self):
+        self.node_settings = self.node_settings._replace(
+            idle_connection_timeout=60,
+            prewarm_seconds=30,
+        )
+        self.node.node_settings = self.node_settings
+        self.node.prewarm(0)
+        assert self.iterate_until(
+            lambda: any(p.is_connected for p in self.node.pool.connections),
+        )
+        assert_equal(self.server.connections, 1)
+
+        command = actioncommand.ActionCommand('run.0', 'cmd0')
+        deferred = self.node.run(command)
+        assert self.iterate_until(lambda: deferred.called)
+        assert_equal(command.exit_status, 0)
+        assert_equal(self.server.connections, 1)
+        warm = metrics.get_metric('counter', 'node.connection.warm')
+        assert_equal(warm.value, 1)
+
+
 class TestNodePool(TestCase):
     @setup
     def setup_nodes(self):
         self.nodes = [build_node(name='node%s' % i) for i in range(5)]
+        for i, pool_node in enumerate(self.nodes):
+            pool_node.config.name = 'node%s' % i
         self.node_pool = node.NodePool(self.nodes, 'thename')
 
     def test_from_config(self):
         name = 'the pool name'
         nodes = [create_mock_node(), create_mock_node()]
-        config = mock.Mock(name=name)
+        config = schema.ConfigNodePool(
+            nodes=['a', 'b'],
+            name=name,
+            selection='power_of_two',
+            weights={},
+        )
         new_pool = node.NodePool.from_config(config, nodes)
         assert_equal(new_pool.name, config.name)
         assert_equal(new_pool.nodes, nodes)
+        assert_equal(new_pool.selection, 'power_of_two')
 
     def test__init__(self):
         new_node = node.NodePool(self.nodes, 'thename')
@@ -257,6 +1119,8 @@ class TestNodePool(TestCase):
     def test__eq__(self):
         other_pool = node.NodePool(self.nodes, 'othername')
         assert_equal(self.node_pool, other_pool)
+        other_pool = node.NodePool(self.nodes, 'thename', 'round_robin')
+        assert_not_equal(self.node_pool, other_pool)
 
     def test_next(self):
         # Call next many times
@@ -264,12 +1128,102 @@ class TestNodePool(TestCase):
             assert_in(self.node_pool.next(), self.nodes)
 
     def test_next_round_robin(self):
+        self.node_pool.selection = 'round_robin'
         node_order = [
-            self.node_pool.next_round_robin()
-            for _ in range(len(self.nodes) * 2)
+            self.node_pool.next() for _ in range(len(self.nodes) * 2)
         ]
         assert_equal(node_order, self.nodes + self.nodes)
 
+    def test_update_keeps_round_robin(self):
+        self.node_pool.selection = 'round_robin'
+        self.node_pool.next()
+        self.node_pool.update(list(self.nodes), 'round_robin')
+        assert_equal(self.node_pool.next(), self.nodes[1])
+
+        self.node_pool.update(self.nodes[2:], 'round_robin')
+        assert_equal(self.node_pool.next(), self.nodes[2])
+
+    def test_update_keeps_current_weights(self):
+        self.node_pool.update(self.nodes, 'weighted_round_robin', {'node0': 3})
+        self.node_pool.next()
+        weights = dict(self.node_pool.current_weights)
+        self.node_pool.update(self.nodes[:4], 'weighted_round_robin')
+        del weights['node4']
+        assert_equal(self.node_pool.current_weights, weights)
+
+    def test_next_round_robin_skips_down_nodes(self):
+        self.node_pool.selection = 'round_robin'
+        self.nodes[1].health.state = node.NodeHealth.DOWN
+        self.nodes[2].health.state = node.NodeHealth.DOWN
+        node_order = [self.node_pool.next() for _ in range(6)]
+        assert_equal(node_order, [self.nodes[i] for i in (0, 3, 4, 0, 3, 4)])
+
+    def test_next_skips_down_nodes(self):
+        for pool_node in self.nodes[1:]:
+            pool_node.health.state = node.NodeHealth.DOWN
+        for _ in range(5):
+            assert_equal(self.node_pool.next(), self.nodes[0])
+
+    def test_next_all_nodes_down(self):
+        for pool_node in self.nodes:
+            pool_node.health.state = node.NodeHealth.DOWN
+        assert_in(self.node_pool.next(), self.nodes)
+
+    def set_run_counts(self, *counts):
+        for pool_node, count in zip(self.nodes, counts):
+            pool_node.run_states = {i: mock.Mock() for i in range(count)}
+
+    def test_next_least_outstanding(self):
+        self.node_pool.selection = 'least_outstanding'
+        self.set_run_counts(3, 1, 2, 1, 4)
+        for _ in range(10):
+            assert_in(
+                self.node_pool.next(),
+                [self.nodes[1], self.nodes[3]],
+            )
+
+    def test_next_weighted_round_robin(self):
+        self.node_pool.selection = 'weighted_round_robin'
+        self.node_pool.weights = {'node0': 3, 'node2': 2}
+        node_order = [
+            self.node_pool.next().get_name() for _ in range(8 * 2)
+        ]
+        assert_equal(
+            node_order[:8],
+            [
+                'node0',
+                'node2',
+                'node1',
+                'node0',
+                'node3',
+                'node4',
+                'node2',
+                'node0',
+            ],
+        )
+        assert_equal(node_order[8:], node_order[:8])
+
+    @mock.patch('tron.node.random.sample', autospec=True)
+    def test_next_power_of_two(self, mock_sample):
+        self.node_pool.selection = 'power_of_two'
+        self.set_run_counts(3, 1, 2, 1, 4)
+        mock_sample.return_value = [self.nodes[0], self.nodes[2]]
+        assert_equal(self.node_pool.next(), self.nodes[2])
+        mock_sample.return_value = [self.nodes[1], self.nodes[3]]
+        assert_equal(self.node_pool.next(), self.nodes[1])
+        mock_sample.assert_called_with(self.nodes, 2)
+
+    def test_next_single_node(self):
+        pool = node.NodePool(self.nodes[:1], 'single', 'power_of_two')
+        assert_equal(pool.next(), self.nodes[0])
+
+    def test_get_run_counts(self):
+        self.set_run_counts(3, 1, 2, 1, 4)
+        assert_equal(
+            self.node_pool.get_run_counts(),
+            {'node0': 3, 'node1': 1, 'node2': 2, 'node3': 1, 'node4': 4},
+        )
+
 
 if __name__ == '__main__':
     run()
@@ -105,6 +105,67 @@ class GeneralSchedulerTestCase(testingutils.MockTimeTestCase):
         self.scheduler.jitter = datetime.timedelta(seconds=300)
         assert_equal(str(self.scheduler), "daily  (+/- 0:05:00)")
 
+    def test_next_run_time_with_offset(self):
+        offset = datetime.timedelta(seconds=90)
+        self.scheduler.offset = offset
+        next_run = self.scheduler.next_run_time(self.yesterday)
+        assert_equal(self.expected_time(self.today) + offset, next_run)
+
+        # The offset run time is not used to find the next match
+        next_run = self.scheduler.next_run_time(next_run)
+        assert_equal(self.expected_time(self.tomorrow) + offset, next_run)
+
+    def test_next_run_time_with_offset_from_now(self):
+        # Started after the schedule, but before the offset run time
+        offset = datetime.timedelta(minutes=45)
+        self.scheduler.offset = offset
+        next_run = self.scheduler.next_run_time(None)
+        assert_equal(self.expected_time(self.today) + offset, next_run)
+
+    def test_next_run_time_offset_larger_than_period(self):
+        sched = scheduler.GeneralScheduler(
+            minutes=range(60),
+            seconds=[0],
+        )
+        sched.offset = datetime.timedelta(minutes=3)
+        start = datetime.datetime(2012, 3, 14, 15, 3, 0)
+        next_run = sched.next_run_time(start)
+        assert_equal(next_run, datetime.datetime(2012, 3, 14, 15, 4, 0))
+
+    def test_eq_with_offset(self):
+        other = scheduler.GeneralScheduler(timestr='14:30')
+        assert_equal(self.scheduler, other)
+        other.offset = datetime.timedelta(seconds=1)
+        assert self.scheduler != other
+
+    def test__str__with_offset(self):
+        self.scheduler.offset = datetime.timedelta(seconds=30)
+        assert_equal(str(self.scheduler), "daily  (+0:00:30)")
+
+    def test_get_match_upcoming(self):
+        time_spec = self.scheduler.time_spec
+        with mock.patch.object(
+            time_spec,
+            'get_match',
+            wraps=time_spec.get_match,
+        ) as mock_get_match:
+            run_time = self.scheduler.next_run_time(self.yesterday)
+            assert_equal(mock_get_match.call_count, 1)
+            for days in range(1, scheduler.UPCOMING_RUN_TIMES + 1):
+                run_time = self.scheduler.next_run_time(run_time)
+                expected = self.today + datetime.timedelta(days=days)
+                assert_equal(run_time, self.expected_time(expected))
+            assert_equal(
+                mock_get_match.call_count,
+                scheduler.UPCOMING_RUN_TIMES + 1,
+            )
+
+    def test_get_match_not_sequential(self):
+        self.scheduler.next_run_time(self.yesterday)
+        next_run = self.scheduler.next_run_time(self.now)
+        assert_equal(next_run, self.expected_time(self.tomorrow))
+        assert_equal(len(self.scheduler.upcoming), 1)
+
 
 class GeneralSchedulerTimeTestBase(testingutils.MockTimeTestCase):
 
@@ -442,6 +503,16 @@ class TestIntervalScheduler(TestCase):
         self.scheduler.jitter = datetime.timedelta(seconds=300)
         assert_equal(str(self.scheduler), "interval 0:00:07 (+/- 0:05:00)")
 
+    def test_next_run_time_with_offset(self):
+        offset = datetime.timedelta(seconds=3)
+        self.scheduler.offset = offset
+        run_time = self.scheduler.next_run_time(None)
+        assert_equal(run_time, self.now + self.interval + offset)
+
+        # The offset is kept from the previous run time
+        next_run_time = self.scheduler.next_run_time(run_time)
+        assert_equal(next_run_time, run_time + self.interval)
+
 
 if __name__ == '__main__':
     run()
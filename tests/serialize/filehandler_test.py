@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 
 import os
 import shutil
+import threading
 import time
 from tempfile import mkdtemp
 from tempfile import NamedTemporaryFile
@@ -17,6 +18,7 @@ from testifycompat import setup
 from testifycompat import suite
 from testifycompat import teardown
 from testifycompat import TestCase
+from tron.serialize import filehandler
 from tron.serialize.filehandler import FileHandleManager
 from tron.serialize.filehandler import NullFileHandle
 from tron.serialize.filehandler import OutputPath
@@ -26,6 +28,7 @@ from tron.serialize.filehandler import OutputStreamSerializer
 class TestFileHandleWrapper(TestCase):
     @setup
     def setup_fh_wrapper(self):
+        FileHandleManager.reset()
         self.file = NamedTemporaryFile('r')
         self.manager = FileHandleManager.get_instance()
         self.fh_wrapper = self.manager.open(self.file.name)
@@ -53,6 +56,29 @@ class TestFileHandleWrapper(TestCase):
         # This is somewhat coupled
         assert_not_in(self.fh_wrapper, self.manager.cache)
 
+    def test_close_while_writing(self):
+        self.fh_wrapper.write("some things")
+        # The writer thread is writing to the fh
+        self.fh_wrapper.lock.acquire()
+        closer = threading.Thread(target=self.fh_wrapper.close)
+        closer.start()
+        closer.join(0.05)
+        assert closer.is_alive()
+        self.fh_wrapper.lock.release()
+        closer.join()
+        assert_equal(self.fh_wrapper._fh, NullFileHandle)
+        assert_not_in(self.fh_wrapper, self.manager.cache.values())
+        assert_equal(self.file.read(), "some things")
+
+    def test_write_after_close(self):
+        self.fh_wrapper.write("some things")
+        self.fh_wrapper.close_wrapped()
+        self.fh_wrapper.write(" more things")
+        assert_not_equal(self.fh_wrapper._fh, NullFileHandle)
+        self.fh_wrapper.close_wrapped()
+        assert_equal(self.fh_wrapper.buffer, [])
+        assert_equal(self.file.read(), "some things more things")
+
     def test_write(self):
         # Test write without a previous open
         before_time = time.time()
@@ -84,6 +110,28 @@ class TestFileHandleWrapper(TestCase):
         with open(self.file.name) as fh:
             assert_equal(fh.read(), "123")
 
+    def test_write_buffered(self):
+        self.fh_wrapper.write("some things")
+        self.fh_wrapper.write(" and more")
+        assert_equal(self.fh_wrapper.buffered, 20)
+        assert_equal(self.manager.buffered_bytes, 20)
+        assert_equal(self.file.read(), "")
+
+        self.fh_wrapper.flush()
+        assert_equal(self.file.read(), "some things and more")
+        assert_equal(self.fh_wrapper.buffer, [])
+        assert_equal(self.manager.buffered_bytes, 0)
+
+    def test_write_over_max_buffered_bytes(self):
+        self.manager.max_buffered_bytes = 5
+        try:
+            self.fh_wrapper.write("1234")
+            assert_equal(self.file.read(), "")
+            self.fh_wrapper.write("5678")
+            assert_equal(self.file.read(), "12345678")
+        finally:
+            self.manager.max_buffered_bytes = filehandler.MAX_BUFFERED_BYTES
+
 
 class TestFileHandleManager(TestCase):
     @setup
@@ -97,6 +145,8 @@ class TestFileHandleManager(TestCase):
     @teardown
     def teardown_fh_manager(self):
         FileHandleManager.reset()
+        self.manager.buffer_size = filehandler.OUTPUT_BUFFER_SIZE
+        self.manager.flush_interval = filehandler.OUTPUT_FLUSH_INTERVAL
 
     def test_get_instance(self):
         assert_equal(self.manager, FileHandleManager.get_instance())
@@ -203,6 +253,54 @@ class TestFileHandleManager(TestCase):
         self.manager.remove(fh_wrapper)
         assert_not_in(fh_wrapper.name, self.manager.cache)
 
+    def test_flush(self):
+        fh_wrapper1 = self.manager.open(self.file1.name)
+        fh_wrapper2 = self.manager.open(self.file2.name)
+        fh_wrapper1.write("one")
+        fh_wrapper2.write("two")
+        self.manager.flush(self.file1.name)
+        assert_equal(self.file1.read(), "one")
+        assert_equal(self.file2.read(), "")
+
+        self.manager.flush()
+        assert_equal(self.file2.read(), "two")
+
+    def test_get_due(self):
+        self.manager.buffer_size = 10
+        fh_wrappers = [
+            self.manager.open(self.file1.name),
+            self.manager.open(self.file2.name),
+            self.manager.open(NamedTemporaryFile('r').name),
+        ]
+        for fh_wrapper, content in zip(fh_wrappers, [b"0123456789", b"x"]):
+            fh_wrapper.buffer = [content]
+            fh_wrapper.buffered = len(content)
+            fh_wrapper.buffered_since = 100
+            self.manager.buffered_bytes += len(content)
+        assert_equal(self.manager._get_due(100.5), [fh_wrappers[0]])
+        assert_equal(self.manager._get_due(101), fh_wrappers[:2])
+
+    def test_writer(self):
+        self.manager.flush_interval = 0.05
+        fh_wrapper = self.manager.open(self.file1.name)
+        fh_wrapper.write("Some things")
+        assert self.manager.writer.is_alive()
+        for _ in range(100):
+            if not fh_wrapper.buffer:
+                break
+            time.sleep(0.01)
+        assert_equal(self.file1.read(), "Some things")
+
+    def test_stop(self):
+        fh_wrapper = self.manager.open(self.file1.name)
+        fh_wrapper.write("Some things")
+        writer = self.manager.writer
+        self.manager.stop()
+        assert not writer.is_alive()
+
+        fh_wrapper.write(" and more")
+        assert self.manager.writer.is_alive()
+
     def test_update(self):
         fh_wrapper1 = self.manager.open(self.file1.name)
         fh_wrapper2 = self.manager.open(self.file2.name)
@@ -258,6 +356,11 @@ class TestOutputStreamSerializer(TestCase):
         self._write_contents()
         assert_equal(self.serial.tail(self.filename, 1), self.expected[-1:])
 
+    def test_tail_buffered(self):
+        with self.serial.open(self.filename) as fh:
+            fh.write(self.content)
+            assert_equal(self.serial.tail(self.filename), self.expected)
+
     def test_tail_file_does_not_exist(self):
         file_dne = 'bogusfile123'
         assert_equal(self.serial.tail(file_dne), [])
@@ -1,12 +1,18 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import os
+import shutil
+import tempfile
+
 import mock
+from twisted.conch.ssh import keys
 from twisted.python import failure
 
 from testifycompat import assert_equal
 from testifycompat import assert_not_equal
 from testifycompat import setup
+from testifycompat import setup_teardown
 from testifycompat import TestCase
 from tests.testingutils import autospec_method
 from tron import ssh
@@ -81,3 +87,57 @@ class TestSSHAuthOptions(TestCase):
             ssh.SSHAuthOptions.from_config(config),
             ssh.SSHAuthOptions.from_config(second_config),
         )
+
+
+class TestIdentityKeyCache(TestCase):
+    @setup_teardown
+    def setup_cache(self):
+        self.cache = ssh.IdentityKeyCache()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'id_rsa.pub')
+        shutil.copy('tests/test_id_rsa.pub', self.path)
+        yield
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_key_missing(self):
+        assert_equal(self.cache.get_key(self.path + '.missing'), None)
+
+    def test_get_key_cached(self):
+        with mock.patch.object(
+            keys.Key,
+            'fromFile',
+            autospec=True,
+            side_effect=keys.Key.fromFile,
+        ) as mock_from_file:
+            key = self.cache.get_key(self.path)
+            assert_equal(self.cache.get_key(self.path), key)
+            assert_equal(mock_from_file.call_count, 1)
+
+            stat = os.stat(self.path)
+            os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+            assert_equal(self.cache.get_key(self.path), key)
+            assert_equal(mock_from_file.call_count, 2)
+
+
+class TestNoPasswordAuthClient(TestCase):
+    @setup_teardown
+    def setup_client(self):
+        options = ssh.SSHAuthOptions(
+            ['tests/missing_id_rsa', 'tests/test_id_rsa'],
+            False,
+        )
+        self.client = ssh.NoPasswordAuthClient('user', options, mock.Mock())
+        ssh.identity_keys.clear()
+        yield
+        ssh.identity_keys.clear()
+
+    def test_getPublicKey(self):
+        key = self.client.getPublicKey()
+        assert_equal(key, keys.Key.fromFile('tests/test_id_rsa.pub'))
+        assert_equal(self.client.getPublicKey(), None)
+
+    def test_getPrivateKey(self):
+        self.client.getPublicKey()
+        result = self.client.getPrivateKey()
+        assert_equal(result.result, keys.Key.fromFile('tests/test_id_rsa'))
+        assert_equal(len(ssh.identity_keys.keys), 2)
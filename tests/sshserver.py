@@ -0,0 +1,140 @@
+"""
+ An in-process SSH server for testing Node connections.
+
+ Commands are not run. Each command writes its own name to stdout and exits
+ with status 0 shortly after.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import struct
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from twisted.conch import avatar
+from twisted.conch.checkers import InMemorySSHKeyDB
+from twisted.conch.checkers import SSHPublicKeyChecker
+from twisted.conch.interfaces import ISession
+from twisted.conch.ssh import connection
+from twisted.conch.ssh import factory
+from twisted.conch.ssh import keys
+from twisted.conch.ssh import session
+from twisted.conch.ssh import userauth
+from twisted.cred import portal
+from twisted.internet import reactor
+from twisted.python import components
+from zope.interface import implementer
+
+# Seconds a command runs for
+COMMAND_DURATION = 0.05
+
+
+class ExecAvatar(avatar.ConchUser):
+    def __init__(self, username, server):
+        avatar.ConchUser.__init__(self)
+        self.username = username
+        self.server = server
+        self.channelLookup.update({b'session': session.SSHSession})
+
+
+@implementer(ISession)
+class ExecSession(object):
+    def __init__(self, avatar):
+        self.avatar = avatar
+
+    def execCommand(self, proto, command):
+        self.avatar.server.commands.append(command)
+        proto.write(command)
+        reactor.callLater(COMMAND_DURATION, self.exit, proto)
+
+    def exit(self, proto):
+        proto.session.conn.sendRequest(
+            proto.session,
+            b'exit-status',
+            struct.pack('>L', 0),
+        )
+        proto.session.loseConnection()
+
+    def getPty(self, term, window_size, modes):
+        pass
+
+    def openShell(self, proto):
+        raise NotImplementedError()
+
+    def eofReceived(self):
+        pass
+
+    def closed(self):
+        pass
+
+    def windowChanged(self, window_size):
+        pass
+
+
+components.registerAdapter(ExecSession, ExecAvatar, ISession)
+
+
+@implementer(portal.IRealm)
+class Realm(object):
+    def __init__(self, server):
+        self.server = server
+
+    def requestAvatar(self, avatar_id, mind, *interfaces):
+        return interfaces[0], ExecAvatar(avatar_id, self.server), lambda: None
+
+
+class RecordingSSHFactory(factory.SSHFactory):
+    def buildProtocol(self, addr):
+        protocol = factory.SSHFactory.buildProtocol(self, addr)
+        self.server.protocols.append(protocol)
+        return protocol
+
+
+class SSHServer(object):
+    """An SSH server listening on a random local port, which accepts the
+    public key at pub_key_path for username.
+    """
+
+    def __init__(self, username, pub_key_path):
+        self.commands = []
+        self.protocols = []
+        private_key = keys.Key(
+            rsa.generate_private_key(65537, 2048, default_backend()),
+        )
+        self.host_key = private_key.public()
+
+        ssh_factory = RecordingSSHFactory()
+        ssh_factory.server = self
+        ssh_factory.publicKeys = {b'ssh-rsa': self.host_key}
+        ssh_factory.privateKeys = {b'ssh-rsa': private_key}
+        ssh_factory.services = {
+            b'ssh-userauth': userauth.SSHUserAuthServer,
+            b'ssh-connection': connection.SSHConnection,
+        }
+        ssh_factory.portal = portal.Portal(Realm(self))
+        ssh_factory.portal.registerChecker(
+            SSHPublicKeyChecker(
+                InMemorySSHKeyDB({
+                    username.encode(): [keys.Key.fromFile(pub_key_path)],
+                }),
+            ),
+        )
+        self.port = reactor.listenTCP(0, ssh_factory, interface='127.0.0.1')
+
+    @property
+    def connections(self):
+        return len(self.protocols)
+
+    def stop_responding(self):
+        """Stop reading from the open connections, like a hung host."""
+        for protocol in self.protocols:
+            protocol.transport.stopReading()
+
+    @property
+    def port_number(self):
+        return self.port.getHost().port
+
+    def stop(self):
+        for protocol in self.protocols:
+            protocol.transport.abortConnection()
+        return self.port.stopListening()
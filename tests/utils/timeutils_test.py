@@ -285,6 +285,15 @@ class DateArithmeticTestCase(testingutils.MockTimeTestCase):
         assert DateArithmetic.parse('~~') is None
 
 
+class TestDateArithmeticParseSpec(TestCase):
+    def test_parse_spec(self):
+        assert_equal(DateArithmetic.parse_spec('shortdate-1'), ('shortdate', -1))
+        assert_equal(DateArithmetic.parse_spec('year'), ('year', 0))
+
+    def test_parse_spec_no_match(self):
+        assert DateArithmetic.parse_spec('-1') is None
+
+
 class TestDateArithmeticWithTimezone(DateArithmeticTestCase):
 
     now = pytz.timezone("US/Pacific").localize(datetime.datetime(2012, 3, 20))
@@ -1,7 +1,12 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import calendar
 import datetime
+import random
+from itertools import islice
+
+import pytz
 
 from testifycompat import assert_equal
 from testifycompat import run
@@ -132,6 +137,242 @@ class TestTimeSpecification(TestCase):
         time = time_spec.next_time(start_date, False)
         assert_equal(time, datetime.time(1, 20, 4))
 
+    def test_get_days_monthday_is_last(self):
+        time_spec = trontimespec.TimeSpecification(monthdays=[28, 'LAST'])
+        assert_equal(time_spec.get_days(2018, 2), (28,))
+        assert_equal(time_spec.get_days(2018, 3), (28, 31))
+        match = time_spec.get_match(datetime.datetime(2018, 2, 28))
+        assert_equal(match, datetime.datetime(2018, 3, 28))
+
+
+class ReferenceTimeSpecification(trontimespec.TimeSpecification):
+    """The original search, which filters every month, day and time and
+    localizes every match with pytz, used to check the compiled search.
+    """
+
+    def next_day(self, first_day, year, month):
+        first_day_of_month, last_day_of_month = calendar.monthrange(
+            year,
+            month,
+        )
+
+        def map_last(day):
+            return last_day_of_month if day == trontimespec.TOKEN_LAST else day
+
+        def sort_days(days):
+            return sorted(
+                day for day in days if first_day <= day <= last_day_of_month
+            )
+
+        if self.monthdays:
+            return sort_days(map_last(day) for day in self.monthdays)
+
+        start_day = (first_day_of_month + 1) % 7
+
+        def days_from_weekdays():
+            for ordinal in self.ordinals:
+                week = (ordinal - 1) * 7
+                for weekday in self.weekdays:
+                    yield ((weekday - start_day) % 7) + week + 1
+
+        return sort_days(days_from_weekdays())
+
+    def next_month(self, start_date):
+        potential = [m for m in self.months if m >= start_date.month]
+        year_wraps = 0
+        while True:
+            if not potential:
+                year_wraps += 1
+                potential = list(self.months)
+            yield potential.pop(0), start_date.year + year_wraps
+
+    def next_time(self, start_date, is_start_day):
+        for hour in self.hours:
+            if is_start_day and hour < start_date.hour:
+                continue
+            for minute in self.minutes:
+                for second in self.seconds:
+                    candidate = datetime.time(hour, minute, second)
+                    if is_start_day and start_date.time() >= candidate:
+                        continue
+                    return candidate
+
+    def localize(self, out):
+        try:
+            return self.timezone.localize(out, is_dst=None)
+        except pytz.AmbiguousTimeError:
+            return self.timezone.localize(out)
+        except pytz.NonExistentTimeError:
+            try:
+                return self.timezone.localize(
+                    out + datetime.timedelta(minutes=60),
+                )
+            except pytz.NonExistentTimeError:
+                return None
+
+    def get_match(self, start):
+        start_date = trontimespec.to_timezone(
+            start,
+            self.timezone,
+        ).replace(tzinfo=None)
+
+        for month, year in self.next_month(start_date):
+            first_day = 1
+            if (month, year) == (start_date.month, start_date.year):
+                first_day = start_date.day
+
+            for day in self.next_day(first_day, year, month):
+                is_start_day = start_date.timetuple()[:3] == (year, month, day)
+                time = self.next_time(start_date, is_start_day)
+                if time is None:
+                    continue
+
+                candidate = start_date.replace(
+                    year,
+                    month,
+                    day,
+                    time.hour,
+                    time.minute,
+                    second=time.second,
+                    microsecond=0,
+                )
+                candidate = self.handle_timezone(candidate, start.tzinfo)
+                if candidate:
+                    return candidate
+
+
+class TestTimeSpecificationMatchesReference(TestCase):
+
+    time_zones = [None, 'US/Pacific', 'Europe/London', 'Australia/Sydney']
+
+    # Start times around the DST changes of each time zone
+    dst_edges = [
+        datetime.datetime(2017, 3, 12, 1, 30),
+        datetime.datetime(2017, 3, 12, 2, 30),
+        datetime.datetime(2017, 3, 26, 0, 59, 59),
+        datetime.datetime(2017, 4, 2, 2, 30),
+        datetime.datetime(2017, 10, 1, 2, 30),
+        datetime.datetime(2017, 10, 29, 1, 30),
+        datetime.datetime(2017, 11, 5, 0, 59, 59, 500000),
+        datetime.datetime(2017, 11, 5, 1, 30),
+    ]
+
+    def random_sample(self, rng, values, max_size):
+        return rng.sample(list(values), rng.randint(1, max_size))
+
+    def random_spec_kwargs(self, rng):
+        kwargs = {'timezone': rng.choice(self.time_zones)}
+        if rng.random() < 0.5:
+            kwargs['months'] = self.random_sample(rng, range(1, 13), 4)
+        day_kind = rng.choice(['monthdays', 'weekdays', 'ordinals', None])
+        if day_kind == 'monthdays':
+            days = self.random_sample(rng, range(1, 29), 3)
+            if rng.random() < 0.3:
+                days.append(trontimespec.TOKEN_LAST)
+            kwargs['monthdays'] = days
+        elif day_kind:
+            kwargs['weekdays'] = self.random_sample(rng, range(7), 3)
+            if day_kind == 'ordinals':
+                kwargs['ordinals'] = self.random_sample(rng, range(1, 5), 2)
+
+        if rng.random() < 0.3:
+            kwargs['timestr'] = '%02d:%02d' % (
+                rng.randint(0, 23),
+                rng.randint(0, 59),
+            )
+        else:
+            kwargs['hours'] = self.random_sample(rng, range(24), 4)
+            kwargs['minutes'] = self.random_sample(rng, range(60), 4)
+            kwargs['seconds'] = self.random_sample(rng, range(60), 2)
+        return kwargs
+
+    def random_start(self, rng, time_zone):
+        if rng.random() < 0.5:
+            start = rng.choice(self.dst_edges)
+            start += datetime.timedelta(minutes=rng.randint(-90, 90))
+        else:
+            start = datetime.datetime(2015, 1, 1) + datetime.timedelta(
+                seconds=rng.randint(0, 5 * 365 * 24 * 3600),
+            )
+        if time_zone and rng.random() < 0.5:
+            start = pytz.timezone(time_zone).localize(start)
+        elif rng.random() < 0.2:
+            start = pytz.utc.localize(start)
+        return start
+
+    def assert_matches_reference(self, kwargs, start, count=3):
+        time_spec = trontimespec.TimeSpecification(**kwargs)
+        reference = ReferenceTimeSpecification(**kwargs)
+        for _ in range(count):
+            expected = reference.get_match(start)
+            actual = time_spec.get_match(start)
+            assert_equal((actual, actual.tzinfo), (expected, expected.tzinfo))
+            start = actual
+
+    def test_random_corpus(self):
+        rng = random.Random(4242)
+        for _ in range(1500):
+            kwargs = self.random_spec_kwargs(rng)
+            start = self.random_start(rng, kwargs['timezone'])
+            self.assert_matches_reference(kwargs, start)
+
+    def test_get_matches_random_corpus(self):
+        rng = random.Random(2424)
+        for _ in range(500):
+            kwargs = self.random_spec_kwargs(rng)
+            start = self.random_start(rng, kwargs['timezone'])
+            time_spec = trontimespec.TimeSpecification(**kwargs)
+            reference = ReferenceTimeSpecification(**kwargs)
+            expected = []
+            match = start
+            for _ in range(20):
+                match = reference.get_match(match)
+                expected.append((match, match.tzinfo))
+            matches = time_spec.get_matches(start)
+            actual = [(match, match.tzinfo) for match in islice(matches, 20)]
+            assert_equal(actual, expected)
+
+    def test_get_matches_spring_forward(self):
+        time_spec = trontimespec.TimeSpecification(
+            hours=[1, 2, 3],
+            minutes=[0, 30],
+            seconds=[0],
+            timezone='US/Pacific',
+        )
+        start = pytz.timezone('US/Pacific').localize(
+            datetime.datetime(2017, 3, 12),
+        )
+        expected = []
+        match = start
+        for _ in range(8):
+            match = time_spec.get_match(match)
+            expected.append(match)
+        assert_equal(list(islice(time_spec.get_matches(start), 8)), expected)
+        assert_equal(
+            [match.strftime('%H:%M') for match in expected[:4]],
+            ['01:00', '01:30', '03:00', '03:30'],
+        )
+
+    def test_get_matches_monthday_is_last(self):
+        time_spec = trontimespec.TimeSpecification(monthdays=[28, 'LAST'])
+        matches = time_spec.get_matches(datetime.datetime(2018, 2, 1))
+        assert_equal(
+            list(islice(matches, 3)), [
+                datetime.datetime(2018, 2, 28),
+                datetime.datetime(2018, 3, 28),
+                datetime.datetime(2018, 3, 31),
+            ]
+        )
+
+    def test_sparse_fifth_weekday(self):
+        kwargs = {'ordinals': [5], 'weekdays': [5], 'months': [2]}
+        start = datetime.datetime(2013, 3, 1)
+        self.assert_matches_reference(kwargs, start, count=2)
+        assert_equal(
+            trontimespec.TimeSpecification(**kwargs).get_match(start),
+            datetime.datetime(2036, 2, 29),
+        )
+
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,90 @@
+"""Benchmark rendering action commands with StringFormatter.
+
+Renders a command which uses date arithmetic variables through the same
+context chain an ActionRun uses (action run, job run, job and the master
+command_context), with the compiled template path and with
+string.Formatter.format, and reports the time taken by each.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+import optparse
+import timeit
+from string import Formatter
+
+from tron import command_context
+from tron.config.config_utils import StringFormatter
+
+COMMAND = (
+    "run_batch --date {shortdate-1} --until {shortdate} --year {year} "
+    "--month {month-1} --epoch {unixtime-3600} --job {name} --run {runid} "
+    "--action {actionname} --host {node} --env {environment}"
+)
+
+
+class Stub(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def build_context():
+    node = Stub(hostname='batch1')
+    job = Stub(name='MASTER.batch', runs=Stub(last_success=None))
+    job_run = Stub(id='MASTER.batch.12', run_time=datetime.datetime(2018, 3, 4))
+    action_run = Stub(action_name='load', node=node)
+    master_context = {'environment': 'prod'}
+
+    context = command_context.CommandContext(
+        command_context.JobContext(job),
+        master_context,
+    )
+    context = command_context.CommandContext(
+        command_context.JobRunContext(job_run),
+        context,
+    )
+    return command_context.CommandContext(
+        command_context.ActionRunContext(action_run),
+        context,
+    )
+
+
+def parse_options():
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-n",
+        "--number",
+        type="int",
+        default=100000,
+        help="Number of commands to render.",
+    )
+    opts, _ = parser.parse_args()
+    return opts
+
+
+def main():
+    opts = parse_options()
+    context = build_context()
+
+    def render_compiled():
+        return StringFormatter(context).format(COMMAND)
+
+    def render_formatter():
+        return Formatter.format(StringFormatter(context), COMMAND)
+
+    assert render_compiled() == render_formatter()
+    print(render_compiled())
+    for name, func in [
+        ('compiled', render_compiled),
+        ('string.Formatter', render_formatter),
+    ]:
+        elapsed = timeit.timeit(func, number=opts.number)
+        print(
+            "%-18s %d commands in %.2fs (%.1fus each)" %
+            (name, opts.number, elapsed, elapsed / opts.number * 1e6),
+        )
+
+
+if __name__ == '__main__':
+    main()
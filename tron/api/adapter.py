@@ -15,6 +15,7 @@ from six.moves.urllib.parse import quote
 
 from tron import actioncommand
 from tron import scheduler
+from tron.core.admission import AdmissionController
 from tron.serialize import filehandler
 from tron.utils import timeutils
 from tron.utils.timeutils import delta_total_seconds
@@ -116,6 +117,7 @@ class ActionRunAdapter(RunAdapter):
         'run_num',
         'retries_delay',
         'in_delay',
+        'queue_position',
     ]
 
     def __init__(
@@ -171,6 +173,43 @@ class ActionRunAdapter(RunAdapter):
         if self._obj.in_delay is not None:
             return self._obj.in_delay.getTime() - time.time()
 
+    def get_queue_position(self):
+        controller = AdmissionController.get_instance()
+        return controller.get_queue_position(self._obj)
+
+
+class AdmissionQueueAdapter(object):
+    """Adapt the AdmissionController queue to a list of waiting action runs,
+    in the order they would be admitted.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def get_repr(self):
+        now = timeutils.current_timestamp()
+
+        def build(position, ticket):
+            return {
+                'position': position,
+                'id': ticket.action_run.id,
+                'job_name': ticket.job_name,
+                'namespace': ticket.namespace,
+                'node': ticket.node_name,
+                'priority': self.controller.job_priorities.get(
+                    ticket.job_name,
+                    0,
+                ),
+                'effective_priority': self.controller.get_priority(
+                    ticket,
+                    now,
+                ),
+                'wait_time': now - ticket.created,
+            }
+
+        tickets = self.controller.get_ordered_tickets()
+        return [build(position, ticket) for position, ticket in enumerate(tickets)]
+
 
 class ActionGraphAdapter(object):
     def __init__(self, action_graph):
@@ -254,7 +293,13 @@ class JobRunAdapter(RunAdapter):
 
 class JobAdapter(ReprAdapter):
 
-    field_names = ['status', 'all_nodes', 'allow_overlap', 'queueing']
+    field_names = [
+        'status',
+        'all_nodes',
+        'allow_overlap',
+        'queueing',
+        'restored',
+    ]
     translated_field_names = [
         'name',
         'scheduler',
@@ -379,6 +424,13 @@ class EventAdapter(ReprAdapter):
 
 class NodeAdapter(ReprAdapter):
     field_names = ['name', 'hostname', 'username', 'port']
+    translated_field_names = ['run_count', 'health']
+
+    def get_run_count(self):
+        return self._obj.get_run_count()
+
+    def get_health(self):
+        return self._obj.get_health()
 
 
 class NodePoolAdapter(ReprAdapter):
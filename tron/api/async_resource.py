@@ -46,3 +46,18 @@ class AsyncResource():
                         AsyncResource.semaphore.release()
 
         return wrapper
+
+    @staticmethod
+    def staged(request, prepare, apply):
+        """Call `prepare` in a thread without holding the semaphore, then call
+        `apply` with its result on the reactor thread while holding the whole
+        semaphore, like `exclusive`. Slow work, like validation, belongs in
+        `prepare`, so that other requests are only blocked while `apply`
+        runs. `prepare` runs at the same time as other requests, so any
+        shared state it modifies must be locked.
+        """
+        d = threads.deferToThread(prepare)
+        d.addCallback(AsyncResource.exclusive(apply))
+        d.addCallback(AsyncResource.finish, request)
+        d.addErrback(lambda f: f)
+        return server.NOT_DONE_YET
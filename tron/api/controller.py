@@ -3,15 +3,30 @@ Web Controllers for the API.
 """
 import logging
 
+import six
+
+from tron import metrics
 from tron import yaml
+from tron.config import manager
+from tron.utils import timeutils
 
 log = logging.getLogger(__name__)
 
 
+class JobNotRestoredError(Exception):
+    """Raised when a command is sent to a Job before trond has restored
+    its state.
+    """
+
+
 class UnknownCommandError(Exception):
     """Exception raised when a controller received an unknown command."""
 
 
+class InvalidCommandError(Exception):
+    """Raised when a command is sent with invalid arguments."""
+
+
 class JobCollectionController(object):
     def __init__(self, job_collection):
         self.job_collection = job_collection
@@ -114,7 +129,18 @@ class JobController(object):
     def __init__(self, job_scheduler):
         self.job_scheduler = job_scheduler
 
-    def handle_command(self, command, run_time=None):
+    def handle_command(
+        self,
+        command,
+        run_time=None,
+        start_date=None,
+        end_date=None,
+        max_in_flight=None,
+    ):
+        job = self.job_scheduler.get_job()
+        if not job.restored:
+            raise JobNotRestoredError(f"{job} is still being restored")
+
         if command == 'enable':
             self.job_scheduler.enable()
             return "%s is enabled" % self.job_scheduler.get_job()
@@ -127,9 +153,49 @@ class JobController(object):
             runs = self.job_scheduler.manual_start(run_time=run_time)
             return "Created %s" % ",".join(str(run) for run in runs)
 
+        elif command == 'backfill':
+            if not start_date:
+                raise InvalidCommandError("A backfill requires a start_date")
+            end_date = end_date or timeutils.current_time()
+            if end_date < start_date:
+                raise InvalidCommandError(
+                    "A backfill can not end before its start_date",
+                )
+            job_backfill = self.job_scheduler.backfill(
+                start_date,
+                end_date,
+                max_in_flight=max_in_flight,
+            )
+            return "Started %s for %s dates" % (
+                job_backfill,
+                len(job_backfill.run_times),
+            )
+
+        elif command == 'cancel_backfill':
+            cancelled = self.job_scheduler.cancel_backfills()
+            if not cancelled:
+                return "%s has no running backfills" % job
+            return "Cancelled %s" % ",".join(str(item) for item in cancelled)
+
         raise UnknownCommandError("Unknown command %s" % command)
 
 
+class BackfillController(object):
+    def __init__(self, job_backfill):
+        self.job_backfill = job_backfill
+
+    def handle_command(self, command):
+        if command != 'cancel':
+            raise UnknownCommandError("Unknown command %s" % command)
+
+        if self.job_backfill.cancel():
+            return "Cancelled %s" % self.job_backfill
+        return "Failed to cancel, %s is %s" % (
+            self.job_backfill,
+            self.job_backfill.state,
+        )
+
+
 class ConfigController(object):
     """Control config. Return config contents and accept updated configuration
     from the API.
@@ -162,17 +228,41 @@ class ConfigController(object):
         except Exception as e:
             return "Configuration update will fail: %s" % str(e)
 
+    def validate_config(self, name, content, config_hash):
+        """Validate a configuration fragment before it is updated. This is
+        called from a thread. It writes no files, and only modifies the
+        ConfigManager caches, which are locked.
+        """
+        if self.config_manager.get_hash(name) != config_hash:
+            return "Configuration has changed. Please try again."
+
+        start = timeutils.current_timestamp()
+        try:
+            self.config_manager.validate_config(name, content)
+        except Exception as e:
+            log.error("Configuration validation failed: %s" % e)
+            return str(e)
+        finally:
+            duration = timeutils.current_timestamp() - start
+            metrics.timer('api.config.validate', duration)
+            log.info(f"Validated config for {name} in {duration:.3f}s")
+
     def update_config(self, name, content, config_hash):
         """Update a configuration fragment and reload the MCP."""
         if self.config_manager.get_hash(name) != config_hash:
             return "Configuration has changed. Please try again."
 
+        start = timeutils.current_timestamp()
         try:
             self.config_manager.write_config(name, content)
             self.mcp.reconfigure()
         except Exception as e:
             log.error("Configuration update failed: %s" % e)
             return str(e)
+        finally:
+            duration = timeutils.current_timestamp() - start
+            metrics.timer('api.config.apply', duration)
+            log.info(f"Applied config for {name} in {duration:.3f}s")
 
     def delete_config(self, name, content, config_hash):
         """Delete a configuration fragment and reload the MCP."""
@@ -191,3 +281,88 @@ class ConfigController(object):
 
     def get_namespaces(self):
         return self.config_manager.get_namespaces()
+
+    def get_hashes(self):
+        return {
+            name: self.config_manager.get_hash(name)
+            for name in self.get_namespaces()
+        }
+
+    def get_hash_mismatches(self, configs):
+        """Return a dict of namespace to the current hash, for every config
+        in `configs` which was not uploaded with the current hash.
+        """
+        mismatches = {}
+        for name, config in six.iteritems(configs):
+            current_hash = self.config_manager.get_hash(name)
+            if current_hash != config['hash']:
+                mismatches[name] = {
+                    'expected': config['hash'],
+                    'current': current_hash,
+                }
+        return mismatches
+
+    def get_changed_configs(self, configs):
+        """Return a dict of namespace to content for every config in
+        `configs` which differs from the current config.
+        """
+        return {
+            name: config['config']
+            for name, config in six.iteritems(configs)
+            if manager.hash_digest(config['config']) != config['hash']
+        }
+
+    def validate_configs(self, configs):
+        """Validate several configuration fragments together. `configs` is a
+        dict of namespace to a dict with the 'config' content and the 'hash'
+        of the config it replaces. Returns a dict with an 'error' and the
+        'hash_mismatches' of every namespace, or an empty dict if the configs
+        are valid. This does not modify any state, and is called from a
+        thread.
+        """
+        mismatches = self.get_hash_mismatches(configs)
+        if mismatches:
+            return {
+                'error': "Configuration has changed. Please try again.",
+                'hash_mismatches': mismatches,
+            }
+
+        start = timeutils.current_timestamp()
+        try:
+            self.config_manager.validate_configs(
+                self.get_changed_configs(configs),
+            )
+        except Exception as e:
+            log.error("Configuration validation failed: %s" % e)
+            return {'error': str(e)}
+        finally:
+            duration = timeutils.current_timestamp() - start
+            metrics.timer('api.config.validate', duration)
+            log.info(f"Validated {len(configs)} configs in {duration:.3f}s")
+        return {}
+
+    def update_configs(self, configs):
+        """Update several configuration fragments, and reload the MCP
+        once. Returns a dict like validate_configs.
+        """
+        mismatches = self.get_hash_mismatches(configs)
+        if mismatches:
+            return {
+                'error': "Configuration has changed. Please try again.",
+                'hash_mismatches': mismatches,
+            }
+
+        changed = self.get_changed_configs(configs)
+        start = timeutils.current_timestamp()
+        try:
+            if changed:
+                self.config_manager.write_configs(changed)
+                self.mcp.reconfigure()
+        except Exception as e:
+            log.error("Configuration update failed: %s" % e)
+            return {'error': str(e)}
+        finally:
+            duration = timeutils.current_timestamp() - start
+            metrics.timer('api.config.apply', duration)
+            log.info(f"Applied {len(changed)} configs in {duration:.3f}s")
+        return {'updated': sorted(changed)}
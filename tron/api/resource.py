@@ -20,10 +20,16 @@ except ImportError:
 
 from twisted.web import http, resource, static, server
 
+from tron import metrics
+from tron import node
 from tron.api import adapter, controller
 from tron.api import requestargs
 from tron.api.async_resource import AsyncResource
+from tron.core import concurrency_forecast
+from tron.core import schedule_preview
+from tron.core.admission import AdmissionController
 from tron.utils import maybe_decode
+from tron.utils import timeutils
 
 log = logging.getLogger(__name__)
 
@@ -73,6 +79,12 @@ def handle_command(request, api_controller, obj, **kwargs):
     except controller.UnknownCommandError as e:
         log.warning("Unknown command %s for %s", command, obj)
         return respond(request, {'error': str(e)}, code=http.NOT_IMPLEMENTED)
+    except controller.JobNotRestoredError as e:
+        return respond(
+            request, {'error': str(e)}, code=http.SERVICE_UNAVAILABLE
+        )
+    except controller.InvalidCommandError as e:
+        return respond(request, {'error': str(e)}, code=http.BAD_REQUEST)
     except Exception as e:
         log.exception('%r while executing command %s for %s', e, command, obj)
         trace = traceback.format_exc()
@@ -184,6 +196,8 @@ class JobResource(resource.Resource):
         if run_id in job.action_graph.names:
             action_runs = job.runs.get_action_runs(run_id)
             return ActionRunHistoryResource(action_runs)
+        if run_id == 'backfills':
+            return BackfillCollectionResource(self.job_scheduler)
         msg = "Cannot find job run %s for %s"
         return resource.NoResource(msg % (run_id, job))
 
@@ -212,9 +226,57 @@ class JobResource(resource.Resource):
             self.controller,
             self.job_scheduler,
             run_time=run_time,
+            start_date=requestargs.get_datetime(request, 'start_date'),
+            end_date=requestargs.get_datetime(request, 'end_date'),
+            max_in_flight=requestargs.get_integer(request, 'max_in_flight'),
         )
 
 
+class BackfillResource(resource.Resource):
+
+    isLeaf = True
+
+    def __init__(self, job_backfill):
+        resource.Resource.__init__(self)
+        self.job_backfill = job_backfill
+        self.controller = controller.BackfillController(job_backfill)
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        return respond(request, self.job_backfill.get_progress())
+
+    @AsyncResource.exclusive
+    def render_POST(self, request):
+        return handle_command(request, self.controller, self.job_backfill)
+
+
+class BackfillCollectionResource(resource.Resource):
+    def __init__(self, job_scheduler):
+        resource.Resource.__init__(self)
+        self.job_scheduler = job_scheduler
+
+    def getChild(self, num, _):
+        if not num:
+            return self
+
+        num = maybe_decode(num)
+        job_backfill = None
+        if num.isdigit():
+            job_backfill = self.job_scheduler.get_backfill(int(num))
+        if job_backfill:
+            return BackfillResource(job_backfill)
+        msg = "Cannot find backfill %s for %s"
+        return resource.NoResource(msg % (num, self.job_scheduler.get_job()))
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        backfills = [
+            job_backfill.get_progress()
+            for job_backfill in self.job_scheduler.backfills
+        ]
+        return respond(request, {'backfills': backfills})
+
+
 class ActionRunHistoryResource(resource.Resource):
 
     isLeaf = True
@@ -329,11 +391,15 @@ class ConfigResource(resource.Resource):
         response = self.controller.read_config(config_name)
         return respond(request, response)
 
-    @AsyncResource.exclusive
+    def get_config_args(self, request):
+        return (
+            requestargs.get_string(request, 'name'),
+            requestargs.get_string(request, 'config'),
+            requestargs.get_string(request, 'hash'),
+        )
+
     def render_POST(self, request):
-        config_content = requestargs.get_string(request, 'config')
-        name = requestargs.get_string(request, 'name')
-        config_hash = requestargs.get_string(request, 'hash')
+        name, config_content, config_hash = self.get_config_args(request)
         check = requestargs.get_bool(request, 'check')
 
         if not name:
@@ -343,26 +409,116 @@ class ConfigResource(resource.Resource):
                 code=http.BAD_REQUEST,
             )
 
-        response = {'status': "Active"}
-
         if check:
-            fn = self.controller.check_config
-            req = "configure check"
-        elif config_content == "":
-            fn = self.controller.delete_config
-            req = "configuration delete"
-        else:
-            fn = self.controller.update_config
-            req = "reconfigure"
+            log.info("Handling configure check request: %s" % name)
+            return self.render_check(request)
+        if config_content == "":
+            log.info(
+                "Handling configuration delete request: %s, %s" %
+                (name, config_hash),
+            )
+            return self.render_delete(request)
+        log.info("Handling reconfigure request: %s, %s" % (name, config_hash))
+        return self.render_update(request)
+
+    @AsyncResource.bounded
+    def render_check(self, request):
+        error = self.controller.check_config(*self.get_config_args(request))
+        return self.build_response(request, error)
 
-        log.info("Handling %s request: %s, %s" % (req, name, config_hash))
-        error = fn(name, config_content, config_hash)
+    @AsyncResource.exclusive
+    def render_delete(self, request):
+        error = self.controller.delete_config(*self.get_config_args(request))
+        return self.build_response(request, error)
+
+    def render_update(self, request):
+        """Validate the new config in a thread without holding any locks, and
+        only block other requests while it is applied on the reactor thread.
+        """
+        args = self.get_config_args(request)
+
+        def apply(error):
+            if not error:
+                error = self.controller.update_config(*args)
+            return self.build_response(request, error)
+
+        return AsyncResource.staged(
+            request,
+            lambda: self.controller.validate_config(*args),
+            apply,
+        )
 
+    def build_response(self, request, error):
+        response = {'status': "Active"}
         if error:
             response['error'] = error
         return respond(request, response)
 
 
+class ConfigBulkResource(resource.Resource):
+    """Resource to read the hashes of, and update, many namespaces at once"""
+
+    isLeaf = True
+
+    def __init__(self, master_control):
+        self.controller = controller.ConfigController(master_control)
+        resource.Resource.__init__(self)
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        return respond(request, {'hashes': self.controller.get_hashes()})
+
+    def get_configs(self, request):
+        """Return the dict of namespace to config and hash, or None if it
+        is not valid.
+        """
+        try:
+            configs = json.loads(requestargs.get_string(request, 'configs'))
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(configs, dict):
+            return None
+        for config in configs.values():
+            if not isinstance(config, dict) or \
+                    not isinstance(config.get('config'), str) or \
+                    'hash' not in config:
+                return None
+        return configs
+
+    def render_POST(self, request):
+        configs = self.get_configs(request)
+        if configs is None:
+            return respond(
+                request,
+                {
+                    'error':
+                        "'configs' must be a JSON object of namespace to "
+                        "config and hash.",
+                },
+                code=http.BAD_REQUEST,
+            )
+
+        log.info(f"Handling bulk reconfigure request: {sorted(configs)}")
+        if requestargs.get_bool(request, 'check'):
+            return self.render_check(request)
+
+        def apply(result):
+            if not result:
+                result = self.controller.update_configs(configs)
+            return respond(request, dict(result, status="Active"))
+
+        return AsyncResource.staged(
+            request,
+            lambda: self.controller.validate_configs(configs),
+            apply,
+        )
+
+    @AsyncResource.bounded
+    def render_check(self, request):
+        result = self.controller.validate_configs(self.get_configs(request))
+        return respond(request, dict(result, status="Active"))
+
+
 class StatusResource(resource.Resource):
 
     isLeaf = True
@@ -373,7 +529,150 @@ class StatusResource(resource.Resource):
 
     @AsyncResource.bounded
     def render_GET(self, request):
-        return respond(request, {'status': "I'm alive."})
+        progress = self._master_control.get_restore_progress()
+        status = "restoring" if progress['restoring'] else "I'm alive."
+        return respond(request, {'status': status, 'restore': progress})
+
+
+class AdmissionQueueResource(resource.Resource):
+
+    isLeaf = True
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        controller = AdmissionController.get_instance()
+        response = {
+            'active': len(controller.active),
+            'queue': adapter.AdmissionQueueAdapter(controller).get_repr(),
+        }
+        return respond(request, response)
+
+
+class NodesResource(resource.Resource):
+
+    isLeaf = True
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        repository = node.NodePoolRepository.get_instance()
+        response = {
+            'nodes': adapter.adapt_many(
+                adapter.NodeAdapter,
+                repository.nodes.values(),
+            ),
+            # Every node is also a pool of one node, only list the others
+            'node_pools': [
+                {
+                    'name': pool.get_name(),
+                    'selection': pool.selection,
+                    'run_counts': pool.get_run_counts(),
+                } for pool in repository.pools.values()
+                if pool.get_name() not in repository.nodes
+            ],
+        }
+        return respond(request, response)
+
+
+class ScheduleSpreadResource(resource.Resource):
+
+    isLeaf = True
+
+    def __init__(self, master_control):
+        self._master_control = master_control
+        resource.Resource.__init__(self)
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        horizon = requestargs.get_integer(request, 'horizon') or 3600
+        bucket_size = requestargs.get_integer(request, 'bucket') or 1
+        response = self._master_control.schedule_planner.report(
+            timeutils.current_time(),
+            datetime.timedelta(seconds=horizon),
+            bucket_size,
+        )
+        return respond(request, response)
+
+
+class ConcurrencyForecastResource(resource.Resource):
+
+    isLeaf = True
+
+    def __init__(self, master_control):
+        self._master_control = master_control
+        resource.Resource.__init__(self)
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        horizon = requestargs.get_integer(request, 'horizon')
+        bucket_size = requestargs.get_integer(request, 'bucket')
+        if horizon and horizon > 0:
+            horizon = datetime.timedelta(seconds=horizon)
+        else:
+            horizon = concurrency_forecast.DEFAULT_HORIZON
+        if not bucket_size or bucket_size < 1:
+            bucket_size = concurrency_forecast.DEFAULT_BUCKET_SIZE
+        response = self._master_control.concurrency_forecast.get_forecast(
+            self._master_control.get_job_collection().get_jobs(),
+            timeutils.current_time(),
+            horizon,
+            bucket_size,
+            AdmissionController.get_instance().pool_limits,
+        )
+        return respond(request, response)
+
+
+class ScheduleResource(resource.Resource):
+
+    isLeaf = True
+
+    def __init__(self, master_control):
+        self._master_control = master_control
+        resource.Resource.__init__(self)
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        start_time = requestargs.get_datetime(request, 'from')
+        end_time = requestargs.get_datetime(request, 'to')
+        namespace = requestargs.get_string(request, 'namespace')
+        limit = requestargs.get_integer(request, 'limit')
+
+        start_time = start_time or timeutils.current_time()
+        end_time = end_time or start_time + datetime.timedelta(days=1)
+        if end_time <= start_time:
+            return respond(
+                request,
+                {'error': "'to' must be after 'from'."},
+                code=http.BAD_REQUEST,
+            )
+        limit = min(
+            limit or schedule_preview.MAX_PREVIEW_RUNS,
+            schedule_preview.MAX_PREVIEW_RUNS,
+        )
+
+        jobs = self._master_control.get_job_collection().get_jobs()
+        if namespace:
+            prefix = namespace + '.'
+            jobs = [job for job in jobs if job.get_name().startswith(prefix)]
+        response = {
+            'from': start_time,
+            'to': end_time,
+            'jobs': schedule_preview.preview_jobs(
+                jobs,
+                start_time,
+                end_time,
+                limit,
+            ),
+        }
+        return respond(request, response)
+
+
+class MetricsResource(resource.Resource):
+
+    isLeaf = True
+
+    @AsyncResource.bounded
+    def render_GET(self, request):
+        return respond(request, metrics.view_all_metrics())
 
 
 class ApiRootResource(resource.Resource):
@@ -388,7 +687,17 @@ class ApiRootResource(resource.Resource):
         )
 
         self.putChild(b'config', ConfigResource(mcp))
+        self.putChild(b'config_bulk', ConfigBulkResource(mcp))
         self.putChild(b'status', StatusResource(mcp))
+        self.putChild(b'metrics', MetricsResource())
+        self.putChild(b'queue', AdmissionQueueResource())
+        self.putChild(b'nodes', NodesResource())
+        self.putChild(b'schedule_spread', ScheduleSpreadResource(mcp))
+        self.putChild(b'schedule', ScheduleResource(mcp))
+        self.putChild(
+            b'concurrency_forecast',
+            ConcurrencyForecastResource(mcp),
+        )
         self.putChild(b'', self)
 
     @AsyncResource.bounded
@@ -33,6 +33,28 @@ def build_filled_context(*context_objects):
     return reduce(build, context_objects, None)
 
 
+# Returned by lookup when a name is not found, since None is a valid value
+MISSING = object()
+
+
+def lookup(target, name):
+    """Return the value of name in target, first as an item and then as an
+    attribute, or MISSING.
+    """
+    if hasattr(type(target), '__getitem__'):
+        try:
+            return target[name]
+        except (KeyError, TypeError, AttributeError):
+            pass
+
+    try:
+        if '.' in name:
+            return operator.attrgetter(name)(target)
+        return getattr(target, name)
+    except (KeyError, TypeError, AttributeError):
+        return MISSING
+
+
 class CommandContext(object):
     """A CommandContext object is a wrapper around any object which has values
     to be used to render a command for execution.  It looks up values by name.
@@ -42,6 +64,9 @@ class CommandContext(object):
         base.__getattr__(name),
         next[name],
         next.__getattr__(name)
+
+    When next is another CommandContext the chain is walked in a single loop,
+    rather than recursing into each context.
     """
 
     def __init__(self, base=None, next=None):
@@ -60,14 +85,16 @@ class CommandContext(object):
             return default
 
     def __getitem__(self, name):
-        getters = [operator.itemgetter(name), operator.attrgetter(name)]
-        for target in [self.base, self.next]:
-            for getter in getters:
-                try:
-                    return getter(target)
-                except (KeyError, TypeError, AttributeError):
-                    pass
-
+        context = self
+        while isinstance(context, CommandContext):
+            value = lookup(context.base, name)
+            if value is not MISSING:
+                return value
+            context = context.next
+
+        value = lookup(context, name)
+        if value is not MISSING:
+            return value
         raise KeyError(name)
 
     def __eq__(self, other):
@@ -115,6 +142,9 @@ class JobContext(object):
 class JobRunContext(object):
     def __init__(self, job_run):
         self.job_run = job_run
+        # Date arithmetic results for _memo_run_time, by name
+        self._memo_run_time = None
+        self._memo = {}
 
     @property
     def runid(self):
@@ -132,9 +162,22 @@ class JobRunContext(object):
         return 'UNKNOWN'
 
     def __getitem__(self, name):
-        """Attempt to parse date arithmetic syntax and apply to run_time."""
+        """Attempt to parse date arithmetic syntax and apply to run_time.
+        Results are memoized for as long as run_time does not change. Without
+        a run_time dates are relative to the current time, so they are not.
+        """
         run_time = self.job_run.run_time
-        time_value = timeutils.DateArithmetic.parse(name, run_time)
+        if not run_time:
+            time_value = timeutils.DateArithmetic.parse(name, run_time)
+        else:
+            if run_time != self._memo_run_time:
+                self._memo_run_time, self._memo = run_time, {}
+            try:
+                time_value = self._memo[name]
+            except KeyError:
+                time_value = timeutils.DateArithmetic.parse(name, run_time)
+                self._memo[name] = time_value
+
         if time_value:
             return time_value
 
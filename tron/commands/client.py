@@ -130,9 +130,45 @@ class Client(object):
         request_data = dict(name=config_name)
         return self.http_get('/api/config', request_data)
 
+    def config_hashes(self):
+        """Return a dict of namespace to the hash of its configuration."""
+        return self.http_get('/api/config_bulk')['hashes']
+
+    def config_bulk(self, configs, check=False):
+        """Update the configuration of many namespaces with a single
+        reconfigure. `configs` is a dict of namespace to a dict with the
+        'config' content and the 'hash' of the config it replaces.
+        """
+        request_data = dict(
+            configs=simplejson.dumps(configs),
+            check=1 if check else 0,
+        )
+        return self.request('/api/config_bulk', request_data)
+
     def home(self):
         return self.http_get('/api/')
 
+    def schedule_spread(self, horizon=None, bucket=None):
+        params = {'horizon': horizon, 'bucket': bucket}
+        params = {k: v for k, v in params.items() if v}
+        return self.http_get('/api/schedule_spread', params)
+
+    def schedule(
+        self,
+        start_time=None,
+        end_time=None,
+        namespace=None,
+        limit=None,
+    ):
+        params = {
+            'from': start_time,
+            'to': end_time,
+            'namespace': namespace,
+            'limit': limit,
+        }
+        params = {k: v for k, v in params.items() if v}
+        return self.http_get('/api/schedule', params)
+
     index = home
 
     def get_url(self, identifier):
@@ -249,6 +249,50 @@ def format_action_run_details(content, stdout=True, stderr=True):
     return details + '\n' + '\n'.join(out)
 
 
+def format_schedule_spread(report):
+    """Format a schedule spreading report as a before and after histogram of
+    the number of job starts per bucket.
+    """
+    state = 'enabled' if report['enabled'] else 'disabled'
+    out = [
+        f"Schedule spreading is {state}, window {report['window']}s",
+        f"Starts in the next {report['horizon']}s, "
+        f"per {report['bucket_size']}s bucket",
+    ]
+    for label in ('before', 'after'):
+        histogram = report[label]
+        out.append('')
+        out.append(
+            f"{label.capitalize()}: {histogram['starts']} starts, "
+            f"peak {histogram['peak']}",
+        )
+        out.append("  starts/bucket  buckets")
+        for starts, count in sorted(
+            histogram['distribution'].items(),
+            key=lambda item: int(item[0]),
+        ):
+            out.append(f"  {starts:>13}  {count:<7} {'#' * min(count, 50)}")
+        out.append("  busiest:")
+        for bucket in histogram['busiest']:
+            out.append(f"    {bucket['time']}  {bucket['starts']}")
+    return '\n'.join(out)
+
+
+def format_schedule(schedule):
+    """Format the upcoming run times of each job, grouped by job name."""
+    jobs = schedule['jobs']
+    out = [
+        f"Run times from {schedule['from']} to {schedule['to']}",
+        f"{sum(len(run_times) for run_times in jobs.values())} runs "
+        f"of {len(jobs)} jobs",
+    ]
+    for name, run_times in sorted(jobs.items()):
+        out.append('')
+        out.append(f"{name}: {len(run_times)} runs")
+        out.extend(f"    {run_time}" for run_time in run_times)
+    return '\n'.join(out)
+
+
 class DisplayJobRuns(TableDisplay):
     """Format Job runs."""
 
@@ -404,8 +448,11 @@ def display_scheduler(source, _=None):
 def display_state_delayed(_, obj):
     state = obj['state']
     in_delay = obj['in_delay']
+    queue_position = obj.get('queue_position')
     if in_delay:
         return f"{state} (retry delayed for {int(in_delay)}s)"
+    elif queue_position is not None:
+        return f"{state} (queued at position {queue_position + 1})"
     else:
         return state
 
@@ -9,6 +9,7 @@ import datetime
 import getpass
 import itertools
 import logging
+import multiprocessing
 import os
 from urllib.parse import urlparse
 
@@ -37,11 +38,14 @@ from tron.config.config_utils import Validator
 from tron.config.schedule_parse import valid_schedule
 from tron.config.schema import CLEANUP_ACTION_NAME
 from tron.config.schema import ConfigAction
+from tron.config.schema import ConfigAdmissionControl
+from tron.config.schema import ConfigCatchUp
 from tron.config.schema import ConfigCleanupAction
 from tron.config.schema import ConfigConstraint
 from tron.config.schema import ConfigJob
 from tron.config.schema import ConfigMesos
 from tron.config.schema import ConfigParameter
+from tron.config.schema import ConfigScheduleSpreading
 from tron.config.schema import ConfigSSHOptions
 from tron.config.schema import ConfigState
 from tron.config.schema import ConfigVolume
@@ -234,9 +238,19 @@ class ValidateSSHOptions(Validator):
         'known_hosts_file': None,
         'connect_timeout': 30,
         'idle_connection_timeout': 3600,
+        'max_channels_per_connection': 10,
+        'prewarm_seconds': 0,
+        'keepalive_interval': 15,
+        'keepalive_count_max': 3,
+        'circuit_breaker_threshold': 3,
+        'circuit_breaker_timeout': 30,
         'jitter_min_load': 4,
         'jitter_max_delay': 20,
         'jitter_load_factor': 1,
+        'start_rate_per_node': None,
+        'start_burst_per_node': 1,
+        'start_rate_global': None,
+        'start_burst_global': 1,
     }
 
     validators = {
@@ -257,15 +271,55 @@ class ValidateSSHOptions(Validator):
             config_utils.valid_int,
         'idle_connection_timeout':
             config_utils.valid_int,
+        'max_channels_per_connection':
+            config_utils.valid_int,
+        'prewarm_seconds':
+            config_utils.valid_int,
+        'keepalive_interval':
+            config_utils.valid_int,
+        'keepalive_count_max':
+            config_utils.valid_int,
+        'circuit_breaker_threshold':
+            config_utils.valid_int,
+        'circuit_breaker_timeout':
+            config_utils.valid_int,
         'jitter_min_load':
             config_utils.valid_int,
         'jitter_max_delay':
             config_utils.valid_int,
         'jitter_load_factor':
             config_utils.valid_int,
+        'start_rate_per_node':
+            config_utils.valid_float,
+        'start_burst_per_node':
+            config_utils.valid_int,
+        'start_rate_global':
+            config_utils.valid_float,
+        'start_burst_global':
+            config_utils.valid_int,
     }
 
     def post_validation(self, valid_input, config_context):
+        for name in (
+            'start_burst_per_node',
+            'start_burst_global',
+            'keepalive_count_max',
+            'circuit_breaker_timeout',
+        ):
+            if valid_input.get(name, 1) < 1:
+                path = config_context.build_child_context(name).path
+                raise ConfigError(f"{path} must be at least 1")
+
+        for name in (
+            'max_channels_per_connection',
+            'prewarm_seconds',
+            'keepalive_interval',
+            'circuit_breaker_threshold',
+        ):
+            if valid_input.get(name, 0) < 0:
+                path = config_context.build_child_context(name).path
+                raise ConfigError(f"{path} must not be negative")
+
         if config_context.partial:
             return
 
@@ -303,11 +357,28 @@ class ValidateNode(Validator):
 valid_node = ValidateNode()
 
 
+def valid_limit_mapping(value, config_context):
+    """Validate a mapping of names to concurrency limits."""
+    limits = valid_dict(value, config_context)
+    for name, limit in limits.items():
+        valid_string(name, config_context)
+        child_context = config_context.build_child_context(name)
+        valid_int(limit, child_context)
+    return FrozenDict(**limits)
+
+
 class ValidateNodePool(Validator):
     config_class = schema.ConfigNodePool
+    defaults = {
+        'selection': schema.NodeSelectionTypes.random,
+        'weights': FrozenDict(),
+    }
     validators = {
         'name': valid_identifier,
         'nodes': build_list_of_type_validator(valid_identifier),
+        'selection':
+            config_utils.build_enum_validator(schema.NodeSelectionTypes),
+        'weights': valid_limit_mapping,
     }
 
     def cast(self, node_pool, _context):
@@ -315,9 +386,23 @@ class ValidateNodePool(Validator):
             node_pool = dict(nodes=node_pool)
         return node_pool
 
-    def set_defaults(self, node_pool, _):
+    def set_defaults(self, node_pool, config_context):
+        super(ValidateNodePool, self).set_defaults(node_pool, config_context)
         node_pool.setdefault('name', '_'.join(node_pool['nodes']))
 
+    def post_validation(self, node_pool, config_context):
+        weights = node_pool.get('weights', {})
+        unknown_names = set(weights) - set(node_pool['nodes'])
+        if unknown_names:
+            msg = "Weights for nodes which are not in the pool at %s: %s"
+            raise ConfigError(
+                msg % (config_context.path, ",".join(sorted(unknown_names))),
+            )
+        for name, weight in weights.items():
+            if weight < 1:
+                msg = "Weight of node %s must be at least 1 at %s"
+                raise ConfigError(msg % (name, config_context.path))
+
 
 valid_node_pool = ValidateNodePool()
 
@@ -518,6 +603,8 @@ class ValidateJob(Validator):
         'monitoring': {},
         'time_zone': None,
         'expected_runtime': datetime.timedelta(hours=24),
+        'priority': 0,
+        'skip_if_older_than': None,
     }
 
     validators = {
@@ -535,6 +622,8 @@ class ValidateJob(Validator):
         'monitoring': valid_dict,
         'time_zone': valid_time_zone,
         'expected_runtime': config_utils.valid_time_delta,
+        'priority': valid_int,
+        'skip_if_older_than': config_utils.valid_time_delta,
     }
 
     def cast(self, in_dict, config_context):
@@ -670,6 +759,65 @@ class ValidateMesos(Validator):
 valid_mesos_options = ValidateMesos()
 
 
+class ValidateAdmissionControl(Validator):
+    config_class = ConfigAdmissionControl
+    optional = True
+    defaults = {
+        'max_concurrent': None,
+        'max_concurrent_per_node': None,
+        'node_limits': FrozenDict(),
+        'node_pool_limits': FrozenDict(),
+        'namespace_limits': FrozenDict(),
+        'priority_aging_interval': 60,
+    }
+
+    validators = {
+        'max_concurrent': valid_int,
+        'max_concurrent_per_node': valid_int,
+        'node_limits': valid_limit_mapping,
+        'node_pool_limits': valid_limit_mapping,
+        'namespace_limits': valid_limit_mapping,
+        'priority_aging_interval': valid_int,
+    }
+
+
+valid_admission_control = ValidateAdmissionControl()
+
+
+class ValidateScheduleSpreading(Validator):
+    config_class = ConfigScheduleSpreading
+    optional = True
+    defaults = {
+        'enabled': False,
+        'window': datetime.timedelta(minutes=5),
+    }
+
+    validators = {
+        'enabled': valid_bool,
+        'window': config_utils.valid_time_delta,
+    }
+
+
+valid_schedule_spreading = ValidateScheduleSpreading()
+
+
+class ValidateCatchUp(Validator):
+    config_class = ConfigCatchUp
+    optional = True
+    defaults = {
+        'max_starts_per_second': None,
+        'collapse_missed_runs': False,
+    }
+
+    validators = {
+        'max_starts_per_second': config_utils.valid_float,
+        'collapse_missed_runs': valid_bool,
+    }
+
+
+valid_catch_up = ValidateCatchUp()
+
+
 def validate_jobs(config, config_context):
     """Validate jobs"""
     valid_jobs = build_dict_name_validator(valid_job, allow_empty=True)
@@ -708,6 +856,11 @@ class ValidateConfig(Validator):
         'jobs': (),
         'mesos_options': ConfigMesos(**ValidateMesos.defaults),
         'eventbus_enabled': None,
+        'admission_control':
+            ConfigAdmissionControl(**ValidateAdmissionControl.defaults),
+        'schedule_spreading':
+            ConfigScheduleSpreading(**ValidateScheduleSpreading.defaults),
+        'catch_up': ConfigCatchUp(**ValidateCatchUp.defaults),
     }
     node_pools = build_dict_name_validator(valid_node_pool, allow_empty=True)
     nodes = build_dict_name_validator(valid_node, allow_empty=True)
@@ -722,6 +875,9 @@ class ValidateConfig(Validator):
         'node_pools': node_pools,
         'mesos_options': valid_mesos_options,
         'eventbus_enabled': valid_bool,
+        'admission_control': valid_admission_control,
+        'schedule_spreading': valid_schedule_spreading,
+        'catch_up': valid_catch_up,
     }
     optional = False
 
@@ -736,6 +892,31 @@ class ValidateConfig(Validator):
                 msg = "NodePool %s contains other NodePools: " % node_pool.name
                 raise ConfigError(msg + ",".join(invalid_names))
 
+    def validate_admission_control(self, config):
+        """Validate that admission limits refer to configured nodes and
+        node pools.
+        """
+        admission_control = config.get('admission_control')
+        if not admission_control:
+            return
+
+        checks = [
+            ('node_limits', 'nodes', 'Node'),
+            ('node_pool_limits', 'node_pools', 'NodePool'),
+        ]
+        for limits_key, names_key, type_name in checks:
+            limits = getattr(admission_control, limits_key)
+            invalid_names = set(limits) - set(config.get(names_key) or ())
+            if invalid_names:
+                msg = "admission_control.%s contains unknown %s names: %s"
+                raise ConfigError(
+                    msg % (
+                        limits_key,
+                        type_name,
+                        ",".join(sorted(invalid_names)),
+                    ),
+                )
+
     def post_validation(self, config, _):
         """Validate a non-named config."""
         node_names = config_utils.unique_names(
@@ -747,6 +928,8 @@ class ValidateConfig(Validator):
         if config.get('node_pools'):
             self.validate_node_pool_nodes(config)
 
+        self.validate_admission_control(config)
+
         config_context = ConfigContext(
             'config',
             node_names,
@@ -795,23 +978,93 @@ def get_nodes_from_master_namespace(master):
     return set(itertools.chain(master.nodes, master.node_pools))
 
 
-def validate_config_mapping(config_mapping):
+def validate_config_mapping(config_mapping, processes=1):
     if MASTER_NAMESPACE not in config_mapping:
         msg = "A config mapping requires a %s namespace"
         raise ConfigError(msg % MASTER_NAMESPACE)
 
     master = valid_config(config_mapping.pop(MASTER_NAMESPACE))
-    nodes = get_nodes_from_master_namespace(master)
     yield MASTER_NAMESPACE, master
 
-    for name, content in six.iteritems(config_mapping):
-        context = ConfigContext(
-            name,
-            nodes,
-            master.command_context,
-            name,
+    configs = validate_namespaces(config_mapping, master, processes)
+    for name, config in sorted(six.iteritems(configs)):
+        yield name, config
+
+
+def validate_namespace(name, content, master, nodes=None):
+    """Validate the config of a namespace other than MASTER against a
+    validated master config.
+    """
+    if nodes is None:
+        nodes = get_nodes_from_master_namespace(master)
+    context = ConfigContext(name, nodes, master.command_context, name)
+    return valid_named_config(content, config_context=context)
+
+
+# Below this many namespaces, starting a process pool costs more than
+# validating them one after another
+PARALLEL_VALIDATION_MIN = 8
+
+# The master config and its nodes, set once in each validation worker
+_worker_master = None
+
+
+def _init_validation_worker(master, nodes):
+    global _worker_master
+    _worker_master = master, nodes
+
+
+def _validate_namespace_result(name, content, master, nodes):
+    """Return a (name, config, error) tuple for a namespace."""
+    try:
+        return name, validate_namespace(name, content, master, nodes), None
+    except ConfigError as e:
+        return name, None, str(e)
+
+
+def _validate_namespace_worker(item):
+    name, content = item
+    return _validate_namespace_result(name, content, *_worker_master)
+
+
+def validate_namespaces(contents, master, processes=None):
+    """Validate the configs of several namespaces other than MASTER against a
+    validated master config, and return a dict of namespace to validated
+    config.
+
+    When there are at least PARALLEL_VALIDATION_MIN namespaces they are
+    validated in a pool of `processes` worker processes (one per CPU if
+    None). Errors from every namespace are reported together, ordered by
+    namespace, so the result does not depend on how the work was split.
+    """
+    nodes = get_nodes_from_master_namespace(master)
+    items = sorted(six.iteritems(contents))
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(items))
+
+    if processes > 1 and len(items) >= PARALLEL_VALIDATION_MIN:
+        pool = multiprocessing.Pool(
+            processes,
+            initializer=_init_validation_worker,
+            initargs=(master, nodes),
         )
-        yield name, valid_named_config(content, config_context=context)
+        try:
+            results = pool.map(_validate_namespace_worker, items)
+        finally:
+            pool.terminate()
+    else:
+        results = [
+            _validate_namespace_result(name, content, master, nodes)
+            for name, content in items
+        ]
+
+    errors = [
+        "%s: %s" % (name, error) for name, _, error in results if error
+    ]
+    if errors:
+        raise ConfigError("\n".join(errors))
+    return {name: config for name, config, _ in results}
 
 
 class ConfigContainer(object):
@@ -824,8 +1077,8 @@ class ConfigContainer(object):
         return six.iteritems(self.configs)
 
     @classmethod
-    def create(cls, config_mapping):
-        return cls(dict(validate_config_mapping(config_mapping)))
+    def create(cls, config_mapping, processes=1):
+        return cls(dict(validate_config_mapping(config_mapping, processes)))
 
     # TODO: DRY with get_jobs()
     def get_job_names(self):
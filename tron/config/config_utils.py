@@ -4,6 +4,7 @@ from __future__ import unicode_literals
 
 import datetime
 import functools
+import hashlib
 import itertools
 import re
 from string import Formatter
@@ -20,11 +21,69 @@ MAX_IDENTIFIER_LENGTH = 255
 IDENTIFIER_RE = re.compile(r'^[A-Za-z_][\w\-]{0,254}$')
 
 
+# Number of distinct templates kept by compile_template
+TEMPLATE_CACHE_SIZE = 4096
+
+
+def is_simple_field(field_name, format_spec):
+    """Return True if a replacement field is a lookup of a single name, with
+    no positional argument, attribute or index access, or nested fields.
+    """
+    return (
+        field_name and not field_name.isdigit() and
+        '.' not in field_name and '[' not in field_name and
+        '{' not in format_spec
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(template):
+    """Parse a format string into a tuple of (literal text, field name,
+    conversion, format spec) tuples. Returns None if the template is invalid
+    or uses fields which only Formatter.format supports.
+    """
+    fields = []
+    try:
+        for literal, field_name, format_spec, conversion in Formatter().parse(
+            template,
+        ):
+            if field_name is not None and not is_simple_field(
+                field_name,
+                format_spec,
+            ):
+                return None
+            fields.append((literal, field_name, conversion, format_spec))
+    except ValueError:
+        return None
+    return tuple(fields)
+
+
 class StringFormatter(Formatter):
     def __init__(self, context=None):
         Formatter.__init__(self)
         self.context = context
 
+    def format(self, format_string, *args, **kwargs):
+        """Render format_string using a cached parse of the template when
+        possible, falling back to Formatter.format.
+        """
+        fields = None
+        if not args and not kwargs and isinstance(format_string, str):
+            fields = compile_template(format_string)
+        if fields is None:
+            return Formatter.format(self, format_string, *args, **kwargs)
+
+        parts = []
+        for literal, field_name, conversion, format_spec in fields:
+            parts.append(literal)
+            if field_name is None:
+                continue
+            value = self.context[field_name]
+            if conversion:
+                value = self.convert_field(value, conversion)
+            parts.append(self.format_field(value, format_spec))
+        return ''.join(parts)
+
     def get_value(self, key, args, kwds):
         if isinstance(key, str):
             try:
@@ -61,6 +120,13 @@ def unique_names(fmt_string, *seqs):
     return name_dict
 
 
+def fingerprint(*configs):
+    """Return a digest of validated config objects. Config objects are
+    namedtuples of plain values, so their repr describes them completely.
+    """
+    return hashlib.sha1(repr(configs).encode('utf8')).hexdigest()
+
+
 def build_type_validator(validator, error_fmt):
     """Create a validator function using `validator` to validate the value.
         validator - a function which takes a single argument `value`
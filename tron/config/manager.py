@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import collections
+import copy
 import hashlib
 import logging
 import os
+import shutil
+import threading
 
 import six
 import yaml as yaml_raw
@@ -25,9 +29,21 @@ def from_string(content):
         raise ConfigError("Invalid config format: %s" % str(e))
 
 
+def replace_file(path, write_content):
+    """Write a file by calling write_content with a file handle, and replace
+    the file at path at once, so threads reading it never see it partly
+    written.
+    """
+    tmp_path = '%s.tmp' % path
+    with open(tmp_path, 'w') as fh:
+        write_content(fh)
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
 def write(path, content):
-    with open(path, 'w') as fh:
-        yaml.dump(content, fh)
+    replace_file(path, lambda fh: yaml.dump(content, fh))
 
 
 def read(path):
@@ -36,8 +52,7 @@ def read(path):
 
 
 def write_raw(path, content):
-    with open(path, 'w') as fh:
-        fh.write(maybe_decode(content))
+    replace_file(path, lambda fh: fh.write(maybe_decode(content)))
 
 
 def read_raw(path):
@@ -49,13 +64,36 @@ def hash_digest(content):
     return hashlib.sha1(maybe_encode(content)).hexdigest()
 
 
+# A namespace config which was validated before it was written
+ValidatedUpload = collections.namedtuple(
+    'ValidatedUpload',
+    ['content_hash', 'parsed', 'cache_key', 'config'],
+)
+
+
+def get_stat_key(path):
+    """Return a key which changes whenever the file at path is modified, or
+    None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns
+
+
 class ManifestFile(object):
-    """Manage the manifest file, which tracks name to filename."""
+    """Manage the manifest file, which tracks name to filename. The mapping
+    is kept in memory and only read again when the file changes.
+    """
 
     MANIFEST_FILENAME = '_manifest.yaml'
 
     def __init__(self, path):
         self.filename = os.path.join(path, self.MANIFEST_FILENAME)
+        self.mapping = None
+        self.stat_key = None
+        self.lock = threading.Lock()
 
     def create(self):
         if os.path.isfile(self.filename):
@@ -66,52 +104,267 @@ class ManifestFile(object):
         write(self.filename, {})
 
     def add(self, name, filename):
-        manifest = read(self.filename)
-        manifest[name] = filename
-        write(self.filename, manifest)
+        self.update({name: filename})
+
+    def update(self, file_mapping):
+        manifest = self.get_file_mapping()
+        manifest.update(file_mapping)
+        self.write(manifest)
 
     def delete(self, name):
-        manifest = read(self.filename)
+        manifest = self.get_file_mapping()
         if name not in manifest:
             msg = "Namespace %s does not exist in manifest, cannot delete."
             log.info(msg % name)
             return
 
         del manifest[name]
+        self.write(manifest)
+
+    def write(self, manifest):
         write(self.filename, manifest)
+        with self.lock:
+            self.mapping = dict(manifest)
+            self.stat_key = get_stat_key(self.filename)
+
+    def load(self):
+        """Return the cached mapping, reading the file if it changed."""
+        with self.lock:
+            stat_key = get_stat_key(self.filename)
+            if self.mapping is None or stat_key != self.stat_key:
+                self.mapping = read(self.filename)
+                self.stat_key = stat_key
+            return self.mapping
 
     def get_file_mapping(self):
-        return read(self.filename)
+        return dict(self.load())
 
     def get_file_name(self, name):
-        return self.get_file_mapping().get(name)
+        return self.load().get(name)
 
     def __contains__(self, name):
-        return name in self.get_file_mapping()
+        return name in self.load()
 
 
 class ConfigManager(object):
-    """Read, load and write configuration."""
+    """Read, load and write configuration.
+
+    The content of each namespace file is cached along with its hash, its
+    parsed YAML and its validated config. A file is only read again when it
+    changes on disk, and only parsed and validated again when its content
+    hash (or the hash of the MASTER config it is validated against) changes.
+
+    Uploads are validated in API threads while the reactor loads and writes
+    configs, so the caches are only accessed while holding `cache_lock`.
+    The lock is not held while reading, parsing or validating.
+
+    Namespaces which need validation are validated together, in a pool of
+    `validation_processes` worker processes when there are enough of them
+    (see config_parse.validate_namespaces). tronfig uses None for one
+    process per CPU. trond does the same for its initial load, which runs
+    before the API starts, then validates in a single process, since it
+    also validates from API threads.
+    """
 
     DEFAULT_HASH = hash_digest("")
 
-    def __init__(self, config_path, manifest=None):
+    def __init__(self, config_path, manifest=None, validation_processes=1):
         self.config_path = config_path
         self.manifest = manifest or ManifestFile(config_path)
+        self.validation_processes = validation_processes
+        # filename -> (stat key, content, content hash)
+        self.file_cache = {}
+        # namespace -> (content hash, parsed content)
+        self.parsed_cache = {}
+        # namespace -> ((content hash, master hash), validated config)
+        self.validated_cache = {}
+        # namespace -> ValidatedUpload, waiting to be written
+        self.validated_uploads = {}
+        self.cache_lock = threading.Lock()
 
     def build_file_path(self, name):
         name = name.replace('.', '_').replace(os.path.sep, '_')
         return os.path.join(self.config_path, '%s.yaml' % name)
 
+    def read_file(self, filename):
+        """Return the content and content hash of a config file, reading it
+        only if it changed since it was last read.
+        """
+        stat_key = get_stat_key(filename)
+        with self.cache_lock:
+            cached = self.file_cache.get(filename)
+        if cached and stat_key is not None and cached[0] == stat_key:
+            return cached[1], cached[2]
+
+        content = read_raw(filename)
+        content_hash = hash_digest(content)
+        with self.cache_lock:
+            self.file_cache[filename] = stat_key, content, content_hash
+        return content, content_hash
+
     def read_raw_config(self, name=schema.MASTER_NAMESPACE):
         """Read the config file without converting to yaml."""
         filename = self.manifest.get_file_name(name)
-        return read_raw(filename)
+        content, _ = self.read_file(filename)
+        return content
+
+    def read_config(self, name):
+        """Return the parsed config of a namespace, and its content hash."""
+        filename = self.manifest.get_file_name(name)
+        content, content_hash = self.read_file(filename)
+        with self.cache_lock:
+            cached = self.parsed_cache.get(name)
+        if not cached or cached[0] != content_hash:
+            cached = content_hash, from_string(content)
+            with self.cache_lock:
+                self.parsed_cache[name] = cached
+        # Validation may modify its input
+        return copy.deepcopy(cached[1]), content_hash
+
+    def validate_config(self, name, content):
+        """Parse and validate the raw content of a namespace config. The
+        result is kept so that writing the same content with write_config
+        does not parse and validate it again. No files are modified, and
+        the caches are locked, so this can be called from a thread.
+        """
+        return self.validate_configs({name: content})[name]
+
+    def validate_configs(self, contents):
+        """Parse and validate the raw content of several namespace configs,
+        as if they all replaced the current configs, and return a dict of
+        namespace to ValidatedUpload. Errors from every namespace are
+        reported together.
+        """
+        content_hashes, parsed, errors = {}, {}, []
+        for name, content in sorted(six.iteritems(contents)):
+            content_hashes[name] = hash_digest(content)
+            try:
+                parsed[name] = from_string(content)
+            except ConfigError as e:
+                errors.append("%s: %s" % (name, e))
+        if errors:
+            raise ConfigError("\n".join(errors))
+
+        if schema.MASTER_NAMESPACE in contents:
+            master_hash = content_hashes[schema.MASTER_NAMESPACE]
+            configs = self.validate_with_master(parsed)
+        else:
+            master_hash = self.get_hash(schema.MASTER_NAMESPACE)
+            configs = {}
+            for name, content in sorted(six.iteritems(parsed)):
+                try:
+                    configs[name] = self.validate_with_fragment(
+                        name,
+                        copy.deepcopy(content),
+                    )
+                except ConfigError as e:
+                    errors.append("%s: %s" % (name, e))
+            if errors:
+                raise ConfigError("\n".join(errors))
+
+        uploads = {}
+        for name, content_hash in six.iteritems(content_hashes):
+            cache_key = content_hash, master_hash
+            if name == schema.MASTER_NAMESPACE:
+                cache_key = content_hash, None
+            uploads[name] = ValidatedUpload(
+                content_hash,
+                parsed[name],
+                cache_key,
+                configs[name],
+            )
+        with self.cache_lock:
+            self.validated_uploads.update(uploads)
+        return uploads
+
+    def validate_with_master(self, parsed):
+        """Validate a new MASTER config, and any other changed namespaces,
+        against every namespace. Returns a dict of namespace to validated
+        config for the changed namespaces.
+        """
+        name_mapping = self.get_config_name_mapping()
+        name_mapping.update(copy.deepcopy(parsed))
+        container = config_parse.ConfigContainer.create(
+            name_mapping,
+            self.validation_processes,
+        )
+        return {name: container[name] for name in parsed}
 
     def write_config(self, name, content):
-        self.validate_with_fragment(name, from_string(content))
-        filename = self.get_filename_from_manifest(name)
-        write_raw(filename, content)
+        self.write_configs({name: content})
+
+    def write_configs(self, contents):
+        """Write the configs of several namespaces. Configs which were not
+        already validated with validate_configs, or which were validated
+        against a different MASTER config, are validated together.
+        Every file is written to a temporary file before any config is
+        replaced, so a failure while writing leaves all configs unchanged.
+        """
+        content_hashes = {
+            name: hash_digest(content)
+            for name, content in six.iteritems(contents)
+        }
+        master_hash = content_hashes.get(schema.MASTER_NAMESPACE)
+        if master_hash is None:
+            master_hash = self.get_hash(schema.MASTER_NAMESPACE)
+        uploads = {}
+        with self.cache_lock:
+            for name, content_hash in six.iteritems(content_hashes):
+                upload = self.validated_uploads.pop(name, None)
+                if not upload or upload.content_hash != content_hash:
+                    continue
+                if (
+                    name == schema.MASTER_NAMESPACE or
+                    upload.cache_key[1] == master_hash
+                ):
+                    uploads[name] = upload
+        missing = {
+            name: content
+            for name, content in six.iteritems(contents)
+            if name not in uploads
+        }
+        if missing:
+            uploads.update(self.validate_configs(missing))
+            with self.cache_lock:
+                for name in missing:
+                    self.validated_uploads.pop(name, None)
+
+        filenames, new_files = {}, {}
+        for name in contents:
+            filename = self.manifest.get_file_name(name)
+            if not filename:
+                filename = new_files[name] = self.build_file_path(name)
+            filenames[name] = filename
+        temp_filenames = {}
+        try:
+            for name, content in six.iteritems(contents):
+                temp_filenames[name] = filenames[name] + '.tmp'
+                write_raw(temp_filenames[name], content)
+        except Exception:
+            for temp_filename in temp_filenames.values():
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+            raise
+
+        for name, temp_filename in six.iteritems(temp_filenames):
+            os.rename(temp_filename, filenames[name])
+        if new_files:
+            self.manifest.update(new_files)
+
+        stat_keys = {
+            name: get_stat_key(filename)
+            for name, filename in six.iteritems(filenames)
+        }
+        with self.cache_lock:
+            for name, content in six.iteritems(contents):
+                upload = uploads[name]
+                self.file_cache[filenames[name]] = (
+                    stat_keys[name],
+                    maybe_decode(content),
+                    upload.content_hash,
+                )
+                self.parsed_cache[name] = upload.content_hash, upload.parsed
+                self.validated_cache[name] = upload.cache_key, upload.config
 
     def delete_config(self, name):
         filename = self.manifest.get_file_name(name)
@@ -122,6 +375,8 @@ class ConfigManager(object):
 
         self.manifest.delete(name)
         os.remove(filename)
+        with self.cache_lock:
+            self.file_cache.pop(filename, None)
 
     def get_filename_from_manifest(self, name):
         def create_filename():
@@ -132,25 +387,112 @@ class ConfigManager(object):
         return self.manifest.get_file_name(name) or create_filename()
 
     def validate_with_fragment(self, name, content):
-        name_mapping = self.get_config_name_mapping()
-        name_mapping[name] = content
-        config_parse.ConfigContainer.create(name_mapping)
+        """Validate the config of a namespace, as if it replaced the current
+        config for that namespace, and return the validated config. Changes
+        to MASTER are validated against every namespace, other namespaces
+        only against MASTER.
+        """
+        if name == schema.MASTER_NAMESPACE:
+            return self.validate_with_master({name: content})[name]
+
+        master, _ = self.load_namespace(schema.MASTER_NAMESPACE)
+        return config_parse.validate_namespace(name, content, master)
 
     def get_config_name_mapping(self):
-        seq = six.iteritems(self.manifest.get_file_mapping())
-        return {name: read(filename) for name, filename in seq}
+        return {
+            name: self.read_config(name)[0]
+            for name in self.get_namespaces()
+        }
+
+    def get_cached_namespace(self, name, master_hash=None):
+        """Return the cached validated config of a namespace, or None if it
+        changed since it was validated, and its content hash.
+        """
+        filename = self.manifest.get_file_name(name)
+        _, content_hash = self.read_file(filename)
+        with self.cache_lock:
+            cached = self.validated_cache.get(name)
+        if cached and cached[0] == (content_hash, master_hash):
+            return cached[1], content_hash
+        return None, content_hash
+
+    def load_namespace(self, name, master=None, master_hash=None):
+        """Return the validated config of a namespace and its content hash.
+        Namespaces other than MASTER are validated against `master`.
+        """
+        config, content_hash = self.get_cached_namespace(name, master_hash)
+        if config is not None:
+            return config, content_hash
+
+        key = content_hash, master_hash
+        content, _ = self.read_config(name)
+        if name == schema.MASTER_NAMESPACE:
+            config = config_parse.valid_config(content)
+        else:
+            config = config_parse.validate_namespace(name, content, master)
+        with self.cache_lock:
+            self.validated_cache[name] = key, config
+        return config, content_hash
 
     def load(self):
         """Return the fully constructed configuration."""
         log.info("Loading full config from %s" % self.config_path)
-        name_mapping = self.get_config_name_mapping()
-        return config_parse.ConfigContainer.create(name_mapping)
+        namespaces = self.get_namespaces()
+        if schema.MASTER_NAMESPACE not in namespaces:
+            msg = "A config mapping requires a %s namespace"
+            raise ConfigError(msg % schema.MASTER_NAMESPACE)
+
+        master, master_hash = self.load_namespace(schema.MASTER_NAMESPACE)
+        configs = {schema.MASTER_NAMESPACE: master}
+        content_hashes, pending, errors = {}, {}, []
+        for name in sorted(namespaces):
+            if name == schema.MASTER_NAMESPACE:
+                continue
+            config, content_hashes[name] = self.get_cached_namespace(
+                name,
+                master_hash,
+            )
+            if config is not None:
+                configs[name] = config
+                continue
+            try:
+                pending[name], _ = self.read_config(name)
+            except ConfigError as e:
+                errors.append("%s: %s" % (name, e))
+        if errors:
+            raise ConfigError("\n".join(errors))
+
+        validated = config_parse.validate_namespaces(
+            pending,
+            master,
+            self.validation_processes,
+        )
+        with self.cache_lock:
+            for name, config in six.iteritems(validated):
+                key = content_hashes[name], master_hash
+                self.validated_cache[name] = key, config
+        configs.update(validated)
+
+        self.prune_cache(namespaces)
+        return config_parse.ConfigContainer(configs)
+
+    def prune_cache(self, namespaces):
+        """Remove cached configs of namespaces which no longer exist."""
+        filenames = {self.manifest.get_file_name(name) for name in namespaces}
+        with self.cache_lock:
+            for cache in self.parsed_cache, self.validated_cache:
+                for name in set(cache) - set(namespaces):
+                    del cache[name]
+            for filename in set(self.file_cache) - filenames:
+                del self.file_cache[filename]
 
     def get_hash(self, name):
         """Return a hash of the configuration contents for name."""
         if name not in self:
             return self.DEFAULT_HASH
-        return hash_digest(self.read_raw_config(name))
+        filename = self.manifest.get_file_name(name)
+        _, content_hash = self.read_file(filename)
+        return content_hash
 
     def __contains__(self, name):
         return name in self.manifest
@@ -50,6 +50,9 @@ TronConfig = config_object_factory(
         'jobs',  # FrozenDict of ConfigJob
         'mesos_options',  # ConfigMesos
         'eventbus_enabled',  # bool or None
+        'admission_control',  # ConfigAdmissionControl
+        'schedule_spreading',  # ConfigScheduleSpreading
+        'catch_up',  # ConfigCatchUp
     ],
 )
 
@@ -73,9 +76,47 @@ ConfigSSHOptions = config_object_factory(
         'known_hosts_file',
         'connect_timeout',
         'idle_connection_timeout',
+        'max_channels_per_connection',
+        'prewarm_seconds',
+        'keepalive_interval',
+        'keepalive_count_max',
+        'circuit_breaker_threshold',
+        'circuit_breaker_timeout',
         'jitter_min_load',
         'jitter_max_delay',
         'jitter_load_factor',
+        'start_rate_per_node',
+        'start_burst_per_node',
+        'start_rate_global',
+        'start_burst_global',
+    ],
+)
+
+ConfigAdmissionControl = config_object_factory(
+    name='ConfigAdmissionControl',
+    optional=[
+        'max_concurrent',  # int or None
+        'max_concurrent_per_node',  # int or None
+        'node_limits',  # FrozenDict of int
+        'node_pool_limits',  # FrozenDict of int
+        'namespace_limits',  # FrozenDict of int
+        'priority_aging_interval',  # int
+    ],
+)
+
+ConfigScheduleSpreading = config_object_factory(
+    name='ConfigScheduleSpreading',
+    optional=[
+        'enabled',  # bool
+        'window',  # datetime.timedelta
+    ],
+)
+
+ConfigCatchUp = config_object_factory(
+    name='ConfigCatchUp',
+    optional=[
+        'max_starts_per_second',  # float or None
+        'collapse_missed_runs',  # bool
     ],
 )
 
@@ -85,7 +126,15 @@ ConfigNode = config_object_factory(
     optional=['name', 'username', 'port'],
 )
 
-ConfigNodePool = config_object_factory('ConfigNodePool', ['nodes'], ['name'])
+ConfigNodePool = config_object_factory(
+    name='ConfigNodePool',
+    required=['nodes'],
+    optional=[
+        'name',
+        'selection',  # NodeSelectionTypes
+        'weights',  # FrozenDict of int
+    ],
+)
 
 ConfigState = config_object_factory(
     name='ConfigState',
@@ -134,6 +183,8 @@ ConfigJob = config_object_factory(
         'max_runtime',  # datetime.Timedelta
         'time_zone',  # pytz time zone
         'expected_runtime',  # datetime.Timedelta
+        'priority',  # int
+        'skip_if_older_than',  # datetime.Timedelta
     ],
 )
 
@@ -226,3 +277,11 @@ ActionRunnerTypes = Enum.create('none', 'subprocess')
 VolumeModes = Enum.create('RO', 'RW')
 
 ActionOnRerun = Enum.create('rerun')
+
+NodeSelectionTypes = Enum.create(
+    'random',
+    'round_robin',
+    'least_outstanding',
+    'weighted_round_robin',
+    'power_of_two',
+)
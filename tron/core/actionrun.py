@@ -14,6 +14,7 @@ from tron.actioncommand import SubprocessActionRunnerFactory
 from tron.config.config_utils import StringFormatter
 from tron.config.schema import ExecutorTypes
 from tron.core import action
+from tron.core.admission import AdmissionController
 from tron.eventbus import EventBus
 from tron.mesos import MesosClusterRepository
 from tron.serialize import filehandler
@@ -343,7 +344,10 @@ class ActionRun(Observable):
             self.fail(-1)
             return
 
-        return self.submit_command()
+        return AdmissionController.get_instance().request(
+            self,
+            self.submit_command,
+        )
 
     def submit_command(self):
         raise NotImplementedError()
@@ -389,6 +393,7 @@ class ActionRun(Observable):
 
     def restart(self):
         """Used by `fail` when action run has to be re-tried."""
+        AdmissionController.get_instance().release(self)
         if self.retries_delay is not None:
             self.in_delay = reactor.callLater(
                 self.retries_delay.seconds, self.start_after_delay
@@ -455,12 +460,20 @@ class ActionRun(Observable):
         return self.transition_and_notify('fail_unknown')
 
     def cancel_delay(self):
+        """Cancel a start which is delayed for a retry, or waiting for
+        admission.
+        """
         if self.in_delay is not None:
             self.in_delay.cancel()
             self.in_delay = None
             self.fail(-3)
             return True
 
+        if AdmissionController.get_instance().is_waiting(self):
+            log.info(f"{self} cancelled while waiting for admission")
+            self.fail(-3)
+            return True
+
     @property
     def state_data(self):
         """This data is used to serialize the state of this action run."""
@@ -550,6 +563,7 @@ class ActionRun(Observable):
         self.clear_observers()
         if self.triggered_by:
             EventBus.clear_subscriptions(self.__hash__())
+        AdmissionController.get_instance().release(self)
         self.cancel()
 
     def setup_subscriptions(self):
@@ -583,6 +597,8 @@ class ActionRun(Observable):
 
     def transition_and_notify(self, target):
         if self.machine.transition(target):
+            if not self.is_active:
+                AdmissionController.get_instance().release(self)
             self.notify(self.state)
             return True
 
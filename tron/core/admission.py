@@ -0,0 +1,345 @@
+"""
+ tron.core.admission
+
+ Admission control for ActionRuns. Runs which would exceed a configured
+ concurrency limit wait in a queue, in the starting state, until a slot is
+ released by another run.
+"""
+import collections
+import logging
+import threading
+
+from tron import metrics
+from tron.config.schema import ExecutorTypes
+from tron.utils import timeutils
+
+log = logging.getLogger(__name__)
+
+GLOBAL_KEY = ('global', None)
+
+
+def get_namespace(action_run):
+    """Return the config namespace of the job which owns this action run."""
+    return action_run.job_run_id.rsplit('.', 2)[0]
+
+
+def get_job_name(action_run):
+    return action_run.job_run_id.rsplit('.', 1)[0]
+
+
+def get_node_name(action_run):
+    """Return the name of the node this action run uses, or None if the run
+    is not executed on a node.
+    """
+    if action_run.executor == ExecutorTypes.mesos or not action_run.node:
+        return None
+    return action_run.node.get_name()
+
+
+class AdmissionTicket(object):
+    """A request by an ActionRun to be submitted."""
+
+    __slots__ = (
+        'action_run',
+        'submit',
+        'namespace',
+        'job_name',
+        'node_name',
+        'created',
+    )
+
+    def __init__(self, action_run, submit):
+        self.action_run = action_run
+        self.submit = submit
+        self.namespace = get_namespace(action_run)
+        self.job_name = get_job_name(action_run)
+        self.node_name = get_node_name(action_run)
+        self.created = timeutils.current_timestamp()
+
+    @property
+    def keys(self):
+        keys = [GLOBAL_KEY, ('namespace', self.namespace)]
+        if self.node_name:
+            keys.append(('node', self.node_name))
+        return keys
+
+
+class AdmissionController(object):
+    """A Singleton which limits the number of concurrently active ActionRuns
+    globally, per node, per node pool and per namespace.
+
+    Runs that can not be admitted are queued per namespace. Waiting runs are
+    admitted in order of their job's priority, which is raised by one for
+    every `priority_aging_interval` seconds a run has been waiting so low
+    priority jobs are not starved. Runs of equal priority are served
+    round-robin across namespaces, and first in first out within a namespace,
+    so one busy namespace can not starve the others.
+
+    The queue is listed by API threads while the reactor changes it, so the
+    queues and the cached queue positions are guarded by `lock`.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        if self._instance is not None:
+            raise ValueError("AdmissionController is already instantiated.")
+        self.limits = {}
+        self.pool_limits = {}
+        self.pool_nodes = {}
+        self.max_per_node = None
+        self.aging_interval = None
+        self.job_priorities = {}
+        self.active = {}
+        self.counts = collections.Counter()
+        self.queues = collections.OrderedDict()
+        self.waiting = {}
+        # Queue positions by action run, and the second they were computed
+        self.positions = None
+        self.positions_time = None
+        self.lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        cls._instance = None
+
+    @classmethod
+    def configure(cls, admission_config, node_pool_configs=None):
+        instance = cls.get_instance()
+        instance.set_limits(admission_config, node_pool_configs or {})
+        instance.dispatch()
+
+    def set_limits(self, admission_config, node_pool_configs):
+        self.limits = {}
+        self.pool_limits = {}
+        self.pool_nodes = {}
+        self.max_per_node = None
+        self.aging_interval = None
+        with self.lock:
+            self.positions = None
+        if not admission_config:
+            return
+
+        if admission_config.max_concurrent is not None:
+            self.limits[GLOBAL_KEY] = admission_config.max_concurrent
+        for namespace, limit in admission_config.namespace_limits.items():
+            self.limits[('namespace', namespace)] = limit
+        for node_name, limit in admission_config.node_limits.items():
+            self.limits[('node', node_name)] = limit
+        self.max_per_node = admission_config.max_concurrent_per_node
+        self.aging_interval = admission_config.priority_aging_interval
+
+        for pool_name, limit in admission_config.node_pool_limits.items():
+            pool_config = node_pool_configs.get(pool_name)
+            if not pool_config:
+                continue
+            self.pool_limits[pool_name] = limit
+            self.pool_nodes[pool_name] = frozenset(pool_config.nodes)
+
+    def update_job_priorities(self, job_configs):
+        """Set the priority of each job from a mapping of job name to
+        ConfigJob.
+        """
+        self.job_priorities = {
+            name: job_config.priority or 0
+            for name, job_config in job_configs.items()
+        }
+        with self.lock:
+            self.positions = None
+        self.dispatch()
+
+    def get_priority(self, ticket, now):
+        """Return the priority of a waiting ticket, including aging."""
+        priority = self.job_priorities.get(ticket.job_name, 0)
+        if self.aging_interval:
+            priority += int((now - ticket.created) // self.aging_interval)
+        return priority
+
+    def get_limit(self, key):
+        if key[0] == 'node' and key not in self.limits:
+            return self.max_per_node
+        return self.limits.get(key)
+
+    def pool_count(self, pool_name):
+        return sum(
+            self.counts[('node', node_name)]
+            for node_name in self.pool_nodes[pool_name]
+        )
+
+    def can_admit(self, ticket):
+        for key in ticket.keys:
+            limit = self.get_limit(key)
+            if limit is not None and self.counts[key] >= limit:
+                return False
+
+        if ticket.node_name:
+            for pool_name, nodes in self.pool_nodes.items():
+                if ticket.node_name not in nodes:
+                    continue
+                if self.pool_count(pool_name) >= self.pool_limits[pool_name]:
+                    return False
+        return True
+
+    def is_waiting(self, action_run):
+        return action_run in self.waiting
+
+    def is_active(self, action_run):
+        return action_run in self.active
+
+    @property
+    def queue_length(self):
+        return len(self.waiting)
+
+    def request(self, action_run, submit):
+        """Submit the action run by calling `submit` if there is capacity,
+        otherwise queue it until capacity is available. Returns the result of
+        `submit`, or True if the run was queued.
+        """
+        if self.is_active(action_run) or self.is_waiting(action_run):
+            log.warning(f"{action_run} already requested admission")
+            return True
+
+        ticket = AdmissionTicket(action_run, submit)
+        if not self.queues and self.can_admit(ticket):
+            metrics.count('admission.admitted')
+            return self._admit(ticket)
+
+        log.info(f"{action_run} waiting for admission")
+        metrics.count('admission.queued')
+        with self.lock:
+            self.waiting[action_run] = ticket
+            self.queues.setdefault(
+                ticket.namespace,
+                collections.deque(),
+            ).append(ticket)
+            self.positions = None
+        self._update_gauges()
+        # Another namespace may be queued while this one has capacity
+        self.dispatch()
+        return True
+
+    def release(self, action_run):
+        """Release the slot held by an action run, or remove it from the
+        queue, and admit any waiting runs which now fit.
+        """
+        ticket = self.active.pop(action_run, None)
+        if ticket:
+            for key in ticket.keys:
+                self.counts[key] -= 1
+        else:
+            with self.lock:
+                ticket = self.waiting.pop(action_run, None)
+                if not ticket:
+                    return
+                self._remove_from_queue(ticket)
+
+        self._update_gauges()
+        self.dispatch()
+
+    def _remove_from_queue(self, ticket):
+        """Remove a ticket from its queue. Called while holding `lock`."""
+        self.positions = None
+        queue = self.queues.get(ticket.namespace)
+        if queue is None:
+            return
+        try:
+            queue.remove(ticket)
+        except ValueError:
+            pass
+        if not queue:
+            del self.queues[ticket.namespace]
+
+    def get_ordered_tickets(self, now=None):
+        """Return all waiting tickets in the order they would be admitted
+        if there were no limits.
+        """
+        if now is None:
+            now = timeutils.current_timestamp()
+
+        def sort_key(entry):
+            ns_rank, position, ticket = entry
+            return -self.get_priority(ticket, now), position, ns_rank
+
+        with self.lock:
+            entries = [
+                (ns_rank, position, ticket)
+                for ns_rank, queue in enumerate(self.queues.values())
+                for position, ticket in enumerate(queue)
+            ]
+        return [ticket for _, _, ticket in sorted(entries, key=sort_key)]
+
+    def get_queue_position(self, action_run):
+        """Return the zero-based position of action_run in the admission
+        queue, or None if it is not waiting. Positions are computed at most
+        once a second while the queue is unchanged.
+        """
+        if not self.is_waiting(action_run):
+            return None
+        now = int(timeutils.current_timestamp())
+        with self.lock:
+            if self.positions is None or self.positions_time != now:
+                self.positions = {
+                    ticket.action_run: position
+                    for position, ticket in enumerate(
+                        self.get_ordered_tickets(),
+                    )
+                }
+                self.positions_time = now
+            return self.positions.get(action_run)
+
+    def _take(self, ticket):
+        """Remove an admissible ticket from its queue, rotating its namespace
+        to the end of the queue.
+        """
+        with self.lock:
+            self.positions = None
+            del self.waiting[ticket.action_run]
+            queue = self.queues[ticket.namespace]
+            queue.remove(ticket)
+            if queue:
+                self.queues.move_to_end(ticket.namespace)
+            else:
+                del self.queues[ticket.namespace]
+
+    def dispatch(self):
+        """Admit queued runs until the queue is empty or every waiting run is
+        blocked by a limit. The waiting runs are ordered once, and admitted
+        in that order.
+        """
+        if not self.queues:
+            return
+        global_limit = self.get_limit(GLOBAL_KEY)
+        for ticket in self.get_ordered_tickets():
+            if global_limit is not None and (
+                self.counts[GLOBAL_KEY] >= global_limit
+            ):
+                break
+            # Submitting a run may have admitted or released this one
+            if self.waiting.get(ticket.action_run) is not ticket:
+                continue
+            if not self.can_admit(ticket):
+                continue
+
+            self._take(ticket)
+            wait_time = timeutils.current_timestamp() - ticket.created
+            metrics.timer('admission.queue_wait', wait_time)
+            metrics.count('admission.admitted')
+            log.info(f"{ticket.action_run} admitted after {wait_time:.2f}s")
+            self._admit(ticket)
+
+    def _admit(self, ticket):
+        self.active[ticket.action_run] = ticket
+        for key in ticket.keys:
+            self.counts[key] += 1
+        self._update_gauges()
+        return ticket.submit()
+
+    def _update_gauges(self):
+        metrics.gauge('admission.active', len(self.active))
+        metrics.gauge('admission.waiting', len(self.waiting))
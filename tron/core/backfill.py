@@ -0,0 +1,194 @@
+"""
+ tron.core.backfill
+
+ Run a job for each date of a range, a few dates at a time.
+
+ A Backfill starts a manual run of its job for the earliest pending date
+ whenever fewer than max_in_flight of its dates are still running, and starts
+ the next date as runs finish. Jobs which do not allow overlap run one date at
+ a time, and only while no other run of the job is active. Backfills are not
+ persisted, and stop when trond restarts.
+"""
+import collections
+import datetime
+import logging
+
+from twisted.internet import reactor
+
+from tron.core.actionrun import ActionRun
+from tron.core.job import Job
+from tron.core.jobrun import JobRun
+from tron.utils import timeutils
+from tron.utils.observer import Observer
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 1
+
+# Number of finished backfills kept for each job
+MAX_BACKFILL_HISTORY = 10
+
+
+def get_dates(start_date, end_date):
+    """Return the midnight of each day from start_date to end_date,
+    inclusive.
+    """
+    start = datetime.datetime.combine(start_date.date(), datetime.time())
+    days = (end_date.date() - start_date.date()).days
+    return [start + datetime.timedelta(days=day) for day in range(days + 1)]
+
+
+class Backfill(Observer):
+    """Run a job for each date of a range, with at most max_in_flight dates
+    running at the same time.
+    """
+
+    RUNNING = 'running'
+    CANCELLED = 'cancelled'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    def __init__(self, num, job_scheduler, run_times, max_in_flight=None):
+        self.num = num
+        self.job_scheduler = job_scheduler
+        self.run_times = run_times
+        self.max_in_flight = max(max_in_flight or DEFAULT_MAX_IN_FLIGHT, 1)
+        self.pending = collections.deque(run_times)
+        # run time -> JobRuns of that date which have not finished
+        self.in_flight = collections.OrderedDict()
+        self.succeeded = []
+        self.failed = []
+        self.cancelled = []
+        self.run_ids = []
+        self.start_time = timeutils.current_time()
+        self.end_time = None
+
+    @property
+    def job(self):
+        return self.job_scheduler.get_job()
+
+    @property
+    def id(self):
+        return f"{self.job.get_name()}.{self.num}"
+
+    @property
+    def is_done(self):
+        return not self.pending and not self.in_flight
+
+    @property
+    def state(self):
+        if not self.is_done:
+            return self.RUNNING
+        if self.cancelled:
+            return self.CANCELLED
+        if self.failed:
+            return self.FAILED
+        return self.SUCCEEDED
+
+    def get_limit(self):
+        """Return how many dates may be running now."""
+        if self.job.allow_overlap:
+            return self.max_in_flight
+        if any(self.job.runs.get_active()):
+            return 0
+        return 1
+
+    def start(self):
+        self.watch(self.job, Job.NOTIFY_RUN_DONE)
+        log.info(f"Starting {self} for {len(self.run_times)} dates")
+        self.fill()
+
+    def fill(self):
+        """Start runs for the earliest pending dates until the in-flight limit
+        is reached.
+        """
+        while self.pending and len(self.in_flight) < self.get_limit():
+            run_time = self.pending.popleft()
+            job_runs = self.job_scheduler.manual_start(run_time=run_time)
+            self.run_ids.extend(job_run.id for job_run in job_runs)
+            self.in_flight[run_time] = [
+                job_run for job_run in job_runs
+                if job_run.state not in ActionRun.END_STATES
+            ]
+            for job_run in self.in_flight[run_time]:
+                self.watch(job_run, JobRun.NOTIFY_DONE)
+            if not self.in_flight[run_time]:
+                self.finish_date(run_time, job_runs)
+        self.check_done()
+
+    def finish_date(self, run_time, job_runs):
+        del self.in_flight[run_time]
+        if job_runs and all(
+            job_run.state == ActionRun.SUCCEEDED for job_run in job_runs
+        ):
+            self.succeeded.append(run_time)
+        else:
+            self.failed.append(run_time)
+
+    def check_done(self):
+        if not self.is_done or self.end_time:
+            return
+        self.end_time = timeutils.current_time()
+        self.stop_watching(self.job)
+        log.info(f"{self} {self.state}")
+
+    def handle_run_done(self, job_run):
+        self.stop_watching(job_run)
+        for run_time, job_runs in list(self.in_flight.items()):
+            if job_run not in job_runs:
+                continue
+            job_runs.remove(job_run)
+            if not job_runs:
+                self.finish_date(run_time, self.get_date_runs(run_time))
+
+    def get_date_runs(self, run_time):
+        return [
+            job_run for job_run in self.job.runs.runs
+            if job_run.id in self.run_ids and job_run.run_time == run_time
+        ]
+
+    def handler(self, observable, event):
+        if event == JobRun.NOTIFY_DONE:
+            self.handle_run_done(observable)
+        elif event == Job.NOTIFY_RUN_DONE:
+            # The Job is notified before this backfill, so the finished run
+            # has been handled by the time fill is called. The JobScheduler
+            # starts its queued runs first.
+            reactor.callLater(0, self.fill)
+
+    def cancel(self):
+        """Drop the pending dates and cancel the runs which have not started.
+        Returns False if the backfill was already done.
+        """
+        if self.is_done:
+            return False
+        self.cancelled.extend(self.pending)
+        self.pending.clear()
+        for job_runs in list(self.in_flight.values()):
+            for job_run in list(job_runs):
+                job_run.cancel()
+        log.info(f"Cancelled {self}")
+        self.check_done()
+        return True
+
+    def get_progress(self):
+        return {
+            'id': self.id,
+            'job': self.job.get_name(),
+            'state': self.state,
+            'start_date': self.run_times[0] if self.run_times else None,
+            'end_date': self.run_times[-1] if self.run_times else None,
+            'max_in_flight': self.max_in_flight,
+            'total': len(self.run_times),
+            'pending': len(self.pending),
+            'running': len(self.in_flight),
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'cancelled': len(self.cancelled),
+            'runs': list(self.run_ids),
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+        }
+
+    def __str__(self):
+        return f"Backfill:{self.id}"
@@ -0,0 +1,118 @@
+"""
+ tron.core.catch_up
+
+ Policy for runs which were missed while trond was not running. Missed runs
+ can be skipped or collapsed into a single run per job, and the runs which
+ are started are spread out so they do not all start in the same reactor
+ iteration.
+"""
+import logging
+
+from tron import metrics
+from tron.utils import timeutils
+
+log = logging.getLogger(__name__)
+
+# A run is considered missed if its run time is this many seconds in the past
+# when it is scheduled
+MISSED_RUN_THRESHOLD = 60
+
+# Maximum number of missed run times to step over when looking for the next
+# run time of a job
+MAX_MISSED_RUNS = 10000
+
+
+def get_run_age(run_time):
+    """Return the number of seconds since run_time."""
+    now = timeutils.current_time(tz=run_time.tzinfo)
+    return timeutils.delta_total_seconds(now - run_time)
+
+
+class CatchUpPolicy(object):
+    """A Singleton which decides how runs missed while trond was down are
+    caught up.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        if self._instance is not None:
+            raise ValueError("CatchUpPolicy is already instantiated.")
+        self.max_starts_per_second = None
+        self.collapse_missed_runs = False
+        self.next_start = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        cls._instance = None
+
+    @classmethod
+    def configure(cls, catch_up_config):
+        instance = cls.get_instance()
+        if not catch_up_config:
+            instance.max_starts_per_second = None
+            instance.collapse_missed_runs = False
+            return
+        instance.max_starts_per_second = catch_up_config.max_starts_per_second
+        instance.collapse_missed_runs = catch_up_config.collapse_missed_runs
+
+    def should_delay(self, run_time):
+        """Return True if the start of a run at run_time should be spread
+        out with other missed runs.
+        """
+        if not self.max_starts_per_second:
+            return False
+        return get_run_age(run_time) > MISSED_RUN_THRESHOLD
+
+    def should_skip(self, scheduler, run_time, skip_if_older_than=None):
+        """Return True if a missed run at run_time should not be run, either
+        because it is older than skip_if_older_than, or because a later run
+        time has also passed and missed runs are collapsed.
+        """
+        if skip_if_older_than is None and not self.collapse_missed_runs:
+            return False
+
+        age = get_run_age(run_time)
+        if age <= 0:
+            return False
+        if skip_if_older_than is not None:
+            if age > timeutils.delta_total_seconds(skip_if_older_than):
+                return True
+        if not self.collapse_missed_runs:
+            return False
+        return get_run_age(scheduler.next_run_time(run_time)) >= 0
+
+    def get_next_run_time(self, scheduler, last_run_time, skip_if_older_than):
+        """Return the next run time after last_run_time, stepping over any
+        missed run times which should be skipped.
+        """
+        run_time = scheduler.next_run_time(last_run_time)
+        if last_run_time is None:
+            return run_time
+
+        for _ in range(MAX_MISSED_RUNS):
+            if not self.should_skip(scheduler, run_time, skip_if_older_than):
+                return run_time
+            following = scheduler.next_run_time(run_time)
+            if following <= run_time:
+                return run_time
+            metrics.count('catch_up.skipped')
+            run_time = following
+
+        log.warning(f"Too many missed runs after {last_run_time}")
+        return scheduler.next_run_time(None)
+
+    def get_start_delay(self):
+        """Return the number of seconds to delay the start of a missed run,
+        so that missed runs start at no more than max_starts_per_second.
+        """
+        now = timeutils.current_timestamp()
+        start = max(now, self.next_start or now)
+        self.next_start = start + 1.0 / self.max_starts_per_second
+        return start - now
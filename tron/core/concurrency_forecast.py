@@ -0,0 +1,331 @@
+"""
+ tron.core.concurrency_forecast
+
+ Forecast how many actions will run at the same time on each node pool.
+
+ Each job's upcoming run times come from its scheduler. Within a run, an
+ action starts once all of its required actions have finished, and runs for
+ the median duration of its recent successful runs, or for its configured
+ expected_runtime when it has none. The running actions are counted in
+ fixed size time buckets.
+"""
+import collections
+import datetime
+import logging
+import math
+import statistics
+import threading
+
+from tron.config.schema import ExecutorTypes
+from tron.core import schedule_preview
+from tron.core.job import Job
+from tron.utils import timeutils
+from tron.utils.observer import Observer
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HORIZON = datetime.timedelta(days=1)
+
+# Longest horizon of a forecast
+MAX_HORIZON = datetime.timedelta(days=7)
+
+DEFAULT_BUCKET_SIZE = 300
+
+# Maximum number of buckets in a forecast
+MAX_BUCKETS = 10000
+
+# Number of the busiest buckets of each node pool included in a forecast
+FORECAST_BUSIEST = 10
+
+# Name used for actions which run on Mesos instead of a node pool
+MESOS_POOL_NAME = 'mesos'
+
+
+def get_action_durations(job):
+    """Return a dict of action name to the median duration, in seconds, of
+    the successful runs of that action in the job's history.
+    """
+    durations = collections.defaultdict(list)
+    for job_run in job.runs.runs:
+        if not job_run.action_runs:
+            continue
+        for action_run in job_run.action_runs:
+            if not action_run.is_succeeded:
+                continue
+            if not action_run.start_time or not action_run.end_time:
+                continue
+            durations[action_run.action_name].append(
+                timeutils.delta_total_seconds(
+                    action_run.end_time - action_run.start_time,
+                ),
+            )
+    return {
+        name: statistics.median(values)
+        for name, values in durations.items()
+    }
+
+
+def get_pool_name(job, action):
+    if action.executor == ExecutorTypes.mesos:
+        return MESOS_POOL_NAME
+    node_pool = action.node_pool or job.node_pool
+    return node_pool.get_name() if node_pool else None
+
+
+def get_action_windows(job, durations):
+    """Return a list of (node pool name, start, end) for each action of a
+    job, in seconds from the start of a run.
+    """
+    action_map = job.action_graph.get_action_map()
+    ends = {}
+
+    def get_duration(action):
+        if action.name in durations:
+            return durations[action.name]
+        if action.expected_runtime:
+            return timeutils.delta_total_seconds(action.expected_runtime)
+        return 0
+
+    def get_end(action):
+        if action.name not in ends:
+            start = max(
+                (get_end(required) for required in action.required_actions),
+                default=0,
+            )
+            ends[action.name] = start, start + get_duration(action)
+        return ends[action.name][1]
+
+    cleanup_action = None
+    for action in action_map.values():
+        if action.is_cleanup:
+            cleanup_action = action
+            continue
+        get_end(action)
+
+    if cleanup_action:
+        # The cleanup action runs once all other actions are done
+        start = max((end for _, end in ends.values()), default=0)
+        ends[cleanup_action.name] = (
+            start,
+            start + get_duration(cleanup_action),
+        )
+
+    windows = []
+    for name, (start, end) in ends.items():
+        pool_name = get_pool_name(job, action_map[name])
+        if pool_name:
+            windows.append((pool_name, start, end))
+    return windows
+
+
+def build_pool_forecast(running, start, bucket_size, limit):
+    """Return a summary of the number of running actions in each bucket of
+    a node pool.
+    """
+    busiest = sorted(
+        range(len(running)),
+        key=lambda index: (-running[index], index),
+    )[:FORECAST_BUSIEST]
+
+    def bucket_time(index):
+        return datetime.datetime.fromtimestamp(start + index * bucket_size)
+
+    forecast = {
+        'peak': max(running, default=0),
+        'limit': limit,
+        'running': running,
+        'busiest': [
+            {
+                'time': bucket_time(index),
+                'running': running[index],
+            } for index in busiest if running[index]
+        ],
+    }
+    if limit is not None:
+        forecast['overloaded'] = [
+            bucket_time(index)
+            for index, count in enumerate(running) if count > limit
+        ]
+    return forecast
+
+
+class ConcurrencyForecast(Observer):
+    """Forecast the number of concurrently running actions per node pool.
+
+    Forecasts are built in API threads, while the reactor changes the runs of
+    each job, so action durations are read from the runs on the reactor, when
+    a job is configured or restored and when one of its runs is done, and
+    forecasts only use those durations. The durations and the cached
+    forecast are guarded by `lock`.
+
+    A forecast is kept until the configuration changes, see `configure`, or
+    until its first bucket is in the past.
+    """
+
+    def __init__(self):
+        # job name -> action name -> median duration
+        self.durations = {}
+        # (cache key, forecast)
+        self.cached = None
+        # Incremented when the configuration changes, so a forecast built
+        # from an older configuration is not cached
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def configure(self, new_jobs, job_names):
+        """Watch the jobs added by a configuration, forget the durations of
+        removed jobs, and drop the cached forecast.
+        """
+        for job in new_jobs:
+            self.watch(job, Job.NOTIFY_RUN_DONE)
+            self.update_durations(job)
+        job_names = set(job_names)
+        with self.lock:
+            for name in set(self.durations) - job_names:
+                del self.durations[name]
+            self.cached = None
+            self.generation += 1
+
+    def update_durations(self, job):
+        durations = get_action_durations(job)
+        with self.lock:
+            self.durations[job.get_name()] = durations
+
+    def handler(self, job, event):
+        if event == Job.NOTIFY_RUN_DONE:
+            self.update_durations(job)
+
+    def get_forecast(
+        self,
+        jobs,
+        start_time,
+        horizon=DEFAULT_HORIZON,
+        bucket_size=DEFAULT_BUCKET_SIZE,
+        limits=None,
+    ):
+        """Return the forecast of a list of jobs, from the cache if it is
+        still current. The horizon is at most MAX_HORIZON.
+        """
+        horizon = min(horizon, MAX_HORIZON)
+        bucket_size = max(
+            bucket_size,
+            int(math.ceil(
+                timeutils.delta_total_seconds(horizon) / MAX_BUCKETS,
+            )),
+        )
+        first_bucket = int(start_time.timestamp() // bucket_size)
+        limits = tuple(sorted((limits or {}).items()))
+        cache_key = (first_bucket, horizon, bucket_size, limits)
+        with self.lock:
+            cached, generation = self.cached, self.generation
+            durations = dict(self.durations)
+        if cached and cached[0] == cache_key:
+            return cached[1]
+
+        forecast = self.build(
+            jobs,
+            start_time,
+            horizon,
+            bucket_size,
+            limits,
+            durations,
+        )
+        with self.lock:
+            if generation == self.generation:
+                self.cached = cache_key, forecast
+        return forecast
+
+    def build(
+        self,
+        jobs,
+        start_time,
+        horizon,
+        bucket_size,
+        limits=None,
+        durations=None,
+    ):
+        """Return the number of running actions of each node pool in each
+        bucket, from the bucket containing start_time until start_time +
+        horizon. `durations` is a dict of job name to action durations; when
+        it is None, they are read from the runs of each job.
+        """
+        limits = dict(limits or {})
+        start = int(start_time.timestamp() // bucket_size) * bucket_size
+        end = (start_time + horizon).timestamp()
+        num_buckets = int(math.ceil((end - start) / bucket_size))
+
+        enabled_jobs = [job for job in jobs if job.enabled]
+        if durations is None:
+            durations = {
+                job.get_name(): get_action_durations(job)
+                for job in enabled_jobs
+            }
+        job_windows = {
+            job.get_name(): get_action_windows(
+                job,
+                durations.get(job.get_name(), {}),
+            )
+            for job in enabled_jobs
+        }
+        # Include runs which started earlier and are still running
+        lookback = min(
+            max(
+                (
+                    window_end for windows in job_windows.values()
+                    for _, _, window_end in windows
+                ),
+                default=0,
+            ),
+            timeutils.delta_total_seconds(horizon),
+        )
+        run_times = schedule_preview.preview_jobs(
+            enabled_jobs,
+            datetime.datetime.fromtimestamp(start - lookback),
+            datetime.datetime.fromtimestamp(end),
+        )
+
+        changes = collections.defaultdict(lambda: [0] * (num_buckets + 1))
+        for name, windows in job_windows.items():
+            timestamps = [run_time.timestamp() for run_time in run_times[name]]
+            for pool_name, window_start, window_end in windows:
+                pool_changes = changes[pool_name]
+                for timestamp in timestamps:
+                    first = int(
+                        (timestamp + window_start - start) // bucket_size,
+                    )
+                    last = int(
+                        math.ceil(
+                            (timestamp + window_end - start) / bucket_size,
+                        ),
+                    )
+                    # Actions shorter than a bucket still run in one
+                    last = min(max(last, first + 1), num_buckets)
+                    first = max(first, 0)
+                    if first >= last:
+                        continue
+                    pool_changes[first] += 1
+                    pool_changes[last] -= 1
+
+        pools = {}
+        for pool_name, pool_changes in changes.items():
+            running, count = [], 0
+            for change in pool_changes[:num_buckets]:
+                count += change
+                running.append(count)
+            pools[pool_name] = build_pool_forecast(
+                running,
+                start,
+                bucket_size,
+                limits.get(pool_name),
+            )
+
+        log.info(
+            f"Forecast concurrency of {len(enabled_jobs)} jobs on "
+            f"{len(pools)} node pools",
+        )
+        return {
+            'start': datetime.datetime.fromtimestamp(start),
+            'bucket_size': bucket_size,
+            'horizon': int(timeutils.delta_total_seconds(horizon)),
+            'pools': pools,
+        }
@@ -37,6 +37,7 @@ class Job(Observable, Observer):
     STATUS_ENABLED = "enabled"
     STATUS_UNKNOWN = "unknown"
     STATUS_RUNNING = "running"
+    STATUS_RESTORING = "restoring"
 
     NOTIFY_STATE_CHANGE = 'notify_state_change'
     NOTIFY_RUN_DONE = 'notify_run_done'
@@ -58,6 +59,7 @@ class Job(Observable, Observer):
         'monitoring',
         'time_zone',
         'expected_runtime',
+        'skip_if_older_than',
     ]
 
     # TODO: use config object
@@ -78,7 +80,8 @@ class Job(Observable, Observer):
         action_runner=None,
         max_runtime=None,
         time_zone=None,
-        expected_runtime=None
+        expected_runtime=None,
+        skip_if_older_than=None,
     ):
         super(Job, self).__init__()
         self.name = maybe_decode(name)
@@ -95,6 +98,9 @@ class Job(Observable, Observer):
         self.max_runtime = max_runtime
         self.time_zone = time_zone
         self.expected_runtime = expected_runtime
+        self.skip_if_older_than = skip_if_older_than
+        # False while trond is starting and this job's state is not restored
+        self.restored = True
         self.output_path = output_path or filehandler.OutputPath()
         self.output_path.append(name)
         self.context = command_context.build_context(self, parent_context)
@@ -134,6 +140,7 @@ class Job(Observable, Observer):
             action_runner=action_runner,
             max_runtime=job_config.max_runtime,
             expected_runtime=job_config.expected_runtime,
+            skip_if_older_than=job_config.skip_if_older_than,
         )
 
     def update_from_job(self, job):
@@ -148,6 +155,8 @@ class Job(Observable, Observer):
     @property
     def status(self):
         """Current status."""
+        if not self.restored:
+            return self.STATUS_RESTORING
         if not self.enabled:
             return self.STATUS_DISABLED
         if self.runs.get_run_by_state(ActionRun.RUNNING):
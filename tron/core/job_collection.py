@@ -25,12 +25,23 @@ class JobCollection:
                 proxy.func_proxy('run_queue_schedule', iteration.list_all),
             ],
         )
-
-    def load_from_config(self, job_configs, factory, reconfigure):
+        self.fingerprints = {}
+
+    def load_from_config(
+        self,
+        job_configs,
+        factory,
+        reconfigure,
+        unchanged=frozenset(),
+    ):
         """Apply a configuration to this collection and return a generator of
-        jobs which were added.
+        jobs which were added. Only jobs whose fingerprint changed are built.
+        Jobs named in `unchanged` are known to be unchanged and are skipped
+        without computing their fingerprint.
         """
         self.jobs.filter_by_name(job_configs)
+        for name in set(self.fingerprints) - set(job_configs):
+            del self.fingerprints[name]
 
         def map_to_job_and_schedule(job_schedulers):
             for job_scheduler in job_schedulers:
@@ -38,8 +49,22 @@ class JobCollection:
                     job_scheduler.schedule()
                 yield job_scheduler.get_job()
 
-        seq = (factory.build(config) for config in six.itervalues(job_configs))
-        return map_to_job_and_schedule(filter(self.add, seq))
+        def build_changed():
+            built = 0
+            for name, config in six.iteritems(job_configs):
+                if name in unchanged and name in self.jobs:
+                    continue
+                fingerprint = factory.get_fingerprint(config)
+                current = self.fingerprints.get(name)
+                if name in self.jobs and current == fingerprint:
+                    continue
+                job_scheduler = factory.build(config)
+                built += 1
+                yield job_scheduler
+                self.fingerprints[name] = fingerprint
+            log.info(f"Built {built} of {len(job_configs)} jobs")
+
+        return map_to_job_and_schedule(filter(self.add, build_changed()))
 
     def add(self, job_scheduler):
         return self.jobs.add(job_scheduler, self.update)
@@ -56,6 +81,16 @@ class JobCollection:
             self.jobs[name].restore_state(state, config_action_runner)
         log.info(f"Loaded state for {len(job_state_data)} jobs")
 
+    def get_restore_order(self, job_state_data):
+        """Return the names of all jobs, ordered so that jobs which need to
+        run soonest are restored first.
+        """
+        def sort_key(name):
+            job_scheduler = self.jobs[name]
+            return job_scheduler.get_restore_time(job_state_data.get(name)), name
+
+        return sorted(self.jobs, key=sort_key)
+
     def get_by_name(self, name):
         return self.jobs.get(name)
 
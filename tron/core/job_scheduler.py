@@ -3,7 +3,12 @@ import logging
 import humanize
 from twisted.internet import reactor
 
+from tron import metrics
+from tron.config.config_utils import fingerprint
+from tron.core import backfill
 from tron.core import recovery
+from tron.core.actionrun import ActionRun
+from tron.core.catch_up import CatchUpPolicy
 from tron.core.job import Job
 from tron.scheduler import scheduler_from_config
 from tron.serialize import filehandler
@@ -23,6 +28,7 @@ class JobScheduler(Observer):
     def __init__(self, job):
         self.job = job
         self.watch(job)
+        self.backfills = []
 
     def restore_state(self, job_state_data, config_action_runner):
         """Restore the job state and schedule any JobRuns."""
@@ -37,13 +43,45 @@ class JobScheduler(Observer):
         )
 
         scheduled = self.job.runs.get_scheduled()
+        catch_up = CatchUpPolicy.get_instance()
         # for those that were already scheduled, we reschedule them to run.
         for job_run in scheduled:
+            if catch_up.should_skip(
+                self.job.scheduler,
+                job_run.run_time,
+                self.job.skip_if_older_than,
+            ):
+                log.info(f"Skipping missed {job_run}")
+                metrics.count('catch_up.skipped')
+                job_run.cancel()
+                continue
             self._set_callback(job_run)
 
         # Ensure we have at least 1 scheduled run
         self.schedule()
 
+    def get_restore_time(self, job_state_data):
+        """Return the timestamp of the earliest unfinished run in the saved
+        state of this job, or of its next run if there are none. Jobs are
+        restored on startup in order of this time.
+        """
+        if job_state_data and not job_state_data.get('enabled', True):
+            return float('inf')
+
+        run_times = [
+            run['run_time'] for run in (job_state_data or {}).get('runs', ())
+            if run['run_time'] and any(
+                action['state'] not in ActionRun.END_STATES
+                for action in run.get('runs', ())
+            )
+        ]
+        if not run_times:
+            next_run_time = self.job.scheduler.next_run_time(None)
+            if not next_run_time:
+                return float('inf')
+            run_times = [next_run_time]
+        return min(run_time.timestamp() for run_time in run_times)
+
     def enable(self):
         """Enable the job and start its scheduling cycle."""
         if self.job.enabled:
@@ -71,6 +109,36 @@ class JobScheduler(Observer):
             r.start()
         return manual_runs
 
+    def backfill(self, start_date, end_date, max_in_flight=None):
+        """Start a Backfill which runs this job for each date from start_date
+        to end_date, with at most max_in_flight dates running at once.
+        """
+        num = self.backfills[-1].num + 1 if self.backfills else 1
+        job_backfill = backfill.Backfill(
+            num,
+            self,
+            backfill.get_dates(start_date, end_date),
+            max_in_flight,
+        )
+        finished = [item for item in self.backfills if item.is_done]
+        for item in finished[:-backfill.MAX_BACKFILL_HISTORY]:
+            self.backfills.remove(item)
+        self.backfills.append(job_backfill)
+        job_backfill.start()
+        return job_backfill
+
+    def get_backfill(self, num):
+        for job_backfill in self.backfills:
+            if job_backfill.num == num:
+                return job_backfill
+
+    def cancel_backfills(self):
+        """Cancel all running backfills, and return them."""
+        return [
+            job_backfill for job_backfill in self.backfills
+            if job_backfill.cancel()
+        ]
+
     def schedule_reconfigured(self):
         """Remove the pending run and create new runs with the new JobScheduler.
         """
@@ -88,9 +156,14 @@ class JobScheduler(Observer):
     def _set_callback(self, job_run):
         """Set a callback for JobRun to fire at the appropriate time."""
         seconds = job_run.seconds_until_run_time()
+        catch_up = CatchUpPolicy.get_instance()
+        if not seconds and catch_up.should_delay(job_run.run_time):
+            seconds = catch_up.get_start_delay()
+            metrics.count('catch_up.started')
         human_time = humanize.naturaltime(seconds, future=True)
         log.info(f"Scheduling {job_run} {human_time} ({seconds} seconds)")
         reactor.callLater(seconds, self.run_job, job_run)
+        job_run.prewarm_nodes(seconds)
 
     # TODO: new class for this method
     def run_job(self, job_run, run_queued=False):
@@ -172,7 +245,11 @@ class JobScheduler(Observer):
         else:
             last_run = self.job.runs.get_newest(include_manual=False)
             last_run_time = last_run.run_time if last_run else None
-        next_run_time = self.job.scheduler.next_run_time(last_run_time)
+        next_run_time = CatchUpPolicy.get_instance().get_next_run_time(
+            self.job.scheduler,
+            last_run_time,
+            self.job.skip_if_older_than,
+        )
         return self.job.build_new_runs(next_run_time)
 
     def __str__(self):
@@ -197,17 +274,48 @@ class JobScheduler(Observer):
 class JobSchedulerFactory(object):
     """Construct JobScheduler instances from configuration."""
 
-    def __init__(self, context, output_stream_dir, time_zone, action_runner):
+    def __init__(
+        self,
+        context,
+        output_stream_dir,
+        time_zone,
+        action_runner,
+        schedule_offsets=None,
+        environment=None,
+    ):
         self.context = context
         self.output_stream_dir = output_stream_dir
         self.time_zone = time_zone
         self.action_runner = action_runner
+        self.schedule_offsets = schedule_offsets or {}
+        self.environment = environment
+
+    def get_fingerprint(self, job_config):
+        """Return a fingerprint of everything a JobScheduler is built from.
+        `environment` is a fingerprint of the master settings shared by all
+        jobs.
+        """
+        return fingerprint(
+            job_config,
+            self.schedule_offsets.get(job_config.name),
+            self.environment,
+        )
+
+    def get_namespace_fingerprint(self, job_configs):
+        """Return a fingerprint of all the jobs in a namespace."""
+        offsets = [
+            (name, self.schedule_offsets.get(name))
+            for name in sorted(job_configs)
+        ]
+        return fingerprint(job_configs, offsets, self.environment)
 
     def build(self, job_config):
         log.debug(f"Building new job {job_config.name}")
         output_path = filehandler.OutputPath(self.output_stream_dir)
         time_zone = job_config.time_zone or self.time_zone
         scheduler = scheduler_from_config(job_config.schedule, time_zone)
+        if job_config.name in self.schedule_offsets:
+            scheduler.offset = self.schedule_offsets[job_config.name]
         job = Job.from_config(
             job_config=job_config,
             scheduler=scheduler,
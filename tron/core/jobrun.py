@@ -5,9 +5,11 @@ import logging
 from collections import deque
 
 from tron import command_context
+from tron import metrics
 from tron import node
 from tron.core.actionrun import ActionRun
 from tron.core.actionrun import ActionRunFactory
+from tron.core.actionrun import SSHActionRun
 from tron.serialize import filehandler
 from tron.utils import maybe_decode
 from tron.utils import next_or_none
@@ -58,6 +60,7 @@ class JobRun(Observable, Observer):
         self._action_runs = None
         self.action_graph = action_graph
         self.manual = manual
+        self.start_latency_recorded = False
 
         if action_runs:
             self.action_runs = action_runs
@@ -185,6 +188,34 @@ class JobRun(Observable, Observer):
             now = timeutils.current_time()
         return max(0, timeutils.delta_total_seconds(run_time - now))
 
+    def record_start_latency(self):
+        """Record the time from the run time to the first action running."""
+        if self.start_latency_recorded:
+            return
+        self.start_latency_recorded = True
+        run_time = self.run_time
+        now = timeutils.current_time(tz=run_time.tzinfo)
+        metrics.timer(
+            'jobrun.start_latency',
+            timeutils.delta_total_seconds(now - run_time),
+        )
+
+    def prewarm_nodes(self, seconds):
+        """Ask the nodes of the actions which start with this run to have a
+        connection ready when it is due in `seconds`. Nodes share their
+        ssh_options, so nothing is done when prewarm_seconds is 0.
+        """
+        if not self.node or not self.node.node_settings.prewarm_seconds:
+            return
+        # Node name -> Node, Nodes are not hashable
+        nodes = {
+            action_run.node.get_name(): action_run.node
+            for action_run in self.action_runs.get_startable_action_runs()
+            if isinstance(action_run, SSHActionRun) and action_run.node
+        }
+        for run_node in nodes.values():
+            run_node.prewarm(seconds)
+
     def start(self):
         """Start this JobRun as a scheduled run (not a manual run)."""
         if self.action_runs.has_startable_action_runs and self._do_start():
@@ -228,6 +259,9 @@ class JobRun(Observable, Observer):
         # propagate all state changes (from action runs) up to state serializer
         self.notify(self.NOTIFY_STATE_CHANGED)
 
+        if event == ActionRun.RUNNING and not self.manual:
+            self.record_start_latency()
+
         if not action_run.is_done:
             return
 
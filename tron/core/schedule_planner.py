@@ -0,0 +1,295 @@
+"""
+ tron.core.schedule_planner
+
+ Spread the start times of jobs which are scheduled for the same time by
+ assigning each job a fixed offset within a configured window.
+"""
+import collections
+import datetime
+import logging
+import zlib
+
+from tron import scheduler
+from tron.utils import timeutils
+
+log = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Run times are planned from a fixed point so that offsets do not depend on
+# when trond was started.
+PLANNING_EPOCH = datetime.datetime(2000, 1, 3)
+
+# Number of run times of each job used to find collisions with other jobs
+PLANNING_SAMPLES = 48
+
+# Maximum number of run times of each job included in a report
+MAX_REPORT_RUNS = 1000
+
+# Number of the busiest buckets included in a report
+REPORT_BUSIEST = 10
+
+
+def stable_hash(name):
+    """A hash of the job name which is stable across restarts."""
+    return zlib.crc32(name.encode('utf8'))
+
+
+def is_plannable(job_scheduler):
+    """Jobs with jitter are already spread, and other schedulers do not have
+    fixed run times.
+    """
+    plannable_types = scheduler.GeneralScheduler, scheduler.IntervalScheduler
+    return (
+        isinstance(job_scheduler, plannable_types) and
+        not job_scheduler.get_jitter()
+    )
+
+
+def iter_run_times(job_scheduler, start_time, limit):
+    """Yield up to `limit` base run times after start_time."""
+    run_time = start_time
+    for _ in range(limit):
+        run_time = job_scheduler.base_run_time(run_time)
+        yield run_time
+
+
+def build_scheduler(job_config, time_zone):
+    return scheduler.scheduler_from_config(
+        job_config.schedule,
+        job_config.time_zone or time_zone,
+    )
+
+
+def build_histogram(timestamps, bucket_size):
+    """Return a summary of the number of starts in each bucket."""
+    buckets = collections.Counter(
+        int(timestamp // bucket_size) * bucket_size
+        for timestamp in timestamps
+    )
+    busiest = sorted(buckets.items(), key=lambda b: (-b[1], b[0]))
+    distribution = collections.Counter(buckets.values())
+    return {
+        'starts': sum(buckets.values()),
+        'peak': busiest[0][1] if busiest else 0,
+        'busiest': [
+            {
+                'time': datetime.datetime.fromtimestamp(bucket),
+                'starts': starts,
+            } for bucket, starts in busiest[:REPORT_BUSIEST]
+        ],
+        'distribution': dict(sorted(distribution.items())),
+    }
+
+
+class PlannedSchedule(object):
+    """A job scheduler, and the seconds of the day of its first few run
+    times, computed when first needed.
+    """
+
+    __slots__ = ('scheduler', '_samples')
+
+    def __init__(self, job_scheduler):
+        self.scheduler = job_scheduler
+        self._samples = None
+
+    @property
+    def is_plannable(self):
+        return is_plannable(self.scheduler)
+
+    @property
+    def is_interval(self):
+        return isinstance(self.scheduler, scheduler.IntervalScheduler)
+
+    @property
+    def samples(self):
+        if self._samples is None:
+            self._samples = frozenset(get_samples(self.scheduler))
+        return self._samples
+
+
+def get_samples(job_scheduler):
+    """Return the seconds of the day of the first few run times after
+    PLANNING_EPOCH.
+    """
+    run_times = iter_run_times(
+        job_scheduler,
+        PLANNING_EPOCH,
+        PLANNING_SAMPLES,
+    )
+    first_time = None
+    samples = []
+    for run_time in run_times:
+        first_time = first_time or run_time
+        seconds = timeutils.delta_total_seconds(run_time - first_time)
+        first_seconds = (
+            first_time.hour * 3600 + first_time.minute * 60 +
+            first_time.second
+        )
+        samples.append(int(first_seconds + seconds) % SECONDS_PER_DAY)
+    return samples
+
+
+def get_schedule_key(job_config, time_zone):
+    """Return a key which is equal for job configs with the same schedule."""
+    return repr((job_config.schedule, job_config.time_zone or time_zone))
+
+
+class SchedulePlanner(object):
+    """Assign deterministic offsets, within `window`, to jobs which use a
+    GeneralScheduler or IntervalScheduler.
+
+    Each job's offset is chosen by a stable hash of its name. Jobs whose
+    offsets are equal and whose run times overlap are ordered by name, and
+    all but the first are moved to an offset chosen by a hash of their name
+    and rank. Adding or removing a job only moves jobs which share its
+    offset: a new job whose name sorts first takes the offset, and the job
+    which had it moves.
+
+    Planned schedules are cached by job name until the job's schedule
+    changes. The job configs of the last plan are kept for `report`.
+    """
+
+    def __init__(self, enabled=False, window=None):
+        self.enabled = enabled
+        self.window = window or datetime.timedelta()
+        # job name -> (schedule key, PlannedSchedule)
+        self.planned = {}
+        # (job configs, time zone) of the last plan_from_config
+        self.last_config = {}, None
+
+    @classmethod
+    def from_config(cls, spreading_config):
+        planner = cls()
+        planner.configure(spreading_config)
+        return planner
+
+    def configure(self, spreading_config):
+        if not spreading_config:
+            self.enabled, self.window = False, datetime.timedelta()
+            return
+        self.enabled = spreading_config.enabled
+        self.window = spreading_config.window
+
+    @property
+    def window_seconds(self):
+        return int(timeutils.delta_total_seconds(self.window))
+
+    def plan(self, schedulers):
+        """Return a dict of job name to offset for a dict of job name to
+        scheduler.
+        """
+        return self._plan({
+            name: PlannedSchedule(job_scheduler)
+            for name, job_scheduler in schedulers.items()
+        })
+
+    def _plan(self, planned):
+        window_seconds = self.window_seconds
+        if window_seconds < 1:
+            return {}
+
+        slots = collections.defaultdict(list)
+        for name in sorted(planned):
+            if planned[name].is_plannable:
+                slots[stable_hash(name) % window_seconds].append(name)
+
+        offsets = {}
+        for slot, names in slots.items():
+            occupied = set()
+            taken = {slot}
+            for name in names:
+                offset = slot
+                planned_schedule = planned[name]
+                # Interval jobs have no fixed phase to plan against
+                if len(names) > 1 and not planned_schedule.is_interval:
+                    samples = planned_schedule.samples
+                    if occupied & samples:
+                        offset = self._move(name, taken, window_seconds)
+                        taken.add(offset)
+                    occupied |= samples
+                offsets[name] = datetime.timedelta(seconds=offset)
+        return offsets
+
+    def _move(self, name, taken, window_seconds):
+        """Return an offset, chosen by hashes of the job name, for a job
+        which collides with another job with the same offset.
+        """
+        for attempt in range(1, window_seconds + 1):
+            offset = stable_hash(f'{name}.{attempt}') % window_seconds
+            if offset not in taken:
+                return offset
+        return min(taken)
+
+    def plan_from_config(self, job_configs, time_zone):
+        """Return a dict of job name to offset for a dict of ConfigJobs, or
+        an empty dict if the planner is not enabled.
+        """
+        self.last_config = job_configs, time_zone
+        if not self.enabled:
+            return {}
+
+        planned = {}
+        for name, job_config in job_configs.items():
+            schedule_key = get_schedule_key(job_config, time_zone)
+            cached_key, planned_schedule = self.planned.get(name, (None, None))
+            if cached_key != schedule_key:
+                planned_schedule = PlannedSchedule(
+                    build_scheduler(job_config, time_zone),
+                )
+            planned[name] = schedule_key, planned_schedule
+        self.planned = planned
+
+        offsets = self._plan({
+            name: planned_schedule
+            for name, (_, planned_schedule) in planned.items()
+        })
+        log.info(f"Planned schedule offsets for {len(offsets)} jobs")
+        return offsets
+
+    def report(self, start_time, horizon, bucket_size, schedulers=None):
+        """Return a histogram of job starts between start_time and
+        start_time + horizon, before and after planned offsets are applied.
+
+        The schedulers default to new schedulers for the job configs of the
+        last plan, so a report does not share schedulers with running jobs.
+        """
+        if schedulers is None:
+            job_configs, time_zone = self.last_config
+            schedulers = {
+                name: build_scheduler(job_config, time_zone)
+                for name, job_config in job_configs.items()
+            }
+        offsets = self.plan(schedulers)
+        end_timestamp = (start_time + horizon).timestamp()
+        before, after = [], []
+        for name, job_scheduler in schedulers.items():
+            if not is_plannable(job_scheduler):
+                continue
+
+            offset = offsets.get(name, datetime.timedelta())
+            offset_seconds = timeutils.delta_total_seconds(offset)
+            for run_time in iter_run_times(
+                job_scheduler,
+                start_time,
+                MAX_REPORT_RUNS,
+            ):
+                timestamp = run_time.timestamp()
+                if timestamp >= end_timestamp:
+                    break
+                before.append(timestamp)
+                if timestamp + offset_seconds < end_timestamp:
+                    after.append(timestamp + offset_seconds)
+
+        return {
+            'enabled': self.enabled,
+            'window': self.window_seconds,
+            'horizon': int(timeutils.delta_total_seconds(horizon)),
+            'bucket_size': bucket_size,
+            'offsets': {
+                name: int(timeutils.delta_total_seconds(offset))
+                for name, offset in sorted(offsets.items())
+            },
+            'before': build_histogram(before, bucket_size),
+            'after': build_histogram(after, bucket_size),
+        }
@@ -0,0 +1,197 @@
+"""
+ tron.core.schedule_preview
+
+ Compute the upcoming run times of many jobs between two times.
+
+ GeneralScheduler jobs which share a schedule and time zone (most often the
+ same cron or daily expression) are grouped, and the run times of each
+ schedule are computed once for the whole group. Each job then selects its
+ own run times, shifted by its offset, from the shared list. IntervalScheduler
+ run times are computed arithmetically from the job's last run.
+"""
+import bisect
+import datetime
+import math
+
+from tron import scheduler
+from tron.utils import timeutils
+
+# Maximum number of run times returned for each job
+MAX_PREVIEW_RUNS = 1000
+
+
+def get_schedule_key(job_scheduler):
+    """Return a hashable key which is equal for GeneralSchedulers which
+    match the same run times, ignoring offset and jitter.
+    """
+    time_spec = job_scheduler.time_spec
+    fields = (
+        time_spec.hours,
+        time_spec.minutes,
+        time_spec.seconds,
+        time_spec.ordinals,
+        time_spec.weekdays,
+        time_spec.months,
+        time_spec.monthdays,
+    )
+    time_zone = job_scheduler.time_zone
+    return (
+        tuple(tuple(field) for field in fields),
+        time_zone.zone if time_zone else None,
+    )
+
+
+def from_timestamp(timestamp, time_zone):
+    """Return a datetime for a timestamp, in time_zone if it is set, or as a
+    local naive datetime like timeutils.current_time().
+    """
+    if time_zone:
+        return datetime.datetime.fromtimestamp(timestamp, time_zone)
+    return datetime.datetime.fromtimestamp(timestamp)
+
+
+def get_schedule_run_times(job_scheduler, start, end, limit, limit_start):
+    """Return sorted lists of the timestamps and base run times of a
+    GeneralScheduler which are after the timestamp start and before the
+    timestamp end. Stops after limit run times after limit_start.
+    """
+    timestamps, run_times = [], []
+    counted = 0
+    for run_time in job_scheduler.base_run_times(
+        from_timestamp(start, job_scheduler.time_zone),
+    ):
+        timestamp = run_time.timestamp()
+        if timestamp >= end:
+            break
+        timestamps.append(timestamp)
+        run_times.append(run_time)
+        if timestamp > limit_start:
+            counted += 1
+            if counted >= limit:
+                break
+    return timestamps, run_times
+
+
+def get_interval_run_times(job, start, end, limit):
+    """Return up to limit run times of a job with an IntervalScheduler after
+    the timestamp start and before the timestamp end. Runs follow the job's
+    scheduled run, or its newest run, every interval.
+    """
+    job_scheduler = job.scheduler
+    interval = timeutils.delta_total_seconds(job_scheduler.interval)
+    if interval <= 0:
+        return []
+
+    scheduled = job.runs.get_scheduled()
+    newest = job.runs.get_newest(include_manual=False)
+    if scheduled:
+        first_time = min(run.run_time for run in scheduled)
+    elif newest:
+        first_time = newest.run_time + job_scheduler.interval
+    else:
+        first_time = job_scheduler.base_run_time(
+            from_timestamp(start, job_scheduler.time_zone),
+        ) + job_scheduler.offset
+
+    first = first_time.timestamp()
+    skipped = 0
+    if start >= first:
+        skipped = int(math.floor((start - first) / interval)) + 1
+    run_times = []
+    for count in range(skipped, skipped + limit):
+        timestamp = first + count * interval
+        if timestamp >= end:
+            break
+        run_times.append(first_time + count * job_scheduler.interval)
+    return run_times
+
+
+class SchedulePreview(object):
+    """The run times of a set of jobs after start_time and before end_time,
+    both naive local datetimes. Call `add` for each job, then
+    `get_run_times`. Run times include each job's offset, but not its
+    jitter.
+    """
+
+    def __init__(self, start_time, end_time, limit=MAX_PREVIEW_RUNS):
+        self.start = start_time.timestamp()
+        self.end = end_time.timestamp()
+        self.limit = limit
+        # schedule key -> [GeneralScheduler, min offset, max offset]
+        self.schedules = {}
+        # job name -> (schedule key, offset) or list of run times
+        self.jobs = {}
+
+    def add(self, job):
+        """Add a job to the preview. Jobs with a ConstantScheduler have no
+        fixed run times and are returned with no run times.
+        """
+        job_scheduler = job.scheduler
+        if isinstance(job_scheduler, scheduler.IntervalScheduler):
+            self.jobs[job.get_name()] = get_interval_run_times(
+                job,
+                self.start,
+                self.end,
+                self.limit,
+            )
+            return
+
+        if not isinstance(job_scheduler, scheduler.GeneralScheduler):
+            self.jobs[job.get_name()] = []
+            return
+
+        offset = timeutils.delta_total_seconds(job_scheduler.offset)
+        key = get_schedule_key(job_scheduler)
+        schedule = self.schedules.setdefault(
+            key,
+            [job_scheduler, offset, offset],
+        )
+        schedule[1] = min(schedule[1], offset)
+        schedule[2] = max(schedule[2], offset)
+        self.jobs[job.get_name()] = key, job_scheduler.offset
+
+    def get_run_times(self):
+        """Return a dict of job name to a sorted list of run times."""
+        schedule_run_times = {}
+        for key, schedule in self.schedules.items():
+            job_scheduler, min_offset, max_offset = schedule
+            # No job needs more than the first limit run times after the
+            # start of the job with the smallest offset
+            schedule_run_times[key] = get_schedule_run_times(
+                job_scheduler,
+                self.start - max_offset,
+                self.end - min_offset,
+                self.limit,
+                self.start - min_offset,
+            )
+
+        run_times = {}
+        for name, job_entry in self.jobs.items():
+            if isinstance(job_entry, list):
+                run_times[name] = job_entry
+                continue
+
+            key, offset = job_entry
+            offset_seconds = timeutils.delta_total_seconds(offset)
+            timestamps, schedule = schedule_run_times[key]
+            first = bisect.bisect_right(
+                timestamps,
+                self.start - offset_seconds,
+            )
+            last = bisect.bisect_left(timestamps, self.end - offset_seconds)
+            last = min(last, first + self.limit)
+            run_times[name] = [
+                run_time + offset for run_time in schedule[first:last]
+            ]
+        return run_times
+
+
+def preview_jobs(jobs, start_time, end_time, limit=MAX_PREVIEW_RUNS):
+    """Return a dict of job name to the run times of each enabled job
+    after start_time and before end_time.
+    """
+    preview = SchedulePreview(start_time, end_time, limit)
+    for job in jobs:
+        if job.enabled:
+            preview.add(job)
+    return preview.get_run_times()
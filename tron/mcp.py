@@ -1,18 +1,33 @@
+import collections
 import logging
 
+from twisted.internet import reactor
+
 from tron import actioncommand
 from tron import command_context
+from tron import metrics
 from tron import node
 from tron.config import manager
+from tron.config.config_utils import fingerprint
+from tron.core.admission import AdmissionController
+from tron.core.catch_up import CatchUpPolicy
+from tron.core.concurrency_forecast import ConcurrencyForecast
 from tron.core.job import Job
 from tron.core.job_collection import JobCollection
 from tron.core.job_scheduler import JobSchedulerFactory
+from tron.core.schedule_planner import SchedulePlanner
 from tron.eventbus import EventBus
 from tron.mesos import MesosClusterRepository
+from tron.serialize import filehandler
 from tron.serialize.runstate import statemanager
+from tron.utils import timeutils
 
 log = logging.getLogger(__name__)
 
+# Number of jobs restored in each reactor iteration during a progressive
+# restore
+RESTORE_BATCH_SIZE = 20
+
 
 def apply_master_configuration(mapping, master_config):
     def get_config_value(seq):
@@ -30,19 +45,36 @@ class MasterControlProgram(object):
         super(MasterControlProgram, self).__init__()
         self.jobs = JobCollection()
         self.working_dir = working_dir
-        self.config = manager.ConfigManager(config_path)
+        # The initial config is validated before the API starts, so it can
+        # use a pool of processes. See initial_setup.
+        self.config = manager.ConfigManager(
+            config_path,
+            validation_processes=None,
+        )
         self.context = command_context.CommandContext()
         self.state_watcher = statemanager.StateChangeWatcher()
+        self.schedule_planner = SchedulePlanner()
+        self.concurrency_forecast = ConcurrencyForecast()
+        self.namespace_fingerprints = {}
+        # Queue of (job name, state data) waiting for a progressive restore
+        self.restore_queue = None
+        self.restore_action_runner = None
+        self.restore_total = 0
+        self.restore_started = None
         log.info('initialized')
 
     def shutdown(self):
         EventBus.shutdown()
+        file_handle_manager = filehandler.FileHandleManager.get_instance()
+        file_handle_manager.flush()
+        file_handle_manager.stop()
         self.state_watcher.shutdown()
 
     def reconfigure(self):
         """Reconfigure MCP while Tron is already running."""
         log.info("reconfigured")
         try:
+            self.finish_restore()
             self._load_config(reconfigure=True)
         except Exception as e:
             log.exception(
@@ -55,16 +87,26 @@ class MasterControlProgram(object):
         with self.state_watcher.disabled():
             self.apply_config(self.config.load(), reconfigure=reconfigure)
 
-    def initial_setup(self):
+    def initial_setup(self, progressive=False):
         """When the MCP is initialized the config is applied before the state.
         In this case jobs shouldn't be scheduled until the state is applied.
+
+        If progressive is True, jobs are restored in small batches from the
+        reactor, so that the API can serve requests while trond starts. The
+        config is still loaded, and the state read from the store, before
+        this returns.
         """
         self._load_config()
-        self.restore_state(
-            actioncommand.create_action_runner_factory_from_config(
-                self.config.load().get_master().action_runner
-            )
+        # Later loads run while API threads validate uploads
+        self.config.validation_processes = 1
+        action_runner = actioncommand.create_action_runner_factory_from_config(
+            self.config.load().get_master().action_runner
         )
+        if progressive:
+            self.start_progressive_restore(action_runner)
+            return
+
+        self.restore_state(action_runner)
         # Any job with existing state would have been scheduled already. Jobs
         # without any state will be scheduled here.
         self.jobs.run_queue_schedule()
@@ -80,7 +122,14 @@ class MasterControlProgram(object):
                 'ssh_options',
             ),
             (MesosClusterRepository.configure, 'mesos_options'),
+            (
+                AdmissionController.configure,
+                'admission_control',
+                'node_pools',
+            ),
             (self.configure_eventbus, 'eventbus_enabled'),
+            (self.configure_schedule_planner, 'schedule_spreading'),
+            (CatchUpPolicy.configure, 'catch_up'),
         ]
         master_config = config_container.get_master()
         apply_master_configuration(master_config_directives, master_config)
@@ -88,31 +137,85 @@ class MasterControlProgram(object):
         self.state_watcher.watch(MesosClusterRepository)
 
         # TODO: unify NOTIFY_STATE_CHANGE and simplify this
-        factory = self.build_job_scheduler_factory(master_config)
-        self.apply_collection_config(
-            config_container.get_jobs(),
+        job_configs = config_container.get_jobs()
+        factory = self.build_job_scheduler_factory(master_config, job_configs)
+        namespace_fingerprints = self.get_namespace_fingerprints(
+            config_container,
+            factory,
+        )
+        unchanged = self.get_unchanged_job_names(
+            config_container,
+            namespace_fingerprints,
+        )
+        new_jobs = self.apply_collection_config(
+            job_configs,
             self.jobs,
             Job.NOTIFY_STATE_CHANGE,
             factory,
             reconfigure,
+            unchanged,
         )
+        self.namespace_fingerprints = namespace_fingerprints
+        AdmissionController.get_instance().update_job_priorities(job_configs)
+        self.concurrency_forecast.configure(new_jobs, self.jobs.get_names())
 
     def apply_collection_config(self, config, collection, notify_type, *args):
-        items = collection.load_from_config(config, *args)
+        """Apply a config to a collection, watch the items it added, and
+        return them.
+        """
+        items = list(collection.load_from_config(config, *args))
         self.state_watcher.watch_all(items, notify_type)
+        return items
+
+    def get_namespace_fingerprints(self, config_container, factory):
+        return {
+            namespace: factory.get_namespace_fingerprint(config.jobs)
+            for namespace, config in config_container.items()
+        }
+
+    def get_unchanged_job_names(
+        self,
+        config_container,
+        namespace_fingerprints,
+    ):
+        """Return the names of jobs in namespaces whose jobs have not changed
+        since the last time a configuration was applied.
+        """
+        unchanged = set()
+        for namespace, config in config_container.items():
+            current = self.namespace_fingerprints.get(namespace)
+            if current == namespace_fingerprints[namespace]:
+                unchanged.update(config.jobs)
+        return unchanged
 
-    def build_job_scheduler_factory(self, master_config):
+    def build_job_scheduler_factory(self, master_config, job_configs):
         output_stream_dir = master_config.output_stream_dir or self.working_dir
         action_runner = actioncommand.create_action_runner_factory_from_config(
             master_config.action_runner,
         )
+        schedule_offsets = self.schedule_planner.plan_from_config(
+            job_configs,
+            master_config.time_zone,
+        )
+        # Nodes and node pools are updated in place, so jobs only depend on
+        # the names of their pools, which are part of their own config
+        environment = fingerprint(
+            output_stream_dir,
+            master_config.time_zone,
+            master_config.action_runner,
+        )
         return JobSchedulerFactory(
             self.context,
             output_stream_dir,
             master_config.time_zone,
             action_runner,
+            schedule_offsets,
+            environment,
         )
 
+    def configure_schedule_planner(self, spreading_config):
+        self.schedule_planner.configure(spreading_config)
+
     def update_state_watcher_config(self, state_config):
         """Update the StateChangeWatcher, and save all state if the state config
         changed.
@@ -147,6 +250,94 @@ class MasterControlProgram(object):
         MesosClusterRepository.restore_state(states.get('mesos_state', {}))
 
         self.jobs.restore_state(states.get('job_state', {}), action_runner)
+        for job in self.jobs.get_jobs():
+            self.concurrency_forecast.update_durations(job)
+        self.state_watcher.save_metadata()
+
+    @property
+    def is_restoring(self):
+        return self.restore_queue is not None
+
+    def get_restore_progress(self):
+        remaining = len(self.restore_queue) if self.is_restoring else 0
+        return {
+            'restoring': self.is_restoring,
+            'total': self.restore_total,
+            'restored': self.restore_total - remaining,
+        }
+
+    def start_progressive_restore(self, action_runner):
+        """Restore the persisted state of jobs from the reactor in order of
+        their next run, so that the jobs which need to run soonest are
+        scheduled first. Jobs are marked as not restored until their state is
+        applied.
+        """
+        log.info('restoring progressively')
+        self.restore_started = timeutils.current_timestamp()
+        states = self.state_watcher.restore(self.jobs.get_names())
+        MesosClusterRepository.restore_state(states.get('mesos_state', {}))
+
+        job_states = states.get('job_state', {})
+        names = self.jobs.get_restore_order(job_states)
+        for name in names:
+            self.jobs.get_by_name(name).get_job().restored = False
+
+        self.restore_queue = collections.deque(
+            (name, job_states.get(name)) for name in names
+        )
+        self.restore_action_runner = action_runner
+        self.restore_total = len(names)
+        reactor.callLater(0, self._restore_next_batch)
+
+    def _restore_next_batch(self):
+        if not self.is_restoring:
+            return
+
+        for _ in range(RESTORE_BATCH_SIZE):
+            if not self.restore_queue:
+                break
+            name, job_state = self.restore_queue.popleft()
+            try:
+                self._restore_job(name, job_state)
+            except Exception as e:
+                log.exception(f"Failed to restore {name}: {e}")
+
+        if self.restore_queue:
+            reactor.callLater(0, self._restore_next_batch)
+        else:
+            self._complete_restore()
+
+    def _restore_job(self, name, job_state):
+        job_scheduler = self.jobs.get_by_name(name)
+        if not job_scheduler:
+            return
+        try:
+            if job_state:
+                job_scheduler.restore_state(
+                    job_state,
+                    self.restore_action_runner,
+                )
+                self.concurrency_forecast.update_durations(
+                    job_scheduler.get_job(),
+                )
+            job_scheduler.run_queue_schedule()
+        finally:
+            job_scheduler.get_job().restored = True
+
+    def finish_restore(self):
+        """Restore all remaining jobs immediately."""
+        if not self.is_restoring:
+            return
+        while self.restore_queue:
+            self._restore_job(*self.restore_queue.popleft())
+        self._complete_restore()
+
+    def _complete_restore(self):
+        duration = timeutils.current_timestamp() - self.restore_started
+        log.info(f"Restored {self.restore_total} jobs in {duration:.2f}s")
+        metrics.timer('mcp.restore', duration)
+        self.restore_queue = None
+        self.restore_action_runner = None
         self.state_watcher.save_metadata()
 
     def __str__(self):
@@ -0,0 +1,127 @@
+"""
+In-process metrics for the Tron daemon. Metrics are created on first use and
+are exposed through the /api/metrics endpoint.
+"""
+import collections
+import logging
+
+log = logging.getLogger(__name__)
+
+# Number of recent samples kept by histograms for percentile calculations
+RESERVOIR_SIZE = 1028
+
+all_metrics = {}
+
+
+class Counter(object):
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def get_repr(self):
+        return {'count': self.value}
+
+
+class Gauge(object):
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def get_repr(self):
+        return {'value': self.value}
+
+
+class Histogram(object):
+    """Track count, sum, min and max of all samples, and percentiles over
+    the most recent RESERVOIR_SIZE samples.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.samples = collections.deque(maxlen=RESERVOIR_SIZE)
+
+    def update(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def get_repr(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+metric_types = {
+    'counter': Counter,
+    'gauge': Gauge,
+    'histogram': Histogram,
+    'timer': Histogram,
+}
+
+
+def get_metric(metric_type, name):
+    """Return the metric for name, creating it if it does not exist."""
+    key = (metric_type, name)
+    if key not in all_metrics:
+        all_metrics[key] = metric_types[metric_type]()
+    return all_metrics[key]
+
+
+def count(name, inc=1):
+    get_metric('counter', name).inc(inc)
+
+
+def gauge(name, value):
+    get_metric('gauge', name).set(value)
+
+
+def histogram(name, value):
+    get_metric('histogram', name).update(value)
+
+
+def timer(name, seconds):
+    """Record a duration in seconds."""
+    get_metric('timer', name).update(seconds)
+
+
+def view_all_metrics():
+    """Return a dict of metric type to a list of metric representations."""
+    all_data = collections.defaultdict(list)
+    for (metric_type, name), metric in sorted(all_metrics.items()):
+        data = metric.get_repr()
+        data['name'] = name
+        all_data[metric_type].append(data)
+    return dict(all_data)
+
+
+def clear():
+    all_metrics.clear()
@@ -1,17 +1,28 @@
+import hashlib
+import hmac
 import itertools
 import logging
+import os
 import random
+from collections import deque
 
 import six
+from twisted.conch.client.knownhosts import HashedEntry
 from twisted.conch.client.knownhosts import KnownHostsFile
+from twisted.conch.client.knownhosts import PlainEntry
+from twisted.conch.client.knownhosts import UnparsedEntry
 from twisted.internet import defer
 from twisted.internet import protocol
 from twisted.internet import reactor
 from twisted.python import failure
 from twisted.python.filepath import FilePath
 
+from tron import metrics
 from tron import ssh
+from tron.config.config_utils import fingerprint
+from tron.config.schema import NodeSelectionTypes
 from tron.utils import collections
+from tron.utils import timeutils
 from tron.utils import twistedutils
 
 log = logging.getLogger(__name__)
@@ -35,6 +46,16 @@ RUN_STATE_RUNNING = 10
 RUN_STATE_COMPLETE = 100
 
 
+def get_mtime(path):
+    """Return the modification time of path, or None if it does not exist."""
+    if not path:
+        return None
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
 class Error(Exception):
     pass
 
@@ -64,6 +85,8 @@ class NodePoolRepository(object):
         super(NodePoolRepository, self).__init__()
         self.nodes = collections.MappingCollection('nodes')
         self.pools = collections.MappingCollection('pools')
+        self.start_bucket = None
+        self.config_fingerprint = None
 
     @classmethod
     def get_instance(cls):
@@ -80,9 +103,20 @@ class NodePoolRepository(object):
     @classmethod
     def update_from_config(cls, node_configs, node_pool_configs, ssh_config):
         instance = cls.get_instance()
+        config_fingerprint = fingerprint(
+            node_configs,
+            node_pool_configs,
+            ssh_config,
+            get_mtime(ssh_config.known_hosts_file),
+        )
+        if config_fingerprint == instance.config_fingerprint:
+            log.info("Node configuration unchanged")
+            return
+
         ssh_options = ssh.SSHAuthOptions.from_config(ssh_config)
         known_hosts = KnownHosts.from_path(ssh_config.known_hosts_file)
         instance.filter_by_name(node_configs, node_pool_configs)
+        instance._update_start_bucket(ssh_config)
         instance._update_nodes(
             node_configs,
             ssh_options,
@@ -90,6 +124,17 @@ class NodePoolRepository(object):
             ssh_config,
         )
         instance._update_node_pools(node_pool_configs)
+        instance.config_fingerprint = config_fingerprint
+
+    def _update_start_bucket(self, ssh_config):
+        """Build the global start rate limit, keeping the current bucket if
+        the limit is unchanged.
+        """
+        rate = ssh_config.start_rate_global
+        burst = ssh_config.start_burst_global
+        if self.start_bucket and self.start_bucket.matches(rate, burst):
+            return
+        self.start_bucket = TokenBucket.from_rate(rate, burst)
 
     def _update_nodes(
         self,
@@ -100,14 +145,23 @@ class NodePoolRepository(object):
     ):
         for config in six.itervalues(node_configs):
             pub_key = known_hosts.get_public_key(config.hostname)
+            node = self.nodes.get(config.name)
+            if node:
+                # Keep the Node, and its connections and runs
+                node.update(config, ssh_options, pub_key, ssh_config)
+                continue
             node = Node.from_config(config, ssh_options, pub_key, ssh_config)
             self.add_node(node)
 
     def _update_node_pools(self, node_pool_configs):
         for config in six.itervalues(node_pool_configs):
             nodes = self._get_nodes_by_name(config.nodes)
-            pool = NodePool.from_config(config, nodes)
-            self.pools.replace(pool)
+            pool = self.pools.get(config.name)
+            if pool:
+                # Keep the NodePool, and its selection state
+                pool.update(nodes, config.selection, config.weights)
+                continue
+            self.pools.replace(NodePool.from_config(config, nodes))
 
     def add_node(self, node):
         self.nodes.replace(node)
@@ -128,27 +182,69 @@ class NodePoolRepository(object):
     def clear(self):
         self.nodes.clear()
         self.pools.clear()
+        self.config_fingerprint = None
 
 
 class NodePool(object):
-    """A pool of Node objects."""
+    """A pool of Node objects. `next` selects a node for a new run using the
+    pool's selection strategy:
+
+        random                  a random node
+        round_robin             each node in turn
+        least_outstanding       the node with the fewest runs, ties are broken
+                                randomly
+        weighted_round_robin    each node in turn, in proportion to its weight
+        power_of_two            the node with fewer runs of two random nodes
+
+    Nodes which are down, see NodeHealth, are skipped unless every node of
+    the pool is down.
+    """
 
-    def __init__(self, nodes, name):
+    def __init__(self, nodes, name, selection=None, weights=None):
         self.nodes = nodes
         self.disabled = False
         self.name = name or '_'.join(n.get_name() for n in nodes)
+        self.selection = selection or NodeSelectionTypes.random
+        self.weights = weights or {}
         self.iter = itertools.cycle(self.nodes)
+        # Node name -> current weight, for weighted_round_robin
+        self.current_weights = {}
 
     @classmethod
     def from_config(cls, node_pool_config, nodes):
-        return cls(nodes, node_pool_config.name)
+        return cls(
+            nodes,
+            node_pool_config.name,
+            node_pool_config.selection,
+            node_pool_config.weights,
+        )
 
     @classmethod
     def from_node(cls, node):
         return cls([node], node.get_name())
 
+    def update(self, nodes, selection=None, weights=None):
+        """Apply a new configuration in place. The round robin position is
+        kept if the nodes are unchanged, and the current weights of nodes
+        which are still in the pool are kept.
+        """
+        if nodes != self.nodes:
+            self.iter = itertools.cycle(nodes)
+        self.nodes = nodes
+        self.selection = selection or NodeSelectionTypes.random
+        self.weights = weights or {}
+        names = {node.get_name() for node in nodes}
+        self.current_weights = {
+            name: weight
+            for name, weight in self.current_weights.items() if name in names
+        }
+
     def __eq__(self, other):
-        return isinstance(other, NodePool) and self.nodes == other.nodes
+        return (
+            isinstance(other, NodePool) and self.nodes == other.nodes and
+            self.selection == other.selection and
+            self.weights == other.weights
+        )
 
     def __ne__(self, other):
         return not self == other
@@ -160,12 +256,61 @@ class NodePool(object):
         return self.nodes
 
     def next(self):
+        """Return a node for a new run, chosen by the selection strategy."""
+        nodes = [node for node in self.nodes if node.is_available()]
+        nodes = nodes or self.nodes
+        if len(nodes) == 1:
+            return nodes[0]
+        return getattr(self, 'next_%s' % self.selection)(nodes)
+
+    def next_random(self, nodes):
         """Return a random node from the pool."""
-        return random.choice(self.nodes)
+        return random.choice(nodes)
 
-    def next_round_robin(self):
+    def next_round_robin(self, nodes):
         """Return the next node cycling in a consistent order."""
-        return next(self.iter)
+        for _ in range(len(self.nodes)):
+            node = next(self.iter)
+            if node in nodes:
+                return node
+        return nodes[0]
+
+    def next_least_outstanding(self, nodes):
+        """Return the node with the fewest runs."""
+        counts = [node.get_run_count() for node in nodes]
+        fewest = min(counts)
+        return random.choice([
+            node for node, count in zip(nodes, counts) if count == fewest
+        ])
+
+    def next_weighted_round_robin(self, nodes):
+        """Return nodes in turn, each in proportion to its weight, spread
+        evenly through the cycle.
+        """
+        total = 0
+        for node in nodes:
+            name = node.get_name()
+            weight = self.weights.get(name, 1)
+            current = self.current_weights.get(name, 0)
+            self.current_weights[name] = current + weight
+            total += weight
+        selected = max(
+            nodes,
+            key=lambda node: self.current_weights[node.get_name()],
+        )
+        self.current_weights[selected.get_name()] -= total
+        return selected
+
+    def next_power_of_two(self, nodes):
+        """Return the node with fewer runs of two random nodes."""
+        first, second = random.sample(nodes, 2)
+        if second.get_run_count() < first.get_run_count():
+            return second
+        return first
+
+    def get_run_counts(self):
+        """Return a dict of node name to its number of runs."""
+        return {node.get_name(): node.get_run_count() for node in self.nodes}
 
     def disable(self):
         """Required for MappingCollection.Item interface."""
@@ -181,19 +326,89 @@ class NodePool(object):
 
 
 class KnownHosts(KnownHostsFile):
-    """Lookup host key for a hostname."""
+    """Lookup host key for a hostname.
+
+    The file is parsed once, on the first lookup, into an index of plain
+    hostnames and of hashed entries grouped by salt. A hostname is matched
+    against a hashed entry by computing one HMAC per distinct salt. When
+    several entries match, the first in the file wins, as in ssh.
+    """
+
+    # path -> (mtime, KnownHosts), shared between reconfigures
+    _cache = {}
+
+    def __init__(self, savePath):
+        super(KnownHosts, self).__init__(savePath)
+        # hostname -> (position, key) of plain entries
+        self._hosts = None
+        # salt -> {hash: (position, key)} of hashed entries
+        self._hashed = None
+        # (position, entry) of other entries, which are scanned
+        self._others = None
+        # hostname -> key, or None, of previous lookups
+        self._found = {}
 
     @classmethod
     def from_path(cls, file_path):
+        """Return the KnownHosts for file_path, reusing the one from an
+        earlier call if the file has not changed since.
+        """
         if not file_path:
             return cls(None)
-        return cls.fromPath(FilePath(file_path))
+        mtime = get_mtime(file_path)
+        cached = cls._cache.get(file_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        known_hosts = cls.fromPath(FilePath(file_path))
+        cls._cache[file_path] = mtime, known_hosts
+        return known_hosts
+
+    def _build_index(self):
+        self._hosts, self._hashed, self._others = {}, {}, []
+        for position, entry in enumerate(self.iterentries()):
+            if isinstance(entry, PlainEntry):
+                for hostname in entry._hostnames:
+                    self._hosts.setdefault(
+                        hostname,
+                        (position, entry.publicKey),
+                    )
+            elif isinstance(entry, HashedEntry):
+                hashes = self._hashed.setdefault(entry._hostSalt, {})
+                hashes.setdefault(
+                    entry._hostHash,
+                    (position, entry.publicKey),
+                )
+            elif not isinstance(entry, UnparsedEntry):
+                self._others.append((position, entry))
+
+    def _lookup(self, hostname):
+        if self._hosts is None:
+            self._build_index()
+
+        host = hostname.encode('utf-8')
+        matches = []
+        if host in self._hosts:
+            matches.append(self._hosts[host])
+        for salt, hashes in six.iteritems(self._hashed):
+            host_hash = hmac.new(salt, host, hashlib.sha1).digest()
+            if host_hash in hashes:
+                matches.append(hashes[host_hash])
+        for position, entry in self._others:
+            if entry.matchesHost(hostname):
+                matches.append((position, entry.publicKey))
+                break
+
+        if not matches:
+            return None
+        return min(matches, key=lambda match: match[0])[1]
 
     def get_public_key(self, hostname):
-        for entry in self.iterentries():
-            if entry.matchesHost(hostname):
-                return entry.publicKey
-        log.warning("Missing host key for: %s", hostname)
+        if hostname not in self._found:
+            self._found[hostname] = self._lookup(hostname)
+        public_key = self._found[hostname]
+        if public_key is None:
+            log.warning("Missing host key for: %s", hostname)
+        return public_key
 
 
 class RunState(object):
@@ -202,6 +417,10 @@ class RunState(object):
         self.state = RUN_STATE_CONNECTING
         self.deferred = defer.Deferred()
         self.channel = None
+        # The PooledConnection this run is assigned to
+        self.connection = None
+        # When the run was first assigned a connection, in reactor seconds
+        self.assigned_at = None
 
     def __repr__(self):
         return "RunState(run: %r, state: %r, channel: %r)" % (
@@ -211,6 +430,239 @@ class RunState(object):
         )
 
 
+class NodeHealth(object):
+    """Circuit breaker for the connections to a node.
+
+    A node is up until `threshold` connection attempts in a row fail. It is
+    then down, and runs on it fail without trying to connect, until a probe
+    connection succeeds. A probe is attempted `timeout` seconds after the
+    node went down, or after the previous probe failed.
+    """
+
+    UP = 'up'
+    DOWN = 'down'
+    PROBING = 'probing'
+
+    def __init__(self):
+        self.state = self.UP
+        self.consecutive_failures = 0
+        self.last_failure = None
+        self.last_error = None
+        self.down_since = None
+
+    @property
+    def is_down(self):
+        return self.state == self.DOWN
+
+    def record_success(self):
+        """Record a successful connection. Returns True if the node was
+        restored.
+        """
+        restored = self.state != self.UP
+        self.state = self.UP
+        self.consecutive_failures = 0
+        self.down_since = None
+        return restored
+
+    def record_failure(self, error, threshold):
+        """Record a failed connection. Returns True if the node went down."""
+        self.consecutive_failures += 1
+        self.last_failure = timeutils.current_time()
+        self.last_error = str(error)
+        if self.state == self.PROBING or (
+            self.state == self.UP and threshold and
+            self.consecutive_failures >= threshold
+        ):
+            self.state = self.DOWN
+            self.down_since = self.down_since or self.last_failure
+            return True
+        return False
+
+    def probe(self):
+        self.state = self.PROBING
+
+    def get_state(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'last_failure': self.last_failure,
+            'last_error': self.last_error,
+            'down_since': self.down_since,
+        }
+
+
+class PooledConnection(object):
+    """An SSH connection of a Node, and the ids of the runs assigned to it."""
+
+    def __init__(self):
+        # The ssh.ClientConnection, once its service has started
+        self.connection = None
+        # Fires when the connection is ready, while connecting
+        self.connect_defer = None
+        self.run_ids = set()
+        self.idle_timer = None
+        # Keep the connection open until this time, in reactor seconds
+        self.keep_until = 0
+        self.keepalive_timer = None
+        # Keepalives sent since the last reply
+        self.missed_keepalives = 0
+        # False once the connection stopped answering keepalives
+        self.healthy = True
+        # True once the node was reconfigured to a different host or
+        # credentials. The connection gets no new runs.
+        self.retired = False
+
+    @property
+    def is_connected(self):
+        return self.connection is not None
+
+    @property
+    def is_healthy(self):
+        return self.is_connected and self.healthy
+
+    @property
+    def is_usable(self):
+        return self.is_healthy and not self.retired
+
+    def cancel_idle_timer(self):
+        if self.idle_timer and self.idle_timer.active():
+            self.idle_timer.cancel()
+        self.idle_timer = None
+
+    def cancel_keepalive_timer(self):
+        if self.keepalive_timer and self.keepalive_timer.active():
+            self.keepalive_timer.cancel()
+        self.keepalive_timer = None
+
+    def __repr__(self):
+        return "PooledConnection(connected: %r, runs: %d)" % (
+            self.is_connected,
+            len(self.run_ids),
+        )
+
+
+class ConnectionPool(object):
+    """The SSH connections of a Node. Each connection carries at most
+    max_channels_per_connection runs, and another connection is opened when
+    they are all full. Runs are assigned to the busiest connection with room,
+    so extra connections become idle and are closed after
+    idle_connection_timeout.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.connections = []
+
+    @property
+    def max_channels(self):
+        return self.node.node_settings.max_channels_per_connection
+
+    def has_room(self, pooled):
+        return not self.max_channels or len(pooled.run_ids) < self.max_channels
+
+    def get_connected(self):
+        """Return the busiest healthy connection with room, or None."""
+        connected = [
+            pooled for pooled in self.connections
+            if pooled.is_usable and self.has_room(pooled)
+        ]
+        return max(
+            connected,
+            key=lambda pooled: len(pooled.run_ids),
+            default=None,
+        )
+
+    def get_connection(self):
+        """Return a connection with room for another run. Prefers connected
+        connections, then those still connecting, and adds a new connection
+        if none have room.
+        """
+        pooled = self.get_connected()
+        if pooled:
+            return pooled
+
+        connecting = [
+            pooled for pooled in self.connections
+            if pooled.connect_defer and not pooled.retired and
+            self.has_room(pooled)
+        ]
+        if connecting:
+            return max(connecting, key=lambda pooled: len(pooled.run_ids))
+
+        pooled = PooledConnection()
+        self.connections.append(pooled)
+        self.update_metrics()
+        return pooled
+
+    def add_run(self, pooled, run_id):
+        pooled.cancel_idle_timer()
+        pooled.run_ids.add(run_id)
+
+    def remove_run(self, pooled, run_id):
+        """Remove a run from a connection, and close the connection after
+        idle_connection_timeout if it has no other runs.
+        """
+        pooled.run_ids.discard(run_id)
+        if pooled.run_ids or not pooled.is_connected or pooled.idle_timer:
+            return
+        self.schedule_close(pooled)
+
+    def schedule_close(self, pooled):
+        if pooled.retired:
+            delay = 0
+        else:
+            delay = max(
+                self.node.node_settings.idle_connection_timeout,
+                pooled.keep_until - reactor.seconds(),
+            )
+        pooled.idle_timer = reactor.callLater(delay, self.close_idle, pooled)
+
+    def retire(self):
+        """Stop assigning runs to the current connections. Each connection
+        is closed once its runs are done.
+        """
+        for pooled in self.connections:
+            pooled.retired = True
+            if pooled.is_connected and not pooled.run_ids:
+                pooled.cancel_idle_timer()
+                self.schedule_close(pooled)
+
+    def keep_open(self, pooled, seconds):
+        """Keep a connection open for at least `seconds`, even if it is idle.
+        """
+        pooled.keep_until = max(pooled.keep_until, reactor.seconds() + seconds)
+        if pooled.idle_timer:
+            pooled.cancel_idle_timer()
+            self.schedule_close(pooled)
+
+    def close_idle(self, pooled):
+        pooled.idle_timer = None
+        if pooled.run_ids or not pooled.is_connected:
+            return
+        if pooled.retired:
+            log.info("Closing retired connection to %s", self.node.hostname)
+        else:
+            log.info(
+                "Connection to %s idle for %d secs. Closing.",
+                self.node.hostname,
+                self.node.node_settings.idle_connection_timeout,
+            )
+        pooled.connection.transport.loseConnection()
+
+    def remove(self, pooled):
+        pooled.cancel_idle_timer()
+        pooled.cancel_keepalive_timer()
+        if pooled in self.connections:
+            self.connections.remove(pooled)
+        self.update_metrics()
+
+    def update_metrics(self):
+        metrics.gauge(
+            f'node.connections.{self.node.get_name()}',
+            len(self.connections),
+        )
+
+
 def determine_jitter(count, node_settings):
     """Return a pseudo-random number of seconds to delay a run."""
     count *= node_settings.jitter_load_factor
@@ -220,6 +672,48 @@ def determine_jitter(count, node_settings):
     return random.random() * float(max_jitter)
 
 
+class TokenBucket(object):
+    """Allow `rate` events per second on average, and bursts of up to
+    `burst` events. Times are in seconds, as returned by reactor.seconds().
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = burst or 1
+        self.tokens = float(self.burst)
+        self.last_refill = None
+
+    @classmethod
+    def from_rate(cls, rate, burst):
+        """Return a TokenBucket, or None if rate limiting is disabled."""
+        if not rate:
+            return None
+        return cls(rate, burst)
+
+    def matches(self, rate, burst):
+        return bool(rate) and self.rate == rate and self.burst == (burst or 1)
+
+    def _refill(self, now):
+        if self.last_refill is not None:
+            elapsed = max(0.0, now - self.last_refill)
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def get_delay(self, now):
+        """Return the number of seconds until a token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        """Take a token if one is available. Returns True on success."""
+        if self.get_delay(now):
+            return False
+        self.tokens -= 1
+        return True
+
+
 class Node(object):
     """A node is tron's interface to communicating with an actual machine.
     """
@@ -231,20 +725,23 @@ class Node(object):
         # SSH Options
         self.conch_options = ssh_options
 
-        # The SSH connection we use to open channels on. If present, means we
-        # are connected.
-        self.connection = None
-
-        # If present, means we are trying to connect
-        self.connection_defer = None
+        # The SSH connections we open channels on
+        self.pool = ConnectionPool(self)
 
         # Map of run id to instance of RunState
         self.run_states = {}
 
-        self.idle_timer = None
+        self.health = NodeHealth()
+        self.probe_timer = None
+
         self.disabled = False
         self.pub_key = pub_key
 
+        # Runs waiting for the start rate limit, as (run, time queued)
+        self.start_queue = deque()
+        self.start_timer = None
+        self._start_bucket = None
+
     @property
     def hostname(self):
         return self.config.hostname
@@ -261,14 +758,81 @@ class Node(object):
     def from_config(cls, node_config, ssh_options, pub_key, node_settings):
         return cls(node_config, ssh_options, pub_key, node_settings)
 
+    def update(self, config, ssh_options, pub_key, node_settings):
+        """Apply a new configuration in place, keeping open connections and
+        runs. If the host or credentials changed, the current connections
+        finish their runs but get no new ones, and runs waiting to connect
+        move to a new connection, and a node which was down is up again.
+        """
+        reconnect = (
+            self.config != config or
+            self.conch_options != ssh_options or
+            self.pub_key != pub_key
+        )
+        if (
+            self.node_settings.start_rate_per_node !=
+            node_settings.start_rate_per_node or
+            self.node_settings.start_burst_per_node !=
+            node_settings.start_burst_per_node
+        ):
+            self._start_bucket = None
+
+        self.config = config
+        self.conch_options = ssh_options
+        self.pub_key = pub_key
+        self.node_settings = node_settings
+        if not reconnect:
+            log.info("Updated %s in place", self)
+            return
+
+        log.info("Updated %s, retiring its connections", self)
+        self._cancel_probe()
+        self.health = NodeHealth()
+        self.pool.retire()
+        for run_state in list(self.run_states.values()):
+            if run_state.state != RUN_STATE_CONNECTING:
+                continue
+            if not run_state.connection or run_state.connection.is_connected:
+                continue
+            self.pool.remove_run(run_state.connection, run_state.run.id)
+            self._assign_connection(run_state.run)
+
+    @property
+    def start_bucket(self):
+        """The per node start rate limit, or None if it is disabled."""
+        if self._start_bucket is None:
+            self._start_bucket = TokenBucket.from_rate(
+                self.node_settings.start_rate_per_node,
+                self.node_settings.start_burst_per_node,
+            )
+        return self._start_bucket
+
+    def get_start_buckets(self):
+        global_bucket = NodePoolRepository.get_instance().start_bucket
+        return [b for b in (self.start_bucket, global_bucket) if b]
+
     def get_name(self):
         return self.config.name
 
     name = property(get_name)
 
+    def is_available(self):
+        """Return False while the node is down."""
+        return not self.health.is_down
+
+    def get_health(self):
+        return self.health.get_state()
+
+    def get_run_count(self):
+        """Return the number of runs started on this node which have not
+        finished.
+        """
+        return len(self.run_states)
+
     def disable(self):
         """Required for MappingCollection.Item interface."""
         self.disabled = True
+        self._cancel_probe()
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -314,11 +878,12 @@ class Node(object):
                 self.run_states[run.id],
             )
 
-        if self.idle_timer and self.idle_timer.active():
-            self.idle_timer.cancel()
-
         self.run_states[run.id] = RunState(run)
 
+        if self.get_start_buckets():
+            self._queue_start(run)
+            return self.run_states[run.id].deferred
+
         # TODO: have this return a runner instead of number
         fudge_factor = determine_jitter(
             len(self.run_states),
@@ -343,38 +908,294 @@ class Node(object):
         exc = failure.Failure(exc_value=ResultError("Run stopped"))
         self._fail_run(command, exc)
 
+    def _queue_start(self, run):
+        """Start the run when the start rate limits allow it. Runs are
+        started in the order they were queued.
+        """
+        if self.start_queue or self._get_start_delay():
+            log.info("Start of %s on %s is rate limited", run.id, self.hostname)
+            metrics.count('node.start_rate.delayed')
+        self.start_queue.append((run, reactor.seconds()))
+        if self.start_timer is None:
+            self._drain_start_queue()
+
+    def _get_start_delay(self):
+        now = reactor.seconds()
+        return max(bucket.get_delay(now) for bucket in self.get_start_buckets())
+
+    def _drain_start_queue(self):
+        self.start_timer = None
+        while self.start_queue:
+            run, queued_at = self.start_queue[0]
+            if not self._is_run_id_tracked(run):
+                self.start_queue.popleft()
+                continue
+
+            buckets = self.get_start_buckets()
+            delay = self._get_start_delay() if buckets else 0
+            if delay:
+                self.start_timer = reactor.callLater(
+                    delay,
+                    self._drain_start_queue,
+                )
+                break
+
+            now = reactor.seconds()
+            for bucket in buckets:
+                bucket.consume(now)
+            self.start_queue.popleft()
+            metrics.timer('node.start_rate.wait', now - queued_at)
+            self._do_run(run)
+
+        metrics.gauge(
+            f'node.start_rate.queued.{self.get_name()}',
+            len(self.start_queue),
+        )
+
     def _do_run(self, run):
         """Finish starting to execute a run
 
         This step may have been delayed.
         """
+        if not self._is_run_id_tracked(run):
+            log.warning("Run %s no longer tracked (_do_run)", run.id)
+            return
+        if self.health.is_down:
+            log.debug("Not running %s, %s is down", run.id, self.hostname)
+            metrics.count('node.health.rejected')
+            self._fail_run(
+                run,
+                failure.Failure(
+                    exc_value=ConnectError(
+                        "%s is down after %d failed connections: %s" % (
+                            self.hostname,
+                            self.health.consecutive_failures,
+                            self.health.last_error,
+                        ),
+                    ),
+                ),
+            )
+            return
+        self._assign_connection(run)
 
-        # Now let's see if we need to start this off by establishing a
-        # connection or if we are already connected
-        if self.connection is None:
-            self._connect_then_run(run)
-        else:
+    def _assign_connection(self, run):
+        """Assign a run to a connection with room for it, and open its
+        channel once the connection is ready.
+        """
+        pooled = self.pool.get_connection()
+        self.pool.add_run(pooled, run.id)
+        run_state = self.run_states[run.id]
+        run_state.connection = pooled
+        if run_state.assigned_at is None:
+            run_state.assigned_at = reactor.seconds()
+        if pooled.is_connected:
+            metrics.count('node.connection.warm')
             self._open_channel(run)
+            return
 
-    def _cleanup(self, run):
-        # TODO: why set to None before deleting it?
-        self.run_states[run.id].channel = None
-        del self.run_states[run.id]
+        metrics.count('node.connection.cold')
+        if pooled.connect_defer is None:
+            self._start_connect(pooled)
 
-        if not self.run_states:
-            self.idle_timer = reactor.callLater(
-                self.node_settings.idle_connection_timeout,
-                self._connection_idle_timeout,
-            )
+    def _start_connect(self, pooled):
+        pooled.connect_defer = self._connect(pooled)
+        pooled.connect_defer.addCallbacks(
+            self._connection_ready,
+            self._connection_failed,
+            errbackArgs=(pooled, ),
+        )
+
+    def prewarm(self, seconds):
+        """Have a connection ready for a run which is due in `seconds`. The
+        connection is opened prewarm_seconds before the run is due.
+        """
+        lead = self.node_settings.prewarm_seconds
+        if not lead:
+            return
+        reactor.callLater(max(0, seconds - lead), self._prewarm, lead)
 
-    def _connection_idle_timeout(self):
-        if self.connection:
+    def _prewarm(self, seconds):
+        if self.disabled:
+            return
+        pooled = self.pool.get_connection()
+        self.pool.keep_open(pooled, seconds)
+        if not pooled.is_connected and pooled.connect_defer is None:
+            log.info("Pre-warming a connection to %s", self.hostname)
+            metrics.count('node.connection.prewarm')
+            self._start_connect(pooled)
+
+    def _get_run_states(self, pooled):
+        """Return the RunStates assigned to a connection, in the order the
+        runs were started.
+        """
+        return [
+            run_state for run_state in self.run_states.values()
+            if run_state.connection is pooled
+        ]
+
+    def _move_run(self, run_state, pooled):
+        """Move a run which is waiting to connect to a connected connection.
+        """
+        self.pool.remove_run(run_state.connection, run_state.run.id)
+        self.pool.add_run(pooled, run_state.run.id)
+        run_state.connection = pooled
+        self._open_channel(run_state.run)
+
+    def _fail_over_waiting_runs(self):
+        """Move runs waiting for a connection to finish connecting onto
+        connected connections which have room.
+        """
+        for run_state in list(self.run_states.values()):
+            if run_state.state != RUN_STATE_CONNECTING:
+                continue
+            if not run_state.connection or run_state.connection.is_connected:
+                continue
+            pooled = self.pool.get_connected()
+            if not pooled:
+                return
             log.info(
-                "Connection to %s idle for %d secs. Closing.",
+                "Moving %s to a connected connection to %s",
+                run_state.run.id,
                 self.hostname,
-                self.node_settings.idle_connection_timeout,
             )
-            self.connection.transport.loseConnection()
+            self._move_run(run_state, pooled)
+
+    def _connection_ready(self, pooled):
+        pooled.connect_defer = None
+        if self.health.record_success():
+            log.info("%s is up", self.hostname)
+            metrics.count('node.health.restored')
+        self._schedule_keepalive(pooled)
+        for run_state in self._get_run_states(pooled):
+            if run_state.state == RUN_STATE_CONNECTING:
+                self._open_channel(run_state.run)
+        if not pooled.run_ids:
+            self.pool.remove_run(pooled, None)
+        self._fail_over_waiting_runs()
+
+    def _schedule_keepalive(self, pooled):
+        interval = self.node_settings.keepalive_interval
+        if interval:
+            pooled.keepalive_timer = reactor.callLater(
+                interval,
+                self._send_keepalive,
+                pooled,
+            )
+
+    def _send_keepalive(self, pooled):
+        """Send a keepalive on a connection, or drop the connection if it did
+        not answer the last keepalive_count_max keepalives.
+        """
+        pooled.keepalive_timer = None
+        if not pooled.is_connected:
+            return
+        if pooled.missed_keepalives >= self.node_settings.keepalive_count_max:
+            self._connection_unhealthy(pooled)
+            return
+
+        pooled.missed_keepalives += 1
+        reply = pooled.connection.send_keepalive()
+        reply.addBoth(self._keepalive_reply, pooled)
+        self._schedule_keepalive(pooled)
+
+    def _keepalive_reply(self, _, pooled):
+        # Any reply, even a failure, means the server is alive
+        pooled.missed_keepalives = 0
+
+    def _connection_unhealthy(self, pooled):
+        """Stop using a connection which stopped answering keepalives, and
+        drop it. Runs waiting to start on it move to a new connection once
+        the service has stopped.
+        """
+        log.warning(
+            "Connection to %s missed %d keepalives, reconnecting",
+            self.hostname,
+            pooled.missed_keepalives,
+        )
+        metrics.count('node.connection.unhealthy')
+        pooled.healthy = False
+        pooled.connection.abort()
+
+    def _connection_failed(self, result, pooled):
+        pooled.connect_defer = None
+        self.pool.remove(pooled)
+        self._record_connect_failure(result)
+        for run_state in self._get_run_states(pooled):
+            run_id = run_state.run.id
+            connected = self.pool.get_connected()
+            if connected:
+                log.info(
+                    "Connecting to %s failed, moving %s to another "
+                    "connection",
+                    self.hostname,
+                    run_id,
+                )
+                self._move_run(run_state, connected)
+                continue
+
+            log.warning(
+                "Cannot run %s, Failed to connect to %s",
+                run_state.run,
+                self.hostname,
+            )
+            self._fail_run(
+                run_state.run,
+                failure.Failure(
+                    exc_value=ConnectError(
+                        "Connection to %s@%s:%d failed" % (
+                            self.username,
+                            self.hostname,
+                            self.port,
+                        ),
+                    ),
+                ),
+            )
+
+    def _record_connect_failure(self, result):
+        error = result.getErrorMessage() if result else None
+        if not self.health.record_failure(
+            error,
+            self.node_settings.circuit_breaker_threshold,
+        ):
+            return
+        log.warning(
+            "%s is down after %d failed connections, probing in %d secs",
+            self.hostname,
+            self.health.consecutive_failures,
+            self.node_settings.circuit_breaker_timeout,
+        )
+        metrics.count('node.health.down')
+        self._cancel_probe()
+        self.probe_timer = reactor.callLater(
+            self.node_settings.circuit_breaker_timeout,
+            self._probe,
+        )
+
+    def _cancel_probe(self):
+        if self.probe_timer and self.probe_timer.active():
+            self.probe_timer.cancel()
+        self.probe_timer = None
+
+    def _probe(self):
+        """Try to connect to a node which is down. Runs started while the
+        probe is connecting wait for it.
+        """
+        self.probe_timer = None
+        if self.disabled or not self.health.is_down:
+            return
+        log.info("Probing %s", self.hostname)
+        self.health.probe()
+        pooled = self.pool.get_connection()
+        if not pooled.is_connected and pooled.connect_defer is None:
+            self._start_connect(pooled)
+
+    def _cleanup(self, run):
+        run_state = self.run_states.pop(run.id)
+        # TODO: why set to None before deleting it?
+        run_state.channel = None
+        if run_state.connection:
+            self.pool.remove_run(run_state.connection, run.id)
+            self._fail_over_waiting_runs()
 
     def _fail_run(self, run, result):
         """Indicate the run has failed, and cleanup state"""
@@ -399,57 +1220,29 @@ class Node(object):
     def _is_run_id_tracked(self, run):
         return run.id in self.run_states and self.run_states[run.id].run is run
 
-    def _connect_then_run(self, run):
-        # Have we started the connection process ?
-        if self.connection_defer is None:
-            self.connection_defer = self._connect()
-
-        def call_open_channel(arg):
-            self._open_channel(run)
-            return arg
-
-        def connect_fail(result):
-            log.warning(
-                "Cannot run %s, Failed to connect to %s",
-                run,
-                self.hostname,
-            )
-            self.connection_defer = None
-            self._fail_run(
-                run,
-                failure.Failure(
-                    exc_value=ConnectError(
-                        "Connection to %s@%s:%d failed" % (
-                            self.username,
-                            self.hostname,
-                            self.port,
-                        ),
-                    ),
-                ),
-            )
-
-        self.connection_defer.addCallback(call_open_channel)
-        self.connection_defer.addErrback(connect_fail)
-
-    def _service_stopped(self, connection):
-        """Called when the SSH service has disconnected fully.
+    def _service_stopped(self, connection, pooled):
+        """Called when the SSH service of a connection has disconnected fully.
 
         We should be in a state where we know there are no runs in progress
-        because all the SSH channels should have disconnected them.
+        on this connection because all the SSH channels should have
+        disconnected them.
         """
-        if self.connection is not connection:
+        if pooled.connection is not connection:
             log.warning("Service stop has been called twice")
             return
-        self.connection = None
+        pooled.connection = None
+        self.pool.remove(pooled)
 
         log.info("Service to %s stopped", self.hostname)
 
-        for run_id, run in six.iteritems(self.run_states):
+        for run in self._get_run_states(pooled):
+            run_id = run.run.id
             if run.state == RUN_STATE_CONNECTING:
                 # Now we can trigger a reconnect and re-start any waiting runs.
-                self._connect_then_run(run)
+                pooled.run_ids.discard(run_id)
+                self._assign_connection(run.run)
             elif run.state == RUN_STATE_RUNNING:
-                self._fail_run(run, None)
+                self._fail_run(run.run, None)
             elif run.state == RUN_STATE_STARTING:
                 if run.channel and run.channel.start_defer is not None:
 
@@ -464,7 +1257,7 @@ class Node(object):
                         " start_defer is over.",
                         run_id,
                     )
-                    self._fail_run(run, None)
+                    self._fail_run(run.run, None)
             else:
                 # Service ended. The open channels should know how to handle
                 # this (and cleanup) themselves, so if there should not be any
@@ -475,7 +1268,7 @@ class Node(object):
                     run.state,
                 )
 
-    def _connect(self):
+    def _connect(self, pooled):
         # This is complicated because we have to deal with a few different
         # steps before our connection is really available for us:
         #  1. Transport is created (our client creator does this)
@@ -496,7 +1289,7 @@ class Node(object):
 
         # We're going to create a deferred, returned to the caller, that will
         # be called back when we have an established, secure connection ready
-        # for opening channels. The value will be this instance of node.
+        # for opening channels. The value will be the PooledConnection.
         connect_defer = defer.Deferred()
         twistedutils.defer_timeout(
             connect_defer,
@@ -505,17 +1298,15 @@ class Node(object):
 
         def on_service_started(connection):
             # Booyah, time to start doing stuff
-            if self.connection:
-                log.error(
-                    "Host %s service started called before disconnect(%s, %s)",
+            if connect_defer.called:
+                log.warning(
+                    "Service to %s started after the connection timed out",
                     self.hostname,
-                    self.connection,
-                    connection,
                 )
-            self.connection = connection
-            self.connection_defer = None
-
-            connect_defer.callback(self)
+                connection.transport.loseConnection()
+                return connection
+            pooled.connection = connection
+            connect_defer.callback(pooled)
             return connection
 
         def on_connection_secure(connection):
@@ -524,7 +1315,10 @@ class Node(object):
             connection.service_stop_defer = defer.Deferred()
 
             connection.service_start_defer.addCallback(on_service_started)
-            connection.service_stop_defer.addCallback(self._service_stopped)
+            connection.service_stop_defer.addCallback(
+                self._service_stopped,
+                pooled,
+            )
             return connection
 
         def on_transport_create(transport):
@@ -534,7 +1328,8 @@ class Node(object):
 
         def on_transport_fail(fail):
             log.warning("Cannot connect to %s", self.hostname)
-            connect_defer.errback(fail)
+            if not connect_defer.called:
+                connect_defer.errback(fail)
 
         create_defer.addCallback(on_transport_create)
         create_defer.addErrback(on_transport_fail)
@@ -542,15 +1337,16 @@ class Node(object):
         return connect_defer
 
     def _open_channel(self, run):
-        assert self.connection
         if not self._is_run_id_tracked(run):
             log.warning("Run %s no longer tracked (_open_channel)", run.id)
             return
+        connection = self.run_states[run.id].connection.connection
+        assert connection
         assert self.run_states[run.id].state < RUN_STATE_RUNNING
 
         self.run_states[run.id].state = RUN_STATE_STARTING
 
-        chan = ssh.ExecChannel(conn=self.connection)
+        chan = ssh.ExecChannel(conn=connection)
 
         chan.addOutputCallback(run.write_stdout)
         chan.addErrorCallback(run.write_stderr)
@@ -568,11 +1364,9 @@ class Node(object):
         twistedutils.defer_timeout(chan.start_defer, RUN_START_TIMEOUT)
 
         self.run_states[run.id].channel = chan
-        # TODO: I believe this needs to be checking the health of the connection
-        # before trying to open a new channel.  If the connection is gone it
-        # needs to re-establish, or if the connection is not responding
-        # we shouldn't create this new channel
-        self.connection.openChannel(chan)
+        # Runs are only assigned to connections which answer keepalives, see
+        # ConnectionPool.get_connected
+        connection.openChannel(chan)
 
     def _channel_complete(self, channel, run):
         """Callback once our channel has completed it's operation
@@ -608,8 +1402,14 @@ class Node(object):
         if not self._is_run_id_tracked(run):
             log.warning("Run %s no longer tracked (_run_started)", run.id)
             return
-        assert self.run_states[run.id].state == RUN_STATE_STARTING
-        self.run_states[run.id].state = RUN_STATE_RUNNING
+        run_state = self.run_states[run.id]
+        assert run_state.state == RUN_STATE_STARTING
+        run_state.state = RUN_STATE_RUNNING
+        if run_state.assigned_at is not None:
+            metrics.timer(
+                'node.start_latency',
+                reactor.seconds() - run_state.assigned_at,
+            )
 
         run.started()
 
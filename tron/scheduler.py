@@ -17,6 +17,10 @@ Tron schedulers
  schedule_on_complete is a bool that identifies if this scheduler should have
  jobs scheduled with the start_time of the previous run (False), or the
  end time of the previous run (False).
+
+ GeneralScheduler and IntervalScheduler also support a fixed `offset`, which is
+ added to every run time. Offsets are assigned by
+ tron.core.schedule_planner to spread out job start times.
 """
 from __future__ import absolute_import
 from __future__ import unicode_literals
@@ -34,6 +38,10 @@ from tron.utils import trontimespec
 
 log = logging.getLogger(__name__)
 
+# Number of run times a GeneralScheduler computes ahead when it is asked for
+# consecutive run times
+UPCOMING_RUN_TIMES = 8
+
 
 def scheduler_from_config(config, time_zone):
     """A factory for creating a scheduler from a configuration object."""
@@ -127,8 +135,26 @@ def get_jitter_str(time_delta):
     return ' (+/- %s)' % time_delta
 
 
+def get_offset_str(time_delta):
+    if not time_delta:
+        return ''
+    return ' (+%s)' % time_delta
+
+
+def get_match_key(start_time):
+    """Return a key for a start time. The time zone is part of the key because
+    matches are returned in the time zone of the start time.
+    """
+    return start_time.replace(tzinfo=None), start_time.tzinfo
+
+
 class GeneralScheduler(object):
     """Scheduler which uses a TimeSpecification.
+
+    Each run time is usually found from the previous one. When the scheduler
+    is asked for the match after its last result, it computes the next
+    UPCOMING_RUN_TIMES matches at once and answers from them until they run
+    out.
     """
     schedule_on_complete = False
 
@@ -162,6 +188,7 @@ class GeneralScheduler(object):
         """
         self.time_zone = time_zone
         self.jitter = jitter
+        self.offset = datetime.timedelta()
         self.name = name or 'daily'
         self.original = original or ''
         self.time_spec = trontimespec.TimeSpecification(
@@ -175,9 +202,36 @@ class GeneralScheduler(object):
             seconds=seconds,
             timezone=time_zone.zone if time_zone else None,
         )
+        # match key -> next match
+        self.upcoming = {}
+        self.last_match_key = None
 
     def next_run_time(self, start_time):
         """Find the next time to run."""
+        if not start_time:
+            start_time = timeutils.current_time(tz=self.time_zone)
+        # Find the match for the schedule before the offset was applied
+        start_time = start_time - self.offset
+        run_time = self.base_run_time(start_time)
+        return run_time + self.offset + get_jitter(self.jitter)
+
+    def base_run_time(self, start_time):
+        """Find the next time that matches the schedule after start_time,
+        without any offset or jitter.
+        """
+        return self.get_match(self.localize(start_time))
+
+    def base_run_times(self, start_time):
+        """Yield the times that match the schedule after start_time in order,
+        without any offset or jitter. Each one is the base_run_time of the
+        previous one.
+        """
+        return self.time_spec.get_matches(self.localize(start_time))
+
+    def localize(self, start_time):
+        """Return start_time in the scheduler's time zone, or the current
+        time if start_time is not set.
+        """
         if not start_time:
             start_time = timeutils.current_time(tz=self.time_zone)
         elif self.time_zone:
@@ -205,21 +259,41 @@ class GeneralScheduler(object):
                         start_time,
                         is_dst=True,
                     )
+        return start_time
 
-        return self.time_spec.get_match(start_time) + get_jitter(self.jitter)
+    def get_match(self, start_time):
+        """Return the result of time_spec.get_match(start_time), from the
+        upcoming matches if it was already computed.
+        """
+        key = get_match_key(start_time)
+        if key not in self.upcoming:
+            count = 1
+            if key == self.last_match_key:
+                count = UPCOMING_RUN_TIMES
+            self.upcoming = {}
+            for _ in range(count):
+                match = self.time_spec.get_match(start_time)
+                self.upcoming[get_match_key(start_time)] = match
+                start_time = match
+
+        match = self.upcoming[key]
+        self.last_match_key = get_match_key(match)
+        return match
 
     def __str__(self):
-        return '%s %s%s' % (
+        return '%s %s%s%s' % (
             self.name,
             self.original,
             get_jitter_str(self.jitter),
+            get_offset_str(self.offset),
         )
 
     def __eq__(self, other):
-        return hasattr(
-            other,
-            'time_spec',
-        ) and self.time_spec == other.time_spec
+        return (
+            hasattr(other, 'time_spec') and
+            self.time_spec == other.time_spec and
+            self.offset == getattr(other, 'offset', None)
+        )
 
     def __ne__(self, other):
         return not self == other
@@ -244,22 +318,33 @@ class IntervalScheduler(object):
         self.interval = interval
         self.jitter = jitter
         self.time_zone = time_zone
+        self.offset = datetime.timedelta()
 
     def next_run_time(self, last_run_time, time_zone=None):
+        run_time = self.base_run_time(last_run_time, time_zone)
+        if not last_run_time:
+            # Later runs keep the offset from the previous run time
+            run_time += self.offset
+        return run_time + get_jitter(self.jitter)
+
+    def base_run_time(self, last_run_time, time_zone=None):
+        """Return the next run time, without any offset or jitter."""
         last_run_time = last_run_time or timeutils.current_time(tz=time_zone)
-        return last_run_time + self.interval + get_jitter(self.jitter)
+        return last_run_time + self.interval
 
     def __str__(self):
-        return "%s %s%s" % (
+        return "%s %s%s%s" % (
             self.get_name(),
             self.interval,
             get_jitter_str(self.jitter),
+            get_offset_str(self.offset),
         )
 
     def __eq__(self, other):
         return (
             isinstance(other, IntervalScheduler) and
-            self.interval == other.interval
+            self.interval == other.interval and
+            self.offset == other.offset
         )
 
     def __ne__(self, other):
@@ -1,5 +1,13 @@
 """
 Tools for managing and properly closing file handles.
+
+Writes are buffered in memory and written to disk by a writer thread, so the
+reactor does not block on small writes of action output. A handle's buffer
+is written once it holds buffer_size bytes, or after it has been buffered for
+flush_interval seconds. When more than max_buffered_bytes are buffered across
+all handles, a write waits until the writer thread has written every buffer.
+Closing a handle writes its buffer first, waiting for the writer thread if it
+is writing to the same file.
 """
 from __future__ import absolute_import
 from __future__ import unicode_literals
@@ -8,6 +16,7 @@ import logging
 import os
 import os.path
 import shutil
+import threading
 import time
 from collections import OrderedDict
 from subprocess import PIPE
@@ -19,6 +28,15 @@ from tron.utils import maybe_encode
 
 log = logging.getLogger(__name__)
 
+# Bytes buffered for a handle before it is written
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+# Maximum seconds output is buffered before it is written
+OUTPUT_FLUSH_INTERVAL = 1
+
+# Bytes buffered across all handles before writes stop being buffered
+MAX_BUFFERED_BYTES = 16 * 1024 * 1024
+
 
 class NullFileHandle(object):
     """A No-Op object that supports a File interface."""
@@ -28,6 +46,10 @@ class NullFileHandle(object):
     def write(cls, _):
         pass
 
+    @classmethod
+    def flush(cls):
+        pass
+
     @classmethod
     def close(cls):
         pass
@@ -38,12 +60,26 @@ class FileHandleWrapper(object):
     access time and metadata.  These objects should only be created
     by FileHandleManager. Do not instantiate them on their own.
     """
-    __slots__ = ['manager', 'name', 'last_accessed', '_fh']
+    __slots__ = [
+        'manager',
+        'name',
+        'last_accessed',
+        'buffer',
+        'buffered',
+        'buffered_since',
+        'lock',
+        '_fh',
+    ]
 
     def __init__(self, manager, name):
         self.manager = manager
         self.name = name
         self.last_accessed = time.time()
+        self.buffer = []
+        self.buffered = 0
+        self.buffered_since = None
+        # Held while opening, writing to or closing the fh
+        self.lock = threading.Lock()
         self._fh = NullFileHandle
 
     def close(self):
@@ -51,23 +87,70 @@ class FileHandleWrapper(object):
         self.manager.remove(self)
 
     def close_wrapped(self):
-        """Close only the underlying file handle."""
-        self._fh.close()
-        self._fh = NullFileHandle
+        """Write the buffer and close only the underlying file handle. If the
+        writer thread is writing to the fh, this waits for that write.
+        """
+        with self.lock:
+            while True:
+                self._write_buffer()
+                with self.manager.lock:
+                    # A write may have been buffered since, see _append
+                    if not self.buffer:
+                        fh, self._fh = self._fh, NullFileHandle
+                        break
+            fh.close()
 
     def write(self, content):
-        """Write content to the fh. Re-open if necessary."""
-        if self._fh == NullFileHandle:
-            try:
-                self._fh = open(self.name, 'ab')
-            except IOError as e:
-                log.error("Failed to open %s: %s", self.name, e)
-                return
-
+        """Buffer content to be written to the fh. Re-open if necessary."""
         self.last_accessed = time.time()
-        self._fh.write(maybe_encode(content))
+        content = maybe_encode(content)
+        while not self._append(content):
+            with self.lock:
+                if self._fh != NullFileHandle:
+                    continue
+                try:
+                    self._fh = open(self.name, 'ab')
+                except IOError as e:
+                    log.error("Failed to open %s: %s", self.name, e)
+                    return
         self.manager.update(self)
 
+    def _append(self, content):
+        """Add content to the buffer, unless the fh is closed. Content is
+        only buffered while the fh is open, so a buffer is never written to
+        a NullFileHandle.
+        """
+        with self.manager.lock:
+            if self._fh == NullFileHandle:
+                return False
+            if not self.buffer:
+                self.buffered_since = self.last_accessed
+            self.buffer.append(content)
+            self.buffered += len(content)
+            self.manager.buffered_bytes += len(content)
+        return True
+
+    def flush(self):
+        """Write the buffer to the fh."""
+        with self.lock:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        with self.manager.lock:
+            if not self.buffer:
+                return
+            content = b''.join(self.buffer)
+            self.manager.buffered_bytes -= self.buffered
+            self.buffer = []
+            self.buffered = 0
+            self.buffered_since = None
+
+        try:
+            self._fh.write(content)
+            self._fh.flush()
+        except (IOError, ValueError) as e:
+            log.error("Failed to write to %s: %s", self.name, e)
+
     def __enter__(self):
         return self
 
@@ -83,20 +166,45 @@ class FileHandleManager(object):
     This class is singleton.  An already configured instance can be
     retrieving by using get_instance() (and will be created if None),
     max_idle_time can be set by calling the classmethod set_max_idle_time()
+
+    Buffered writes are written by a writer thread, which is started by the
+    first write, and stopped by stop().
     """
 
     _instance = None
 
-    def __init__(self, max_idle_time=60):
+    def __init__(
+        self,
+        max_idle_time=60,
+        buffer_size=OUTPUT_BUFFER_SIZE,
+        flush_interval=OUTPUT_FLUSH_INTERVAL,
+        max_buffered_bytes=MAX_BUFFERED_BYTES,
+    ):
         """
             Create a new instance.
             max_idle_time           - max idle time in seconds
+            buffer_size             - bytes buffered for a handle before
+                                      it is written
+            flush_interval          - max seconds a write is buffered
+            max_buffered_bytes      - bytes buffered across all handles
+                                      before writes are not buffered
         """
         if self.__class__._instance:
             msg = "FileHandleManager is a singleton. Call get_instance()"
             raise ValueError(msg)
         self.max_idle_time = max_idle_time
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_buffered_bytes = max_buffered_bytes
         self.cache = OrderedDict()
+        self.buffered_bytes = 0
+        # Guards the cache and the buffers of the handles
+        self.lock = threading.Lock()
+        self.wake_writer = threading.Condition(self.lock)
+        # Notified by the writer thread after it wrote the buffers
+        self.written = threading.Condition(self.lock)
+        self.writer = None
+        self.stopping = False
         self.__class__._instance = self
 
     @classmethod
@@ -112,21 +220,25 @@ class FileHandleManager(object):
 
     @classmethod
     def reset(cls):
-        """Empty the cache and reset the instance to it's original state."""
+        """Close and remove every handle, writing their buffers, and reset
+        the instance to it's original state.
+        """
         inst = cls.get_instance()
+        inst.stop()
         for fh_wrapper in list(inst.cache.values()):
-            inst.remove(fh_wrapper)
+            fh_wrapper.close()
 
     def open(self, filename):
         """Retrieve a file handle from the cache based on name.  Returns a
         FileHandleWrapper. If the handle is not in the cache, create a new
         instance.
         """
-        if filename in self.cache:
-            return self.cache[filename]
-        fhw = FileHandleWrapper(self, filename)
-        self.cache[filename] = fhw
-        return fhw
+        with self.lock:
+            if filename in self.cache:
+                return self.cache[filename]
+            fhw = FileHandleWrapper(self, filename)
+            self.cache[filename] = fhw
+            return fhw
 
     def cleanup(self, time_func=time.time):
         """Close any file handles that have been idle for longer than
@@ -136,26 +248,111 @@ class FileHandleManager(object):
             return
 
         cur_time = time_func()
-        for name, fh_wrapper in list(self.cache.items()):
-            if cur_time - fh_wrapper.last_accessed > self.max_idle_time:
-                fh_wrapper.close()
-            else:
-                break
+        idle = []
+        with self.lock:
+            for fh_wrapper in self.cache.values():
+                if cur_time - fh_wrapper.last_accessed <= self.max_idle_time:
+                    break
+                idle.append(fh_wrapper)
+        for fh_wrapper in idle:
+            fh_wrapper.close()
 
     def remove(self, fh_wrapper):
         """Remove the fh_wrapper from the cache and access_order."""
-        if fh_wrapper.name in self.cache:
-            del self.cache[fh_wrapper.name]
+        with self.lock:
+            self.cache.pop(fh_wrapper.name, None)
 
     def update(self, fh_wrapper):
-        """Remove and re-add the file handle to the cache so that it's keys
-        are still ordered by last access. Calls cleanup() to remove any file
-        handles that have been idle for too long.
+        """Move the file handle to the end of the cache so that it's keys
+        are still ordered by last access. Wakes the writer thread if the
+        buffer is full, and waits for it to write every buffer if too much
+        is buffered. Calls cleanup() to remove any file handles that have
+        been idle for too long.
         """
-        self.remove(fh_wrapper)
-        self.cache[fh_wrapper.name] = fh_wrapper
+        self.start_writer()
+        with self.lock:
+            self.cache[fh_wrapper.name] = fh_wrapper
+            self.cache.move_to_end(fh_wrapper.name)
+            if fh_wrapper.buffered >= self.buffer_size:
+                self.wake_writer.notify()
+            while (
+                self.buffered_bytes > self.max_buffered_bytes and
+                self.writer.is_alive()
+            ):
+                self.wake_writer.notify()
+                self.written.wait(self.flush_interval)
         self.cleanup()
 
+    def flush(self, filename=None):
+        """Write the buffers of all handles, or of the handle for
+        filename.
+        """
+        with self.lock:
+            if filename is None:
+                fh_wrappers = list(self.cache.values())
+            else:
+                fh_wrappers = [
+                    self.cache[filename]
+                ] if filename in self.cache else []
+        for fh_wrapper in fh_wrappers:
+            fh_wrapper.flush()
+
+    def start_writer(self):
+        with self.lock:
+            if self.writer and self.writer.is_alive():
+                return
+            self.stopping = False
+            self.writer = threading.Thread(
+                target=self._run_writer,
+                name='output-writer',
+                daemon=True,
+            )
+            self.writer.start()
+
+    def stop(self):
+        """Stop the writer thread, and wait for it to finish its writes.
+        Buffers are not written, see flush(). The next write starts a new
+        writer thread.
+        """
+        with self.lock:
+            writer = self.writer
+            self.stopping = True
+            self.wake_writer.notify()
+        if writer:
+            writer.join()
+
+    def _get_due(self, cur_time):
+        """Return the handles whose buffer should be written, which is every
+        handle with a buffer when too much is buffered.
+        """
+        if self.buffered_bytes > self.max_buffered_bytes:
+            return [
+                fh_wrapper for fh_wrapper in self.cache.values()
+                if fh_wrapper.buffer
+            ]
+        return [
+            fh_wrapper for fh_wrapper in self.cache.values()
+            if fh_wrapper.buffered >= self.buffer_size or (
+                fh_wrapper.buffer and
+                cur_time - fh_wrapper.buffered_since >= self.flush_interval
+            )
+        ]
+
+    def _run_writer(self):
+        while True:
+            with self.lock:
+                if self.stopping:
+                    return
+                if self.buffered_bytes <= self.max_buffered_bytes:
+                    self.wake_writer.wait(self.flush_interval)
+                if self.stopping:
+                    return
+                due = self._get_due(time.time())
+            for fh_wrapper in due:
+                fh_wrapper.flush()
+            with self.lock:
+                self.written.notify_all()
+
 
 class OutputStreamSerializer(object):
     """Manage writing to and reading from files in a directory hierarchy."""
@@ -172,6 +369,7 @@ class OutputStreamSerializer(object):
     def tail(self, filename, num_lines=None):
         """Tail a file using `tail`."""
         path = self.full_path(filename)
+        FileHandleManager.get_instance().flush(path)
         if not path or not os.path.exists(path):
             return []
         if not num_lines:
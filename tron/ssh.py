@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import logging
+import os
 import struct
 
 from twisted.conch.client import default
@@ -58,12 +59,77 @@ class SSHAuthOptions(object):
         return "%s(%s, %s)" % context
 
 
+class IdentityKeyCache(object):
+    """Keys loaded from identity files, shared by all connections so each
+    file is parsed once. A key is loaded again when its file changes.
+    """
+
+    def __init__(self):
+        # path -> (mtime, Key)
+        self.keys = {}
+
+    def get_key(self, path):
+        """Return the Key in the file at path, or None if there is no file.
+        Raises keys.BadKeyError or keys.EncryptedKeyError if the file can
+        not be loaded.
+        """
+        path = os.path.expanduser(path)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        cached = self.keys.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        key = keys.Key.fromFile(path)
+        self.keys[path] = mtime, key
+        return key
+
+    def clear(self):
+        self.keys.clear()
+
+
+identity_keys = IdentityKeyCache()
+
+
 class NoPasswordAuthClient(default.SSHUserAuthClient):
     """Only support passwordless auth."""
     preferredOrder = ['publickey']
     auth_password = None
     auth_keyboard_interactive = None
 
+    def getPublicKey(self):
+        """Return the next public key from the agent or the identity files,
+        using keys cached by earlier connections.
+        """
+        if self.keyAgent:
+            key = self.keyAgent.getPublicKey()
+            if key is not None:
+                return key
+
+        for identity in self.options.identitys:
+            if identity in self.usedFiles:
+                continue
+            self.usedFiles.append(identity)
+            try:
+                key = identity_keys.get_key(identity + '.pub')
+            except keys.BadKeyError:
+                continue
+            if key is not None:
+                return key
+        return None
+
+    def getPrivateKey(self):
+        try:
+            key = identity_keys.get_key(self.usedFiles[-1])
+        except keys.EncryptedKeyError:
+            return default.SSHUserAuthClient.getPrivateKey(self)
+        if key is None:
+            return None
+        return defer.succeed(key)
+
 
 class ClientTransport(transport.SSHClientTransport):
 
@@ -116,6 +182,21 @@ class ClientConnection(connection.SSHConnection):
         if not self.service_stop_defer.called:
             self.service_stop_defer.callback(self)
 
+    def send_keepalive(self):
+        """Send a global request which the server must answer. Returns a
+        Deferred which fires with the reply, or fails if the server does not
+        support the request.
+        """
+        return self.sendGlobalRequest(
+            b'keepalive@openssh.com',
+            b'',
+            wantReply=True,
+        )
+
+    def abort(self):
+        """Drop the connection without waiting for pending writes."""
+        self.transport.transport.abortConnection()
+
     def channelClosed(self, channel):
         if not channel.conn:
             log.warning("Channel %r failed to open", channel.id)
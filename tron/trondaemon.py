@@ -187,7 +187,7 @@ class TronDaemon(object):
         self.mcp = mcp.MasterControlProgram(working_dir, config_path)
 
         try:
-            self.mcp.initial_setup()
+            self.mcp.initial_setup(progressive=True)
         except Exception as e:
             msg = "Error in configuration %s: %s"
             log.exception(msg % (config_path, e))
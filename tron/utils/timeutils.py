@@ -4,6 +4,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import datetime
+import functools
 import re
 
 
@@ -78,6 +79,16 @@ class DateArithmetic(object):
         'shortdate': '%Y-%m-%d',
     }
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def parse_spec(date_str):
+        """Return the (name, delta) of a date arithmetic pattern, or None."""
+        match = DateArithmetic.DATE_TYPE_PATTERN.match(date_str)
+        if not match:
+            return None
+        attr, value = match.groups()
+        return attr, int(value) if value else 0
+
     @classmethod
     def parse(cls, date_str, dt=None):
         """Parse a date arithmetic pattern (Ex: 'shortdate-1'). Supports
@@ -87,11 +98,10 @@ class DateArithmetic(object):
         """
         dt = dt or current_time()
 
-        match = cls.DATE_TYPE_PATTERN.match(date_str)
-        if not match:
+        spec = cls.parse_spec(date_str)
+        if not spec:
             return
-        attr, value = match.groups()
-        delta = int(value) if value else 0
+        attr, delta = spec
 
         if attr in ('shortdate', 'year', 'month', 'day', 'hour'):
             if delta:
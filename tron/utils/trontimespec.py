@@ -13,8 +13,10 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import bisect
 import calendar
 import datetime
+import functools
 
 from six.moves import filter
 
@@ -100,6 +102,23 @@ def get_time(time_string):
         return None
 
 
+@functools.lru_cache(maxsize=4096)
+def get_day_tzinfo(timezone, date):
+    """Return the pytz tzinfo of every time on date in timezone, or None if
+    the UTC offset changes within a day of date.
+    """
+    noon = datetime.time(12)
+    tzinfos = {
+        timezone.localize(
+            datetime.datetime.combine(date + datetime.timedelta(days), noon),
+        ).tzinfo
+        for days in (-1, 0, 1)
+    }
+    if len(tzinfos) != 1:
+        return None
+    return tzinfos.pop()
+
+
 TOKEN_LAST = 'LAST'
 
 ordinal_range = range(1, 6)
@@ -109,6 +128,9 @@ monthday_range = range(1, 32)
 hour_range = range(0, 24)
 minute_range = second_range = range(0, 60)
 
+# Number of months whose matching days are kept by a TimeSpecification
+DAYS_CACHE_SIZE = 240
+
 
 def validate_spec(source, value_range, type, default=None, allow_last=False):
     default = default if default is not None else value_range
@@ -135,6 +157,10 @@ def validate_spec(source, value_range, type, default=None, allow_last=False):
 class TimeSpecification(object):
     """TimeSpecification determines the next time which matches the
     configured pattern.
+
+    Each field is kept as a sorted list, so the next matching month, day and
+    time can be found with a bisect instead of by filtering every value. The
+    matching days of each month are computed once and cached.
     """
 
     def __init__(
@@ -184,10 +210,31 @@ class TimeSpecification(object):
             True,
         )
         self.timezone = get_timezone(timezone)
+        self.hour_set = frozenset(self.hours)
+        self.minute_set = frozenset(self.minutes)
+        # (year, month) -> tuple of matching days
+        self.days_cache = {}
+
+    def get_days(self, year, month):
+        """Return the sorted matching days of a month."""
+        key = year, month
+        days = self.days_cache.get(key)
+        if days is None:
+            if len(self.days_cache) >= DAYS_CACHE_SIZE:
+                self.days_cache.clear()
+            # LAST can be the same day as a configured monthday
+            days = tuple(sorted(set(self.build_days(year, month))))
+            self.days_cache[key] = days
+        return days
 
     def next_day(self, first_day, year, month):
         """Returns matching days for the given year and month.
         """
+        days = self.get_days(year, month)
+        return list(days[bisect.bisect_left(days, first_day):])
+
+    def build_days(self, year, month):
+        """Returns all matching days for the given year and month."""
         first_day_of_month, last_day_of_month = calendar.monthrange(
             year,
             month,
@@ -197,7 +244,7 @@ class TimeSpecification(object):
             return last_day_of_month if day == TOKEN_LAST else day
 
         def day_filter(day):
-            return first_day <= day <= last_day_of_month
+            return 1 <= day <= last_day_of_month
 
         def sort_days(days):
             return sorted(filter(day_filter, days))
@@ -218,48 +265,61 @@ class TimeSpecification(object):
     def next_month(self, start_date):
         """Create a generator which yields valid months after the start month.
         """
-        current = start_date.month
-        potential = [m for m in self.months if m >= current]
-        year_wraps = 0
+        year = start_date.year
+        index = bisect.bisect_left(self.months, start_date.month)
+        months = self.months[index:]
 
         while True:
-            if not potential:
-                year_wraps += 1
-                potential = list(self.months)
-
-            yield potential.pop(0), start_date.year + year_wraps
+            for month in months:
+                yield month, year
+            year += 1
+            months = self.months
 
     def next_time(self, start_date, is_start_day):
         """Return the next valid time."""
-        start_hour = start_date.time().hour
-
-        def hour_filter(hour):
-            return not is_start_day or hour >= start_hour
-
-        for hour in filter(hour_filter, self.hours):
-            for minute in self.minutes:
-                for second in self.seconds:
-                    candidate = datetime.time(hour, minute, second)
-
-                    if is_start_day and start_date.time() >= candidate:
-                        continue
+        if not is_start_day:
+            return datetime.time(
+                self.hours[0],
+                self.minutes[0],
+                self.seconds[0],
+            )
+
+        hour, minute = start_date.hour, start_date.minute
+        if hour in self.hour_set:
+            index = bisect.bisect_right(self.seconds, start_date.second)
+            if minute in self.minute_set and index < len(self.seconds):
+                return datetime.time(hour, minute, self.seconds[index])
+
+            index = bisect.bisect_right(self.minutes, minute)
+            if index < len(self.minutes):
+                return datetime.time(
+                    hour,
+                    self.minutes[index],
+                    self.seconds[0],
+                )
 
-                    return candidate
+        index = bisect.bisect_right(self.hours, hour)
+        if index < len(self.hours):
+            return datetime.time(
+                self.hours[index],
+                self.minutes[0],
+                self.seconds[0],
+            )
+        return None
 
     def get_match(self, start):
         """Returns the next datetime match after start."""
         start_date = to_timezone(start, self.timezone).replace(tzinfo=None)
-
-        def get_first_day(month, year):
-            if (month, year) != (start_date.month, start_date.year):
-                return 1
-            return start_date.day
+        start_day = start_date.year, start_date.month, start_date.day
 
         for month, year in self.next_month(start_date):
-            first_day = get_first_day(month, year)
+            days = self.get_days(year, month)
+            first_day = 1
+            if (year, month) == start_day[:2]:
+                first_day = start_date.day
 
-            for day in self.next_day(first_day, year, month):
-                is_start_day = start_date.timetuple()[:3] == (year, month, day)
+            for day in days[bisect.bisect_left(days, first_day):]:
+                is_start_day = (year, month, day) == start_day
 
                 time = self.next_time(start_date, is_start_day)
                 if time is None:
@@ -279,20 +339,124 @@ class TimeSpecification(object):
                     continue
                 return candidate
 
+    def next_times(self, first_time):
+        """Yield the matching times of a day in order, starting with
+        first_time, a (hour, minute, second) tuple, if it is not None.
+        """
+        hours, minutes, seconds = self.hours, self.minutes, self.seconds
+        start_hour = start_minute = None
+        hour_index = minute_index = second_index = 0
+        if first_time:
+            start_hour, start_minute, start_second = first_time
+            hour_index = bisect.bisect_left(hours, start_hour)
+            minute_index = bisect.bisect_left(minutes, start_minute)
+            second_index = bisect.bisect_left(seconds, start_second)
+
+        for hour in hours[hour_index:]:
+            if hour != start_hour:
+                minute_index = second_index = 0
+            for minute in minutes[minute_index:]:
+                if hour != start_hour or minute != start_minute:
+                    second_index = 0
+                for second in seconds[second_index:]:
+                    yield hour, minute, second
+            minute_index = second_index = 0
+
+    def next_candidates(self, start_date):
+        """Yield the naive datetimes which match the specification after the
+        naive datetime start_date, in order.
+        """
+        start_day = start_date.year, start_date.month, start_date.day
+        after_start = start_date.replace(microsecond=0) + datetime.timedelta(
+            seconds=1,
+        )
+        first_time = after_start.hour, after_start.minute, after_start.second
+        if (after_start.year, after_start.month, after_start.day) != start_day:
+            first_time = None
+
+        for month, year in self.next_month(start_date):
+            days = self.get_days(year, month)
+            first_day = 1
+            if (year, month) == start_day[:2]:
+                first_day = start_date.day
+
+            for day in days[bisect.bisect_left(days, first_day):]:
+                day_first_time = None
+                if (year, month, day) == start_day:
+                    if not first_time:
+                        continue
+                    day_first_time = first_time
+                for hour, minute, second in self.next_times(day_first_time):
+                    yield datetime.datetime(
+                        year,
+                        month,
+                        day,
+                        hour,
+                        minute,
+                        second,
+                    )
+
+    def get_matches(self, start):
+        """Yield the matches after start in order. Each match is the same as
+        get_match of the previous one, but matches are found without
+        searching from the start for each one.
+        """
+        # Matches are already in start's time zone when it is the same as
+        # the specification's, so they need not be converted again
+        same_zone = self.timezone and self.timezone.zone == getattr(
+            start.tzinfo,
+            'zone',
+            None,
+        )
+        while True:
+            start_date = to_timezone(start, self.timezone).replace(tzinfo=None)
+            for candidate in self.next_candidates(start_date):
+                if same_zone:
+                    match = self.localize(candidate)
+                else:
+                    match = self.handle_timezone(candidate, start.tzinfo)
+                if not match:
+                    continue
+                yield match
+
+                if not self.timezone:
+                    continue
+                if same_zone:
+                    match_date = match.replace(tzinfo=None)
+                else:
+                    match_date = to_timezone(match, self.timezone)
+                    match_date = match_date.replace(tzinfo=None)
+                if match_date != candidate:
+                    # The match moved across a DST change, so the next one
+                    # follows the moved time
+                    start = match
+                    break
+
+    def localize(self, out):
+        """Return the naive datetime out in the specification's time zone,
+        or None if it does not exist.
+        """
+        tzinfo = get_day_tzinfo(self.timezone, out.date())
+        if tzinfo:
+            return out.replace(tzinfo=tzinfo)
+        try:
+            return self.timezone.localize(out, is_dst=None)
+        except AmbiguousTimeError:
+            return self.timezone.localize(out)
+        except NonExistentTimeError:
+            try:
+                return self.timezone.localize(
+                    out + datetime.timedelta(minutes=60),
+                )
+            except NonExistentTimeError:
+                return None
+
     # TODO: test
     def handle_timezone(self, out, tzinfo):
         if self.timezone and pytz is not None:
-            try:
-                out = self.timezone.localize(out, is_dst=None)
-            except AmbiguousTimeError:
-                out = self.timezone.localize(out)
-            except NonExistentTimeError:
-                try:
-                    out = self.timezone.localize(
-                        out + datetime.timedelta(minutes=60),
-                    )
-                except NonExistentTimeError:
-                    return None
+            out = self.localize(out)
+            if out is None:
+                return None
         return to_timezone(out, tzinfo)
 
     def __eq__(self, other):